@@ -0,0 +1,6 @@
+"""
+Diagnostics package for Payslip Manager: UI responsiveness monitoring
+"""
+from .ui_watchdog import StallWatchdog, STALL_THRESHOLD_MS
+
+__all__ = ['StallWatchdog', 'STALL_THRESHOLD_MS']
@@ -0,0 +1,139 @@
+import collections
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+
+HEARTBEAT_MS = 100
+# Event loop delays above this count as a stall
+STALL_THRESHOLD_MS = 250
+MAX_STALLS = 200
+LATENCY_SAMPLES = 600
+
+
+class Stall:
+    """One period in which the Tk event loop did not run for longer than the threshold."""
+    def __init__(self, started_at, stack):
+        self.started_at = started_at
+        self.stack = stack
+        self.duration_ms = None
+
+    def to_dict(self):
+        return {"started_at": datetime.fromtimestamp(self.started_at).isoformat(timespec="milliseconds"),
+                "duration_ms": round(self.duration_ms or 0, 1), "stack": self.stack}
+
+
+class StallWatchdog:
+    """Measures Tk event loop latency and records what the main thread was doing when it stalled.
+
+    A heartbeat is scheduled with root.after every `interval_ms`; its latency
+    is how late it actually ran. A monitor thread notices a heartbeat that is
+    overdue by more than `threshold_ms` while the stall is still happening and
+    captures the main thread's Python stack at that moment.
+    """
+    def __init__(self, root, interval_ms=HEARTBEAT_MS, threshold_ms=STALL_THRESHOLD_MS):
+        self.root = root
+        self.interval_ms = interval_ms
+        self.threshold_ms = threshold_ms
+        self.stalls = collections.deque(maxlen=MAX_STALLS)
+        self.stall_count = 0
+        self.worst_ms = 0.0
+        self.latencies = collections.deque(maxlen=LATENCY_SAMPLES)
+        self.started_at = None
+        self._lock = threading.Lock()
+        self._expected = None
+        self._current = None
+        self._main_thread_id = threading.main_thread().ident
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the heartbeat; must be called from the Tk (main) thread."""
+        self.started_at = time.time()
+        self._schedule()
+        self._thread = threading.Thread(target=self._monitor, name="ui-watchdog", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _schedule(self):
+        with self._lock:
+            self._expected = time.perf_counter() + self.interval_ms / 1000
+        self.root.after(self.interval_ms, self._beat)
+
+    def _beat(self):
+        if self._stop.is_set():
+            return
+        now = time.perf_counter()
+        with self._lock:
+            latency_ms = max(0.0, (now - self._expected) * 1000)
+            self.latencies.append(latency_ms)
+            self.worst_ms = max(self.worst_ms, latency_ms)
+            stall, self._current = self._current, None
+            if stall is None and latency_ms > self.threshold_ms:
+                # Too short for the monitor to catch; still counted, without a stack
+                stall = Stall(time.time() - latency_ms / 1000, None)
+                self.stalls.append(stall)
+                self.stall_count += 1
+            if stall is not None:
+                stall.duration_ms = latency_ms
+            # Re-armed under the lock so the monitor never sees this beat as still overdue
+            self._expected = time.perf_counter() + self.interval_ms / 1000
+        self.root.after(self.interval_ms, self._beat)
+
+    def _monitor(self):
+        poll = self.interval_ms / 2000
+        while not self._stop.wait(poll):
+            with self._lock:
+                if self._current is not None or self._expected is None:
+                    continue
+                overdue_ms = (time.perf_counter() - self._expected) * 1000
+                if overdue_ms <= self.threshold_ms:
+                    continue
+            frame = sys._current_frames().get(self._main_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else None
+            with self._lock:
+                stall = Stall(time.time() - overdue_ms / 1000, stack)
+                self._current = stall
+                self.stalls.append(stall)
+                self.stall_count += 1
+
+    def summary(self):
+        """Return {"stalls", "worst_ms", "mean_ms", "p95_ms"} over the recent heartbeats."""
+        with self._lock:
+            latencies = sorted(self.latencies)
+            stalls, worst = self.stall_count, self.worst_ms
+        if not latencies:
+            return {"stalls": stalls, "worst_ms": worst, "mean_ms": 0.0, "p95_ms": 0.0}
+        return {"stalls": stalls, "worst_ms": worst, "mean_ms": sum(latencies) / len(latencies),
+                "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]}
+
+    def report(self):
+        """A plain-text report of the latency figures and every recorded stall with its stack."""
+        stats = self.summary()
+        with self._lock:
+            stalls = [stall.to_dict() for stall in self.stalls]
+        lines = [
+            "UI responsiveness report",
+            f"Generated: {datetime.now().isoformat(timespec='seconds')}",
+            f"Watching since: {datetime.fromtimestamp(self.started_at).isoformat(timespec='seconds')}"
+            if self.started_at else "Watchdog not started",
+            f"Heartbeat: {self.interval_ms} ms, stall threshold: {self.threshold_ms} ms",
+            f"Stalls: {stats['stalls']}   Worst latency: {stats['worst_ms']:.0f} ms   "
+            f"Mean: {stats['mean_ms']:.1f} ms   p95: {stats['p95_ms']:.1f} ms",
+            "",
+        ]
+        if stats["stalls"] > len(stalls):
+            lines.append(f"(only the last {len(stalls)} stalls are kept)\n")
+        for n, stall in enumerate(sorted(stalls, key=lambda s: -s["duration_ms"]), 1):
+            lines.append(f"#{n}  {stall['started_at']}  {stall['duration_ms']:.0f} ms")
+            lines.append(stall["stack"] or "    (stall ended before its stack could be captured)\n")
+        return "\n".join(lines)
+
+    def export(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.report())
+        return path
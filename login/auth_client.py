@@ -0,0 +1,142 @@
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+AUTH_BASE_URL = os.environ.get("PAYSLIP_AUTH_URL", "https://kritanpayslipmanager.vercel.app").rstrip("/")
+REQUEST_TIMEOUT = 10
+# Refresh this many seconds before the access token expires
+REFRESH_MARGIN = 300
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Shared HTTP session so logins, refreshes and logouts reuse one pooled TLS connection."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(total=3, connect=3, read=2, backoff_factor=0.5,
+                          status_forcelist=(429, 502, 503, 504),
+                          allowed_methods=frozenset(["GET", "POST"]))
+            adapter = HTTPAdapter(max_retries=retry, pool_connections=2, pool_maxsize=4)
+            _session = requests.Session()
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+def _post(path, **kwargs):
+    return get_session().post(f"{AUTH_BASE_URL}{path}", timeout=REQUEST_TIMEOUT, **kwargs)
+
+
+def _json(response):
+    try:
+        return response.json()
+    except ValueError:
+        return {}
+
+
+def warm_up():
+    """Open the pooled connection ahead of time so the first login does not pay for the TLS handshake."""
+    try:
+        get_session().head(AUTH_BASE_URL, timeout=5)
+    except requests.RequestException:
+        pass
+
+
+def login(email, password):
+    """Returns (True, user_data) or (False, error message)."""
+    try:
+        response = _post("/api/auth/login", json={"email": email, "password": password})
+        payload = _json(response)
+        if response.status_code == 200 and payload.get("success"):
+            return True, payload.get("data", {})
+        return False, payload.get("message", "Invalid email or password.")
+    except requests.RequestException as e:
+        return False, f"Login error: {e}"
+
+
+def refresh(user_data):
+    """Exchange the refresh token for a new session; returns updated user_data or None."""
+    refresh_token = user_data.get("session", {}).get("refresh_token")
+    if not refresh_token:
+        return None
+    try:
+        response = _post("/api/auth/refresh", json={"refresh_token": refresh_token})
+        payload = _json(response)
+        if response.status_code == 200 and payload.get("success"):
+            data = payload.get("data", {})
+            updated = dict(user_data)
+            # The refresh endpoint may return just the session or a full login payload
+            updated["session"] = data.get("session", data)
+            for key in ("user", "profile", "licenses"):
+                if key in data:
+                    updated[key] = data[key]
+            return updated
+    except requests.RequestException:
+        pass
+    return None
+
+
+def logout(access_token):
+    """Returns (True, None) or (False, error message)."""
+    try:
+        response = _post("/api/auth/logout", headers={"Authorization": f"Bearer {access_token}"})
+        if response.status_code == 200:
+            return True, None
+        return False, _json(response).get("message", "Unknown error.")
+    except requests.RequestException as e:
+        return False, str(e)
+
+
+def session_expires_in(user_data):
+    try:
+        return float(user_data.get("session", {}).get("expires_at", 0)) - time.time()
+    except (TypeError, ValueError):
+        return 0
+
+
+class SessionRefresher:
+    """Background thread that refreshes the session shortly before it expires.
+
+    on_refresh(user_data) is called from the background thread with the new
+    session; callers that touch Tk must marshal it to the main thread.
+    """
+    def __init__(self, user_data, token_store=None, on_refresh=None):
+        self.user_data = user_data
+        self.token_store = token_store
+        self.on_refresh = on_refresh
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="session-refresh", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            wait = session_expires_in(self.user_data) - REFRESH_MARGIN
+            if wait > 0 and self._stop.wait(min(wait, 3600)):
+                return
+            if session_expires_in(self.user_data) > REFRESH_MARGIN:
+                continue
+            updated = refresh(self.user_data)
+            if updated is None:
+                # Retry later; the session stays usable until it actually expires
+                if self._stop.wait(60):
+                    return
+                continue
+            self.user_data = updated
+            if self.token_store:
+                self.token_store.save(updated)
+            if self.on_refresh:
+                self.on_refresh(updated)
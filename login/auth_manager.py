@@ -1,8 +1,11 @@
 import hashlib
-import requests
+import queue
+import threading
 import tkinter as tk
 import tkinter.simpledialog
 from tkinter import messagebox
+from . import auth_client
+from .token_store import TokenStore
 
 class AuthManager:
     """Handles user authentication with a proper login form."""
@@ -12,10 +15,20 @@ class AuthManager:
         self.USERNAME = "admin"
         self.PASSWORD_HASH = hashlib.sha256("admin123".encode()).hexdigest()
         self.login_success = False
+        self.token_store = TokenStore()
+        self._login_results = queue.Queue()
+        self._login_pending = False
 
     def authenticate_user(self):
         self.login_success = False
         self.user_data = None
+        # A cached session that is still valid skips the login screen
+        cached = self.token_store.load()
+        if cached:
+            self.login_success = True
+            self.user_data = cached
+            return self.login_success, self.user_data
+        threading.Thread(target=auth_client.warm_up, name="auth-warm-up", daemon=True).start()
         self.login_window = tk.Toplevel(self.root)
         self.login_window.title("Login")
         self.login_window.minsize(340, 340)
@@ -50,7 +63,7 @@ class AuthManager:
         self.error_label = tk.Label(self.card, text="", fg="#d9534f", bg="#18191c", font=("Segoe UI", 9))
         self.error_label.pack(pady=(0, 4))
         # Login button
-        login_btn = tk.Button(self.card, text="Login", font=("Segoe UI", 12, "bold"), fg="#fff", bg="#18191c", activebackground="#23272e", activeforeground="#4dc3ff", relief="flat", highlightthickness=2, highlightbackground="#5cb85c", highlightcolor="#5cb85c", command=self._try_login)
+        self.login_btn = login_btn = tk.Button(self.card, text="Login", font=("Segoe UI", 12, "bold"), fg="#fff", bg="#18191c", activebackground="#23272e", activeforeground="#4dc3ff", relief="flat", highlightthickness=2, highlightbackground="#5cb85c", highlightcolor="#5cb85c", command=self._try_login)
         login_btn.pack(pady=(4, 12), ipadx=18, ipady=4)
         # Social icons (placeholders)
         icon_frame = tk.Frame(self.card, bg="#18191c")
@@ -78,6 +91,8 @@ class AuthManager:
         messagebox.showinfo("Forgot Password", "Please contact support to reset your password.")
 
     def _try_login(self):
+        if self._login_pending:
+            return
         email = self.username_entry.get()
         password = self.password_entry.get()
 
@@ -109,26 +124,41 @@ class AuthManager:
                 self.login_window.destroy()
             return
 
-        # Regular API login
+        # Regular API login, off the UI thread so the window stays responsive
+        self._login_pending = True
+        self.login_btn.config(state='disabled')
+        self.error_label.config(text="Signing in...", fg="#4dc3ff")
+        threading.Thread(target=lambda: self._login_results.put(auth_client.login(email, password)),
+                         name="login", daemon=True).start()
+        self.login_window.after(50, self._poll_login)
+
+    def _poll_login(self):
         try:
-            response = requests.post(
-                "https://kritanpayslipmanager.vercel.app/api/auth/login",
-                json={"email": email, "password": password},
-                timeout=10
-            )
-            if response.status_code == 200 and response.json().get("success"):
-                self.login_success = True
-                self.user_data = response.json().get("data", {})
-                if self.login_window.winfo_exists():
-                    self.login_window.destroy()
-            else:
-                error_msg = response.json().get("message", "Invalid email or password.")
-                self.error_label.config(text=error_msg)
-                self.password_entry.delete(0, 'end')
-        except Exception as e:
-            self.error_label.config(text=f"Login error: {e}")
+            success, result = self._login_results.get_nowait()
+        except queue.Empty:
+            if self.login_window.winfo_exists():
+                self.login_window.after(50, self._poll_login)
+            return
+        self._login_pending = False
+        if not self.login_window.winfo_exists():
+            return
+        if success:
+            self.login_success = True
+            self.user_data = result
+            self.token_store.save(result)
+            self.login_window.destroy()
+        else:
+            self.login_btn.config(state='normal')
+            self.error_label.config(text=result, fg="#d9534f")
             self.password_entry.delete(0, 'end')
 
+    def start_session_refresh(self, on_refresh=None):
+        """Keep the cached session fresh in the background while the app runs."""
+        session = (self.user_data or {}).get("session", {})
+        if not session.get("refresh_token") or session.get("access_token") == "dev-mode-token":
+            return None
+        return auth_client.SessionRefresher(self.user_data, self.token_store, on_refresh).start()
+
     def _on_close(self):
         self.login_success = False
         if self.login_window.winfo_exists():
@@ -0,0 +1,77 @@
+import json
+import os
+import sys
+import time
+
+DEFAULT_TOKEN_FILE = os.path.join(os.path.expanduser("~"), ".payslip_manager", "session.dat")
+
+
+class TokenStore:
+    """Keeps the login session on disk so a still-valid token skips the login screen.
+
+    On Windows the file is encrypted for the current user with DPAPI; elsewhere
+    it is written with owner-only permissions.
+    """
+    def __init__(self, path=DEFAULT_TOKEN_FILE):
+        self.path = path
+
+    def load(self, min_valid_seconds=60):
+        """Return the cached user_data if its access token is valid for a while longer."""
+        try:
+            with open(self.path, 'rb') as f:
+                user_data = json.loads(_unprotect(f.read()).decode('utf-8'))
+            expires_at = float(user_data.get("session", {}).get("expires_at", 0))
+        except Exception:
+            return None
+        if expires_at - time.time() < min_valid_seconds:
+            return None
+        return user_data
+
+    def save(self, user_data):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            data = _protect(json.dumps(user_data).encode('utf-8'))
+            tmp_file = self.path + ".tmp"
+            fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_file, self.path)
+        except Exception:
+            pass
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+if sys.platform == "win32":
+    import ctypes
+    from ctypes import wintypes
+
+    class _DataBlob(ctypes.Structure):
+        _fields_ = [("cbData", wintypes.DWORD), ("pbData", ctypes.POINTER(ctypes.c_char))]
+
+    def _crypt(func, data):
+        buffer = ctypes.create_string_buffer(data, len(data))
+        blob_in = _DataBlob(len(data), ctypes.cast(buffer, ctypes.POINTER(ctypes.c_char)))
+        blob_out = _DataBlob()
+        if not func(ctypes.byref(blob_in), None, None, None, None, 0, ctypes.byref(blob_out)):
+            raise ctypes.WinError()
+        try:
+            return ctypes.string_at(blob_out.pbData, blob_out.cbData)
+        finally:
+            ctypes.windll.kernel32.LocalFree(blob_out.pbData)
+
+    def _protect(data):
+        return _crypt(ctypes.windll.crypt32.CryptProtectData, data)
+
+    def _unprotect(data):
+        return _crypt(ctypes.windll.crypt32.CryptUnprotectData, data)
+else:
+    def _protect(data):
+        return data
+
+    def _unprotect(data):
+        return data
@@ -1,6 +1,9 @@
+import queue
+import threading
 import tkinter as tk
 from tkinter import messagebox
-import requests
+from . import auth_client
+from .token_store import TokenStore
 
 class UserManager(tk.Frame):
     """A user management UI component for showing user info, licenses, and logout."""
@@ -35,22 +38,30 @@ class UserManager(tk.Frame):
         if not access_token:
             tk.messagebox.showerror("Logout Failed", "No access token found.")
             return
+        # Talk to the server off the UI thread; the result comes back through after()
+        self._logout_results = queue.Queue()
+        threading.Thread(target=lambda: self._logout_results.put(auth_client.logout(access_token)),
+                         name="logout", daemon=True).start()
+        self.after(50, self._poll_logout)
+
+    def _poll_logout(self):
         try:
-            response = requests.post(
-                "https://kritanpayslipmanager.vercel.app/api/auth/logout",
-                headers={"Authorization": f"Bearer {access_token}"},
-                timeout=10
-            )
-            if response.status_code == 200:
-                tk.messagebox.showinfo("Logged Out", "You have been logged out.")
-                self.master.master.auth_manager.login_success = False
-                root = self.master.master.root
-                try:
-                    if root.winfo_exists():
-                        root.destroy()
-                except Exception:
-                    pass
-            else:
-                tk.messagebox.showerror("Logout Failed", response.json().get("message", "Unknown error."))
-        except Exception as e:
-            tk.messagebox.showerror("Logout Failed", str(e))
+            success, error = self._logout_results.get_nowait()
+        except queue.Empty:
+            if self.winfo_exists():
+                self.after(50, self._poll_logout)
+            return
+        if success:
+            TokenStore().clear()
+            tk.messagebox.showinfo("Logged Out", "You have been logged out.")
+            auth_manager = getattr(self.winfo_toplevel(), "auth_manager", None)
+            if auth_manager is not None:
+                auth_manager.login_success = False
+            root = self.winfo_toplevel()
+            try:
+                if root.winfo_exists():
+                    root.destroy()
+            except Exception:
+                pass
+        else:
+            tk.messagebox.showerror("Logout Failed", error)
@@ -2,12 +2,9 @@ import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 
-# Add socket for internet connectivity check
-import socket
-
 # Import update manager components
 try:
-    from update import check_for_update, AUTO_UPDATE_CHECK_ON_START
+    from update import check_for_update_async, download_update, AUTO_UPDATE_CHECK_ON_START
     UPDATE_AVAILABLE = True
 except ImportError as e:
     print(f"Warning: Update package not available - {e}")
@@ -15,18 +12,44 @@ except ImportError as e:
     UPDATE_AVAILABLE = False
 
 import threading
-from tkinter import filedialog, messagebox, scrolledtext, END, BOTH, RIGHT, X, WORD, LEFT, TclError
+from tkinter import filedialog, messagebox, scrolledtext, Canvas, PhotoImage, END, BOTH, RIGHT, X, WORD, LEFT, TclError
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from payslip.cache_manager import PDFCacheManager
 from payslip.payslip_processor import PayslipProcessor
+from payslip.archive_reader import is_archive
+from payslip.job_journal import find_incomplete_jobs
+from payslip.payslip_processor import JOURNAL_DIR_NAME
+from payslip.job_scheduler import JobScheduler, DEFAULT_MAX_CONCURRENT_JOBS, RUNNING, CANCELLED, default_output_file
+from payslip.distributed import (ShardCoordinator, ShardWorker, DEFAULT_SHARD_SIZE, DEFAULT_LEASE_TIMEOUT,
+                                 DEFAULT_IDLE_TIMEOUT)
+from payslip.output_partition import PARTITION_MODES, PARTITION_NONE, DEFAULT_PARTITION_SIZE
+from payslip.pdf_optimizer import DEFAULT_IMAGE_DPI
+from payslip.prescan import PreScanner
+from payslip.thumbnails import ThumbnailCache, ThumbnailRenderer, thumbnail_key, THUMBNAIL_DIR_NAME, THUMBNAIL_SIZE
+from diagnostics import StallWatchdog
 from login.auth_manager import AuthManager
+from server import DEFAULT_HOST, DEFAULT_PORT
+from server.job_client import JobClient, RemoteJob
+import argparse
+import base64
 import hashlib
+import itertools
+import multiprocessing
+import socket
 import tkinter.simpledialog
 import subprocess
 import tkinterdnd2  # We'll need to add this to requirements.txt
 
 CACHE_DIR = os.path.join(os.path.dirname(__file__), "cache")
+PARTITION_LABELS = {"none": "Single file", "employee": "Per employee", "month": "Per month",
+                    "tax_year": "Per tax year", "pages": "By page count"}
+# Retry delays of the startup update check while offline (doubling up to the max), and how often
+# to re-check a pending required update
+UPDATE_RETRY_MS = 30000
+UPDATE_RETRY_MAX_MS = 30 * 60 * 1000
+UPDATE_WAIT_MS = 5000
+PREVIEW_ROW_HEIGHT = THUMBNAIL_SIZE[1] + 12
 
 class PDFPayslipOrganizerApp:
     def __init__(self, root, user_data=None):
@@ -43,21 +66,98 @@ class PDFPayslipOrganizerApp:
         self.cache_manager = PDFCacheManager(CACHE_DIR)
         self.processor = PayslipProcessor(self.cache_manager, self.log_message, self.update_progress)
         self.is_processing = False
-        self.processing_thread = None
+        self.scheduler = JobScheduler(self._create_job_processor, on_job_finished=self._on_job_finished)
+        self.remote_jobs = []
+        # Never reused, so ids stay unique in the jobs view after Clear Finished
+        self._remote_job_ids = itertools.count(1)
+        # Current retry delay of the startup update check while offline; None while online
+        self._update_retry_ms = None
+        # Reads a selected folder ahead of Start; gives way to running jobs
+        self.prescanner = PreScanner(self.cache_manager,
+                                     on_update=lambda status: self.root.after(0, self._on_prescan_update, status),
+                                     should_yield=lambda: self.is_processing,
+                                     workers=getattr(self.scheduler.pool, '_max_workers', 4))
         self.setup_ui()
+        self.watchdog = StallWatchdog(self.root).start()
         self.update_memory_usage()
+        self.update_responsiveness()
+        self.root.after(500, self._offer_resume_last_job)
         
         # Register window destroy event to clean up threads
         self.root.protocol("WM_DELETE_WINDOW", self.safe_destroy)
 
-    def check_internet_connection(self):
-        """Check if the device has an internet connection."""
-        try:
-            # Try to connect to a reliable server (Google's DNS)
-            socket.create_connection(("8.8.8.8", 53), timeout=3)
-            return True
-        except OSError:
-            return False
+    def start_update_check(self, force_check=False, manual=False):
+        """Check connectivity and updates in the background; the result arrives on the Tk thread."""
+        if not UPDATE_AVAILABLE:
+            if manual:
+                messagebox.showinfo("Update", "Update system not available")
+            return
+        # Offline retries stay quiet; going offline was logged once
+        if manual or self._update_retry_ms is None:
+            self.log_message("Checking for updates...", "Info")
+        check_for_update_async(
+            getattr(self, 'version', "1.0.0"),
+            lambda result: self.root.after(0, self._on_update_check_result, result, manual),
+            force_check=force_check)
+
+    def _on_update_check_result(self, result, manual=False):
+        if not self.root.winfo_exists():
+            return
+        if not result["online"]:
+            if manual:
+                self.log_message("Cannot check for updates: No internet connection", "Error")
+                messagebox.showwarning("Internet Connection Required",
+                                       "Connect to the internet and try again.")
+            else:
+                if self._update_retry_ms is None:
+                    self.log_message("No internet connection detected. Will check for updates again once online.", "Warning")
+                    self._update_retry_ms = UPDATE_RETRY_MS
+                else:
+                    self._update_retry_ms = min(self._update_retry_ms * 2, UPDATE_RETRY_MAX_MS)
+                self.root.after(self._update_retry_ms, self.start_update_check)
+            return
+        self._update_retry_ms = None
+        if result["error"]:
+            self.log_message(f"Update check failed: {result['error']}", "Warning")
+            if manual:
+                messagebox.showwarning("Update Check Failed", "Unable to verify if you have the latest version.")
+        elif result["update_available"]:
+            self._download_update(result["latest_version"])
+        else:
+            source = " (cached)" if result["from_cache"] else ""
+            self.log_message(f"No updates available. Running latest version{source}.", "Success")
+            if manual:
+                messagebox.showinfo("Update", "You are running the latest version.")
+
+    def _download_update(self, latest_version):
+        """Fetch the new release in the background (as a delta patch when possible)."""
+        self.log_message(f"Downloading version {latest_version}...", "Info")
+
+        def worker():
+            try:
+                bundle_path = download_update(getattr(self, 'version', "1.0.0"))
+                self.root.after(0, self.log_message, f"Update downloaded to {bundle_path}", "Success")
+            except Exception as e:
+                bundle_path = None
+                self.root.after(0, self.log_message, f"Update download failed: {str(e)}", "Warning")
+            self.root.after(0, self._require_update, latest_version, False, bundle_path)
+
+        threading.Thread(target=worker, name="update-download", daemon=True).start()
+
+    def _require_update(self, latest_version, notified=False, bundle_path=None):
+        """Close for a required update, waiting for running jobs so no work is lost."""
+        if any(job.is_active for job in self._all_jobs()):
+            if not notified:
+                self.log_message(f"Version {latest_version} is required. The application will close "
+                                 "once the current jobs finish.", "Warning")
+            self.root.after(UPDATE_WAIT_MS, self._require_update, latest_version, True, bundle_path)
+            return
+        location = f"\n\nThe update has been downloaded to:\n{bundle_path}" if bundle_path else ""
+        messagebox.showinfo("Update Required",
+                            "A new version is available and required to continue.\n\n"
+                            "The application will now close. Please install the update before running again."
+                            + location)
+        self.safe_destroy()
 
     def setup_ui(self):
         style = ttk.Style(theme="cosmo")
@@ -80,14 +180,20 @@ class PDFPayslipOrganizerApp:
         self.notebook.pack(fill=BOTH, expand=True, pady=(10, 0))
         self.notebook.add(ttk.Frame(self.notebook), text="🗂️ Organize")
         self.notebook.add(ttk.Frame(self.notebook), text="📄 Log")
+        self.notebook.add(ttk.Frame(self.notebook), text="🔍 Search")
+        self.notebook.add(ttk.Frame(self.notebook), text="🖼️ Preview")
         self.notebook.add(ttk.Frame(self.notebook), text="⚙️ Settings")
         self.notebook.add(ttk.Frame(self.notebook), text="👤 Users")
         organize_tab = self.notebook.winfo_children()[0]
         log_tab = self.notebook.winfo_children()[1]
-        settings_tab = self.notebook.winfo_children()[2]
-        users_tab = self.notebook.winfo_children()[3]
+        search_tab = self.notebook.winfo_children()[2]
+        preview_tab = self.notebook.winfo_children()[3]
+        settings_tab = self.notebook.winfo_children()[4]
+        users_tab = self.notebook.winfo_children()[5]
         self._setup_organize_tab(organize_tab)
         self._setup_log_tab(log_tab)
+        self._setup_search_tab(search_tab)
+        self._setup_preview_tab(preview_tab)
         self._setup_settings_tab(settings_tab)
         self._setup_users_tab(users_tab)
 
@@ -96,6 +202,9 @@ class PDFPayslipOrganizerApp:
         footer.pack(fill=X, pady=(0, 5))
         self.memory_label = ttk.Label(footer, text="Memory: 0 MB", font=("Segoe UI", 9), bootstyle=SECONDARY)
         self.memory_label.pack(side=RIGHT, padx=5)
+        self.stall_label = ttk.Label(footer, text="UI: OK", font=("Segoe UI", 9), bootstyle=SECONDARY, cursor="hand2")
+        self.stall_label.pack(side=RIGHT, padx=5)
+        self.stall_label.bind('<Button-1>', lambda e: self._export_stall_report())
         ttk.Label(footer, text="© 2025 Kritan Rimal", font=("Segoe UI", 9), bootstyle=SECONDARY).pack(side=LEFT, padx=5)
 
     def _setup_organize_tab(self, tab):
@@ -111,9 +220,11 @@ class PDFPayslipOrganizerApp:
         self.input_entry.dnd_bind('<<Drop>>', self._on_drop)
         
         # Add drag and drop hint
-        hint_label = ttk.Label(tab, text="💡 Drag and drop PDF files or folders here", 
+        hint_label = ttk.Label(tab, text="💡 Drag and drop PDF files, ZIP archives or folders here", 
                              font=("Segoe UI", 10, "italic"), bootstyle=SECONDARY)
         hint_label.pack(pady=(5,0))
+        self.prescan_label = ttk.Label(tab, text="", font=("Segoe UI", 10), bootstyle=INFO)
+        self.prescan_label.pack(pady=(2, 0))
         
         ttk.Button(input_frame, text="Browse", command=self.select_input_dir, bootstyle=OUTLINE).pack(side=LEFT, padx=5)
         # Recent folders dropdown
@@ -143,6 +254,18 @@ class PDFPayslipOrganizerApp:
         self.organize_log_area = scrolledtext.ScrolledText(log_frame, wrap=WORD, state='disabled', font=('Consolas', 10), height=8, bg=organize_log_bg, fg=organize_log_fg)
         self.organize_log_area.pack(fill=BOTH, expand=True)
 
+        # Job queue: each dropped or started folder runs as its own job
+        jobs_frame = ttk.Frame(tab)
+        jobs_frame.pack(fill=X, pady=(10, 0), padx=30)
+        ttk.Label(jobs_frame, text="Jobs:", font=("Segoe UI", 10, "bold"), bootstyle=SECONDARY).pack(anchor='w', pady=(0, 2))
+        columns = ("job", "status", "progress", "rate", "output")
+        self.jobs_tree = ttk.Treeview(jobs_frame, columns=columns, show='headings', height=4, bootstyle=INFO)
+        for column, heading, width in (("job", "Job", 180), ("status", "Status", 80), ("progress", "Progress", 70),
+                                       ("rate", "Pages/s", 70), ("output", "Output", 260)):
+            self.jobs_tree.heading(column, text=heading)
+            self.jobs_tree.column(column, width=width, stretch=(column == "output"))
+        self.jobs_tree.pack(fill=X)
+
         # Status label for organize tab
         self.status_label = ttk.Label(tab, text="Ready", font=("Segoe UI", 10, "italic"), bootstyle=INFO)
         self.status_label.pack(fill=X, padx=30, pady=(0, 2))
@@ -154,12 +277,15 @@ class PDFPayslipOrganizerApp:
         self.start_btn.pack(side=LEFT, padx=5)
         self.cancel_btn = ttk.Button(button_frame, text="⏹ Cancel", command=self.cancel_processing, state='disabled', bootstyle=DANGER, width=12)
         self.cancel_btn.pack(side=LEFT, padx=5)
+        ttk.Button(button_frame, text="⬆ Priority", command=self._raise_job_priority, bootstyle=OUTLINE, width=10).pack(side=LEFT, padx=5)
+        ttk.Button(button_frame, text="Clear Finished", command=self._clear_finished_jobs, bootstyle=OUTLINE).pack(side=LEFT, padx=5)
 
     def _on_recent_selected(self, event):
         folder = self.recent_var.get()
         if folder:
             self.input_entry.delete(0, END)
             self.input_entry.insert(0, folder)
+            self._start_prescan(folder)
 
     def _on_drop_folder(self, event):
         # Only handle first folder
@@ -168,6 +294,7 @@ class PDFPayslipOrganizerApp:
             if os.path.isdir(folder):
                 self.input_entry.delete(0, END)
                 self.input_entry.insert(0, folder)
+                self._start_prescan(folder)
 
     def _setup_log_tab(self, tab):
         log_label = ttk.Label(tab, text="Log:", font=("Segoe UI", 11, "bold"), bootstyle=SECONDARY)
@@ -194,6 +321,203 @@ class PDFPayslipOrganizerApp:
         self.snackbar = ttk.Label(tab, text="", font=("Segoe UI", 10), bootstyle=SUCCESS)
         self.snackbar.pack(anchor='s', pady=2)
         
+    def _setup_search_tab(self, tab):
+        search_frame = ttk.Frame(tab)
+        search_frame.pack(fill=X, padx=10, pady=(10, 5))
+        ttk.Label(search_frame, text="Search:", font=("Segoe UI", 11)).pack(side=LEFT, padx=(0, 8))
+        self.search_var = ttk.StringVar()
+        search_entry = ttk.Entry(search_frame, textvariable=self.search_var, font=('Segoe UI', 11))
+        search_entry.pack(side=LEFT, fill=X, expand=True)
+        search_entry.bind('<Return>', lambda e: self._run_search())
+        ttk.Button(search_frame, text="Search", command=self._run_search, bootstyle=INFO).pack(side=LEFT, padx=5)
+        ttk.Label(tab, text="💡 Find processed payslips by name, phrase or reference number. Double-click to open.",
+                  font=("Segoe UI", 10, "italic"), bootstyle=SECONDARY).pack(anchor='w', padx=10)
+
+        results_frame = ttk.Frame(tab)
+        results_frame.pack(fill=BOTH, expand=True, padx=10, pady=(5, 0))
+        columns = ("source", "page", "score", "snippet")
+        self.search_tree = ttk.Treeview(results_frame, columns=columns, show='headings', bootstyle=INFO)
+        for column, heading, width in (("source", "File", 220), ("page", "Page", 50), ("score", "Score", 60),
+                                       ("snippet", "Match", 420)):
+            self.search_tree.heading(column, text=heading)
+            self.search_tree.column(column, width=width, stretch=(column == "snippet"))
+        scrollbar = ttk.Scrollbar(results_frame, orient='vertical', command=self.search_tree.yview)
+        self.search_tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=RIGHT, fill='y')
+        self.search_tree.pack(fill=BOTH, expand=True)
+        self.search_tree.bind('<Double-1>', self._open_search_result)
+        self.search_results = []
+
+        self.search_status = ttk.Label(tab, text="", font=("Segoe UI", 10, "italic"), bootstyle=INFO)
+        self.search_status.pack(fill=X, padx=10, pady=(2, 10))
+
+    def _run_search(self):
+        query = self.search_var.get().strip()
+        if not query:
+            return
+        self.search_status.config(text="Searching...")
+
+        def worker():
+            try:
+                results, error = self.cache_manager.text_index.search(query), None
+            except Exception as e:
+                results, error = [], str(e)
+            self.root.after(0, self._show_search_results, query, results, error)
+
+        threading.Thread(target=worker, name="search", daemon=True).start()
+
+    def _show_search_results(self, query, results, error):
+        self.search_tree.delete(*self.search_tree.get_children())
+        self.search_results = results
+        if error:
+            self.search_status.config(text=f"Search failed: {error}")
+            return
+        for i, result in enumerate(results):
+            name = result["source"].split("::", 1)[-1]
+            self.search_tree.insert('', END, iid=str(i), values=(
+                os.path.basename(name), result["page"], f"{result['score']:.2f}", result["snippet"]))
+        self.search_status.config(text=f"{len(results)} matches for \"{query}\"")
+
+    def _open_search_result(self, event):
+        selection = self.search_tree.selection()
+        if not selection:
+            return
+        # Archive members are opened by opening their archive
+        path = self.search_results[int(selection[0])]["source"].split("::", 1)[0]
+        if not os.path.exists(path):
+            messagebox.showwarning("File Not Found", f"{path} no longer exists.")
+            return
+        try:
+            if sys.platform == "win32":
+                os.startfile(path)
+            else:
+                subprocess.Popen(["open" if sys.platform == "darwin" else "xdg-open", path])
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to open {path}: {e}")
+
+    def _setup_preview_tab(self, tab):
+        top_frame = ttk.Frame(tab)
+        top_frame.pack(fill=X, padx=10, pady=(10, 5))
+        self.preview_label = ttk.Label(top_frame, text="The sorted pages of a job appear here when it finishes.",
+                                       font=("Segoe UI", 10, "italic"), bootstyle=INFO)
+        self.preview_label.pack(side=LEFT, fill=X, expand=True)
+        ttk.Button(top_frame, text="Show Selected Job", command=self._preview_selected_job,
+                   bootstyle=OUTLINE).pack(side=RIGHT)
+
+        # Only the rows on screen are drawn, so runs of any size scroll smoothly
+        list_frame = ttk.Frame(tab)
+        list_frame.pack(fill=BOTH, expand=True, padx=10, pady=(0, 10))
+        self.preview_scrollbar = ttk.Scrollbar(list_frame, orient='vertical', command=self._scroll_preview)
+        self.preview_scrollbar.pack(side=RIGHT, fill='y')
+        self.preview_canvas = Canvas(list_frame, highlightthickness=0)
+        self.preview_canvas.pack(fill=BOTH, expand=True)
+        self.preview_canvas.bind('<Configure>', lambda e: self._draw_preview())
+        self.preview_canvas.bind('<MouseWheel>', lambda e: self._scroll_preview('scroll', -1 if e.delta > 0 else 1))
+        self.preview_canvas.bind('<Button-4>', lambda e: self._scroll_preview('scroll', -1))
+        self.preview_canvas.bind('<Button-5>', lambda e: self._scroll_preview('scroll', 1))
+        self.preview_entries = []
+        self.preview_top = 0
+        self.preview_images = {}
+        self.preview_failed = set()
+        self.preview_redraw_pending = False
+        self.thumbnail_renderer = ThumbnailRenderer(
+            ThumbnailCache(os.path.join(CACHE_DIR, THUMBNAIL_DIR_NAME)),
+            lambda key, data: self.root.after(0, self._on_thumbnail_ready, key, data))
+
+    def _on_job_finished(self, job):
+        """Scheduler callback (job thread): preview the output order of the job that just finished."""
+        if job.processor is not None and job.processor.sorted_pages:
+            try:
+                self.root.after(0, self._show_preview, job)
+            except (TclError, RuntimeError):
+                pass
+
+    def _preview_selected_job(self):
+        for job in self._selected_jobs():
+            if getattr(job, 'processor', None) is not None and job.processor.sorted_pages:
+                self._show_preview(job)
+                return
+        messagebox.showinfo("Preview", "Select a finished local job in the Organize tab first.")
+
+    def _show_preview(self, job):
+        self.preview_entries = job.processor.sorted_pages
+        self.preview_top = 0
+        self.preview_failed.clear()
+        self.preview_label.config(text=f"Job #{job.id} {job.name}: {len(self.preview_entries)} pages in output order")
+        self._draw_preview()
+
+    def _visible_preview_rows(self):
+        return max(1, self.preview_canvas.winfo_height() // PREVIEW_ROW_HEIGHT)
+
+    def _scroll_preview(self, action, amount, unit='units'):
+        if action == 'moveto':
+            self.preview_top = int(float(amount) * len(self.preview_entries))
+        else:
+            self.preview_top += int(amount) * (self._visible_preview_rows() if unit == 'pages' else 1)
+        self._draw_preview()
+
+    def _draw_preview(self):
+        """Redraw the visible rows and ask the renderer for their missing thumbnails."""
+        canvas = self.preview_canvas
+        colors = ttk.Style().colors
+        canvas.delete('all')
+        canvas.configure(background=colors.bg)
+        total = len(self.preview_entries)
+        rows = self._visible_preview_rows()
+        self.preview_top = max(0, min(self.preview_top, total - rows))
+        thumb_width, thumb_height = THUMBNAIL_SIZE
+        text_x = thumb_width + 25
+        images = {}
+        pending = []
+        # One extra row for the partly visible one at the bottom
+        for i, entry in enumerate(self.preview_entries[self.preview_top:self.preview_top + rows + 1]):
+            y = i * PREVIEW_ROW_HEIGHT + 6
+            key = thumbnail_key(entry)
+            image = self.preview_images.get(key)
+            if image is None:
+                data = self.thumbnail_renderer.cache.peek(key)
+                if data is not None:
+                    image = PhotoImage(data=base64.b64encode(data).decode('ascii'))
+            if image is not None:
+                images[key] = image
+                canvas.create_image(10 + thumb_width // 2, y + thumb_height // 2, image=image)
+            else:
+                failed = key in self.preview_failed
+                canvas.create_rectangle(10, y, 10 + thumb_width, y + thumb_height, outline=colors.border)
+                canvas.create_text(10 + thumb_width // 2, y + thumb_height // 2, fill=colors.secondary,
+                                   text="No preview" if failed else "…", font=("Segoe UI", 9))
+                if not failed:
+                    pending.append(entry)
+            source = entry["source"]
+            canvas.create_text(text_x, y + 8, anchor='nw', fill=colors.fg, font=("Segoe UI", 11, "bold"),
+                               text=f"#{self.preview_top + i + 1}   {entry['date']:%d %b %Y}")
+            canvas.create_text(text_x, y + 34, anchor='nw', fill=colors.fg, font=("Segoe UI", 10),
+                               text=os.path.basename(source.split("::", 1)[-1]))
+            canvas.create_text(text_x, y + 56, anchor='nw', fill=colors.secondary, font=("Segoe UI", 9),
+                               text=f"Page {entry['page']}  ·  {source}")
+        # Only on-screen rows keep their PhotoImages alive
+        self.preview_images = images
+        self.thumbnail_renderer.request(pending)
+        if total:
+            self.preview_scrollbar.set(self.preview_top / total, min(1.0, (self.preview_top + rows) / total))
+        else:
+            self.preview_scrollbar.set(0, 1)
+
+    def _on_thumbnail_ready(self, key, data):
+        if data is None:
+            self.preview_failed.add(key)
+        # Thumbnails arrive in bursts; redraw once for all of them
+        if not self.preview_redraw_pending:
+            self.preview_redraw_pending = True
+            self.root.after_idle(self._redraw_preview)
+
+    def _redraw_preview(self):
+        self.preview_redraw_pending = False
+        try:
+            self._draw_preview()
+        except TclError:
+            pass
+
     def log_message(self, message, level="Info"):
         """Thread-safe logging method."""
         if threading.current_thread() is threading.main_thread():
@@ -248,7 +572,6 @@ class PDFPayslipOrganizerApp:
             # Only apply filter if the window exists
             try:
                 self._apply_log_filter()
-                self.root.update_idletasks()
             except TclError:
                 pass
                 
@@ -297,26 +620,7 @@ class PDFPayslipOrganizerApp:
         
         def check_for_updates():
             try:
-                # Check internet connection first
-                if not self.check_internet_connection():
-                    self.log_message("Cannot check for updates: No internet connection", "Error")
-                    
-                    # Keep showing dialog until internet is available or user cancels
-                    while not self.check_internet_connection():
-                        response = messagebox.askretrycancel("Internet Connection Required", 
-                                                          "This application requires an internet connection to check for updates.\n\n"
-                                                          "• Please connect to the internet and click 'Retry'\n"
-                                                          "• Click 'Cancel' to skip the update check",
-                                                          icon="warning")
-                        if not response:  # User clicked Cancel
-                            return
-                    
-                    self.log_message("Internet connection detected", "Info")
-                
-                self.log_message("Checking for updates...", "Info")
-                messagebox.showinfo("Update", "Update system not available")
-            except ImportError:
-                messagebox.showinfo("Update", "Update system not available")
+                self.start_update_check(force_check=True, manual=True)
             except Exception as e:
                 self.log_message(f"Update error: {str(e)}", "Error")
         
@@ -337,7 +641,84 @@ class PDFPayslipOrganizerApp:
         # Store combobox reference for cleanup during application close
         self.theme_combo = theme_combo
         theme_combo.bind('<<ComboboxSelected>>', self._on_theme_change)
-        
+
+        # Read-ahead for input folders on slow network shares
+        performance_frame = ttk.LabelFrame(tab, text="Performance", bootstyle=INFO)
+        performance_frame.pack(fill=X, padx=10, pady=5, ipady=5)
+        prefetch_row = ttk.Frame(performance_frame)
+        prefetch_row.pack(fill=X, padx=10, pady=(5, 0))
+        ttk.Label(prefetch_row, text="Prefetch files ahead:", font=("Segoe UI", 10)).pack(side=LEFT)
+        self.prefetch_depth_var = ttk.IntVar(value=self.processor.prefetch_depth)
+        ttk.Spinbox(prefetch_row, from_=0, to=64, width=5, textvariable=self.prefetch_depth_var,
+                    command=self._on_prefetch_change).pack(side=LEFT, padx=(5, 15))
+        ttk.Label(prefetch_row, text="Buffer (MB):", font=("Segoe UI", 10)).pack(side=LEFT)
+        self.prefetch_mb_var = ttk.IntVar(value=self.processor.prefetch_bytes // (1024 * 1024))
+        ttk.Spinbox(prefetch_row, from_=1, to=4096, width=6, textvariable=self.prefetch_mb_var,
+                    command=self._on_prefetch_change).pack(side=LEFT, padx=5)
+        jobs_row = ttk.Frame(performance_frame)
+        jobs_row.pack(fill=X, padx=10, pady=(5, 0))
+        ttk.Label(jobs_row, text="Jobs running at once:", font=("Segoe UI", 10)).pack(side=LEFT)
+        self.max_jobs_var = ttk.IntVar(value=DEFAULT_MAX_CONCURRENT_JOBS)
+        ttk.Spinbox(jobs_row, from_=1, to=16, width=5, textvariable=self.max_jobs_var,
+                    command=self._on_prefetch_change).pack(side=LEFT, padx=5)
+        ttk.Label(performance_frame, text="Set prefetch to 0 to read files one at a time.",
+                  font=("Segoe UI", 9), bootstyle=SECONDARY).pack(anchor='w', padx=10, pady=(0, 5))
+
+        # Output partitioning: large exports become several smaller PDFs written in parallel
+        output_frame = ttk.LabelFrame(tab, text="Output", bootstyle=INFO)
+        output_frame.pack(fill=X, padx=10, pady=5, ipady=5)
+        partition_row = ttk.Frame(output_frame)
+        partition_row.pack(fill=X, padx=10, pady=(5, 0))
+        ttk.Label(partition_row, text="Split output:", font=("Segoe UI", 10)).pack(side=LEFT)
+        self.partition_var = ttk.StringVar(value=PARTITION_LABELS[PARTITION_NONE])
+        partition_combo = ttk.Combobox(partition_row, textvariable=self.partition_var, state='readonly', width=16,
+                                       values=[PARTITION_LABELS[mode] for mode in PARTITION_MODES], bootstyle=INFO)
+        partition_combo.pack(side=LEFT, padx=(5, 15))
+        partition_combo.bind('<<ComboboxSelected>>', lambda e: self._on_output_change())
+        ttk.Label(partition_row, text="Pages per file:", font=("Segoe UI", 10)).pack(side=LEFT)
+        self.partition_size_var = ttk.IntVar(value=DEFAULT_PARTITION_SIZE)
+        ttk.Spinbox(partition_row, from_=10, to=100000, increment=50, width=7, textvariable=self.partition_size_var,
+                    command=self._on_output_change).pack(side=LEFT, padx=5)
+        ttk.Label(output_frame, text="Split files and a manifest.json go to a folder named after the output file.",
+                  font=("Segoe UI", 9), bootstyle=SECONDARY).pack(anchor='w', padx=10, pady=(0, 5))
+        optimize_row = ttk.Frame(output_frame)
+        optimize_row.pack(fill=X, padx=10, pady=(0, 5))
+        self.optimize_var = ttk.BooleanVar(value=False)
+        ttk.Checkbutton(optimize_row, text="Optimize size (share fonts/logos, compress)", variable=self.optimize_var,
+                        command=self._on_output_change, bootstyle="round-toggle").pack(side=LEFT)
+        ttk.Label(optimize_row, text="Downsample scans to DPI (0 = off):", font=("Segoe UI", 10)).pack(side=LEFT, padx=(15, 0))
+        self.image_dpi_var = ttk.IntVar(value=0)
+        ttk.Spinbox(optimize_row, from_=0, to=600, increment=25, width=5, textvariable=self.image_dpi_var,
+                    command=self._on_output_change).pack(side=LEFT, padx=5)
+
+        # Profiling: for investigating slow runs; costs nothing while switched off
+        diagnostics_frame = ttk.LabelFrame(tab, text="Diagnostics", bootstyle=INFO)
+        diagnostics_frame.pack(fill=X, padx=10, pady=5, ipady=5)
+        self.profile_var = ttk.BooleanVar(value=False)
+        ttk.Checkbutton(diagnostics_frame, text="Profile processing runs (CPU and memory)", variable=self.profile_var,
+                        command=self._on_profile_change, bootstyle="round-toggle").pack(anchor='w', padx=10, pady=(5, 0))
+        ttk.Label(diagnostics_frame, text="Runs are several times slower; a report folder is written next to each output file.",
+                  font=("Segoe UI", 9), bootstyle=SECONDARY).pack(anchor='w', padx=10, pady=(0, 5))
+
+        # Optional job server: send jobs to a more powerful machine on the LAN
+        server_frame = ttk.LabelFrame(tab, text="Job Server", bootstyle=INFO)
+        server_frame.pack(fill=X, padx=10, pady=5, ipady=5)
+        server_row = ttk.Frame(server_frame)
+        server_row.pack(fill=X, padx=10, pady=(5, 0))
+        ttk.Label(server_row, text="Server URL:", font=("Segoe UI", 10)).pack(side=LEFT)
+        self.server_url_var = ttk.StringVar(value=f"http://{DEFAULT_HOST}:{DEFAULT_PORT}")
+        ttk.Entry(server_row, textvariable=self.server_url_var, width=28).pack(side=LEFT, padx=5)
+        ttk.Label(server_row, text="Token:", font=("Segoe UI", 10)).pack(side=LEFT)
+        self.server_token_var = ttk.StringVar()
+        ttk.Entry(server_row, textvariable=self.server_token_var, width=12, show='*').pack(side=LEFT, padx=5)
+        ttk.Button(server_row, text="Test", command=self._test_job_server, bootstyle=OUTLINE).pack(side=LEFT, padx=5)
+        self.use_server_var = ttk.BooleanVar(value=False)
+        ttk.Checkbutton(server_frame, text="Send new jobs to the server", variable=self.use_server_var,
+                        bootstyle="round-toggle").pack(anchor='w', padx=10, pady=(5, 0))
+        self.server_upload_var = ttk.BooleanVar(value=True)
+        ttk.Checkbutton(server_frame, text="Upload payslips (untick if the server sees the same folder paths)",
+                        variable=self.server_upload_var, bootstyle="round-toggle").pack(anchor='w', padx=10, pady=(5, 5))
+
         # Keyboard shortcuts info
         shortcuts_frame = ttk.LabelFrame(tab, text="Help", bootstyle=INFO)
         shortcuts_frame.pack(fill=X, padx=10, pady=5, ipady=5)
@@ -349,10 +730,10 @@ class PDFPayslipOrganizerApp:
         # Help/About
         ttk.Button(shortcuts_frame, text="Help / About", command=self._show_help, bootstyle=OUTLINE).pack(anchor='w', padx=10, pady=(0, 10))
 
-        # Tesseract OCR status
-        tesseract_status, tesseract_ok = self._check_tesseract_status()
-        self.tesseract_label = ttk.Label(tab, text=tesseract_status, font=("Segoe UI", 10))
+        # Tesseract OCR status, checked in the background since it runs a subprocess
+        self.tesseract_label = ttk.Label(tab, text="Checking Tesseract...", font=("Segoe UI", 10))
         self.tesseract_label.pack(anchor='w', padx=10, pady=(5, 0))
+        self._refresh_tesseract_status()
         
         def install_ocr():
             ocr_path = os.path.join(os.path.dirname(__file__), 'OCR.exe')
@@ -366,10 +747,7 @@ class PDFPayslipOrganizerApp:
         
         ttk.Button(tab, text="Install OCR.exe", command=install_ocr, bootstyle=PRIMARY).pack(anchor='w', padx=10, pady=(0, 5))
         
-        def recheck_tesseract():
-            status, _ = self._check_tesseract_status()
-            self.tesseract_label.config(text=status)
-        ttk.Button(tab, text="Re-check Tesseract", command=recheck_tesseract, bootstyle=INFO).pack(anchor='w', padx=10, pady=(0, 10))
+        ttk.Button(tab, text="Re-check Tesseract", command=self._refresh_tesseract_status, bootstyle=INFO).pack(anchor='w', padx=10, pady=(0, 10))
 
     def _on_theme_change(self, event):
         # Check if the application is still running
@@ -384,6 +762,39 @@ class PDFPayslipOrganizerApp:
             # Tcl error is raised when the window is being destroyed
             pass
 
+    def _on_prefetch_change(self):
+        try:
+            self.processor.prefetch_depth = max(0, int(self.prefetch_depth_var.get()))
+            self.processor.prefetch_bytes = max(1, int(self.prefetch_mb_var.get())) * 1024 * 1024
+            self.scheduler.set_max_concurrent_jobs(self.max_jobs_var.get())
+        except (TclError, ValueError):
+            pass
+
+    def _on_output_change(self):
+        modes = {label: mode for mode, label in PARTITION_LABELS.items()}
+        self.processor.partition_mode = modes.get(self.partition_var.get(), PARTITION_NONE)
+        self.processor.optimize_output = bool(self.optimize_var.get())
+        try:
+            self.processor.partition_size = max(1, int(self.partition_size_var.get()))
+            self.processor.image_dpi = max(0, int(self.image_dpi_var.get())) or None
+        except (TclError, ValueError):
+            pass
+
+    def _on_profile_change(self):
+        self.processor.profile_runs = bool(self.profile_var.get())
+        if self.processor.profile_runs:
+            self.log_message("Profiling enabled for new jobs", "Info")
+
+    def _job_client(self):
+        return JobClient(self.server_url_var.get().strip(), self.server_token_var.get().strip() or None)
+
+    def _test_job_server(self):
+        def check():
+            ok = self._job_client().health()
+            self.log_message(f"Job server {'reachable' if ok else 'not reachable'}: {self.server_url_var.get()}",
+                             "Success" if ok else "Error")
+        threading.Thread(target=check, daemon=True).start()
+
     def _show_help(self):
         messagebox.showinfo("About", "Payslip Manager by Kreetan\nVersion 1.0\n© 2025 Kreetan Rimal\n\n- Drag & drop a folder to Organize tab\n- Use keyboard shortcuts for speed\n- Filter log messages in Log tab\n- More features coming soon!")
 
@@ -392,46 +803,173 @@ class PDFPayslipOrganizerApp:
         if dir_path:
             self.input_entry.delete(0, END)
             self.input_entry.insert(0, dir_path)
+            self._start_prescan(dir_path)
+
+    def _start_prescan(self, input_path):
+        """Start reading the selected folder in the background so Start mostly just merges."""
+        if not (os.path.isdir(input_path) or is_archive(input_path)):
+            return
+        self.prescanner.start(input_path)
+        self.prescan_label.config(text=f"Pre-scanning {os.path.basename(os.path.normpath(input_path))}...")
+
+    def _on_prescan_update(self, status):
+        try:
+            if status["input_path"] != self.input_entry.get().strip():
+                return  # A scan of a folder that is no longer selected
+            if status["state"] == "failed":
+                self.prescan_label.config(text=f"Pre-scan failed: {status['error']}")
+                return
+            seconds = status["estimated_seconds"] or 0
+            estimate = f"{seconds:.0f}s" if seconds < 90 else f"{seconds / 60:.0f} min"
+            text = (f"{status['files']} files, {status['pages']} pages ({status['ocr_pages']} need OCR) · "
+                    f"{status['cached_pages']} already read · estimated run ~{estimate}")
+            if status["state"] == "warming":
+                text += " · pre-reading..."
+            self.prescan_label.config(text=text)
+        except TclError:
+            pass
 
     def start_processing(self):
+        input_dir = self.input_entry.get().strip()
+        if not input_dir or not (os.path.isdir(input_dir) or is_archive(input_dir)):
+            messagebox.showerror("Error", "Please select a valid input directory or archive")
+            return
+        # The job reads whatever the pre-scan has not cached yet
+        self.prescanner.cancel()
+        self.prescan_label.config(text="")
+        self._queue_job(input_dir)
+
+    def _queue_job(self, input_path, priority=0):
+        """Queue a folder or archive as a job; it starts as soon as a slot is free."""
+        self._on_prefetch_change()  # Pick up values typed into the spinboxes
         if not self.is_processing:
-            input_dir = self.input_entry.get().strip()
-            if not input_dir or not os.path.isdir(input_dir):
-                messagebox.showerror("Error", "Please select a valid input directory")
-                return
-            self.is_processing = True
-            self.start_btn.config(state='disabled')
-            self.cancel_btn.config(state='normal')
             self.log_area.config(state='normal')
             self.log_area.delete(1.0, END)
             self.log_area.config(state='disabled')
+        if self.use_server_var.get() and self.server_url_var.get().strip():
+            job = self._queue_remote_job(input_path, priority)
+        else:
+            job = self.scheduler.submit(input_path, priority=priority)
+        if job is None:
+            self.log_message(f"Already queued: {input_path}", "Warning")
+            return None
+        self.log_message(f"Queued job {job.id}: {input_path}", "Info")
+        self.jobs_tree.insert('', END, iid=str(job.id), values=self._job_row(job))
+        if not self.is_processing:
+            self.is_processing = True
+            self.cancel_btn.config(state='normal')
             self.status_label.config(text="Processing...")
-            output_file = os.path.join(input_dir, "output", "arranged_payslips.pdf")
-            os.makedirs(os.path.dirname(output_file), exist_ok=True)
-            self.processing_thread = threading.Thread(target=self._process_thread, args=(input_dir, output_file))
-            self.processing_thread.daemon = True
-            self.processing_thread.start()
+            self._refresh_jobs_view()
+        return job
 
-    def _process_thread(self, input_dir, output_file):
-        self.processor.is_processing = True
-        self.processor.process_payslips(input_dir, output_file)
-        self.is_processing = False
-        
-        # Schedule UI updates on the main thread
-        def update_ui():
-            self.start_btn.config(state='normal')
-            self.cancel_btn.config(state='disabled')
-            self.status_label.config(text="Done" if self.processor.is_processing == False else "Cancelled")
-        
-        self.root.after(0, update_ui)
+    def _queue_remote_job(self, input_path, priority=0):
+        if any(job.is_active and job.input_path == input_path for job in self.remote_jobs):
+            return None
+        job = RemoteJob(self._job_client(), input_path, priority, upload=self.server_upload_var.get())
+        job.id = f"r{next(self._remote_job_ids)}"
+        job.log_callback = lambda message, level="Info": self.log_message(f"[{job.name} @server] {message}", level)
+        self.remote_jobs.append(job)
+        return job.start()
+
+    def _all_jobs(self):
+        return list(self.scheduler.jobs) + self.remote_jobs
+
+    def _create_job_processor(self, job):
+        """Build a processor for one job, tagging its log lines with the job name."""
+        def log(message, level="Info"):
+            self.log_message(f"[{job.name}] {message}", level)
+
+        def progress(value):
+            job.progress = value
+
+        processor = PayslipProcessor(self.cache_manager, log, progress)
+        processor.prefetch_depth = self.processor.prefetch_depth
+        processor.prefetch_bytes = self.processor.prefetch_bytes
+        processor.partition_mode = self.processor.partition_mode
+        processor.partition_size = self.processor.partition_size
+        processor.optimize_output = self.processor.optimize_output
+        processor.image_dpi = self.processor.image_dpi
+        processor.profile_runs = self.processor.profile_runs
+        return processor
+
+    def _job_row(self, job):
+        return (f"#{job.id} {job.name}", job.status, f"{job.progress:.0f}%",
+                f"{job.throughput:.1f}" if job.started_at else "-", job.output_file)
+
+    def _refresh_jobs_view(self):
+        """Poll job state into the jobs table and overall progress bar while jobs are active."""
+        try:
+            if not self.root.winfo_exists():
+                return
+            for job in self._all_jobs():
+                if self.jobs_tree.exists(str(job.id)):
+                    self.jobs_tree.item(str(job.id), values=self._job_row(job))
+            batch = [job for job in self._all_jobs() if job.status != CANCELLED]
+            if batch:
+                self._do_update_progress(sum(job.progress for job in batch) / len(batch))
+            active = [job for job in self._all_jobs() if job.is_active]
+            if active:
+                running = sum(1 for job in active if job.status == RUNNING)
+                self.status_label.config(text=f"Processing... {running} running, {len(active) - running} queued")
+                self.root.after(1000, self._refresh_jobs_view)
+            else:
+                self.is_processing = False
+                self.cancel_btn.config(state='disabled')
+                self.status_label.config(text="Done")
+        except TclError:
+            pass
+
+    def _selected_jobs(self):
+        selected = set(self.jobs_tree.selection())
+        return [job for job in self._all_jobs() if str(job.id) in selected]
+
+    def _raise_job_priority(self):
+        for job in self._selected_jobs():
+            if isinstance(job, RemoteJob):
+                continue  # The server orders its own queue
+            self.scheduler.set_priority(job, job.priority + 1)
+            self.log_message(f"Job {job.id} priority raised to {job.priority}", "Info")
+
+    def _clear_finished_jobs(self):
+        self.scheduler.clear_finished()
+        self.remote_jobs = [job for job in self.remote_jobs if job.is_active]
+        remaining = {str(job.id) for job in self._all_jobs()}
+        for iid in self.jobs_tree.get_children():
+            if iid not in remaining:
+                self.jobs_tree.delete(iid)
+
+    def _offer_resume_last_job(self):
+        """Offer to resume the most recent job that was interrupted or cancelled."""
+        try:
+            jobs = find_incomplete_jobs(os.path.join(CACHE_DIR, JOURNAL_DIR_NAME))
+        except Exception:
+            return
+        for job in jobs:
+            input_dir = job.get("input_dir", "")
+            if not (os.path.isdir(input_dir) or is_archive(input_dir)):
+                continue
+            if messagebox.askyesno("Resume Last Job",
+                                   f"A previous job did not finish:\n\n{input_dir}\n"
+                                   f"{job.get('pages_done', 0)} pages already processed.\n\n"
+                                   "Resume it now?"):
+                self.input_entry.delete(0, END)
+                self.input_entry.insert(0, input_dir)
+                self.log_message(f"Resuming last job for {input_dir}", "Info")
+                self.start_processing()
+            return
 
     def cancel_processing(self):
-        self.processor.is_processing = False
-        self.status_label.config(text="⏹ Processing cancelled")
-        self.log_message("🛑 Processing cancelled by user")
-        self.start_btn.config(state='normal')
-        self.cancel_btn.config(state='disabled')
-        self.update_progress(0)
+        """Cancel the selected jobs, or every queued and running job if none is selected."""
+        jobs = self._selected_jobs() or [job for job in self._all_jobs() if job.is_active]
+        for job in jobs:
+            if isinstance(job, RemoteJob):
+                job.cancel()
+            else:
+                self.scheduler.cancel(job)
+        if jobs and not self.scheduler.active_jobs() and not any(job.is_active for job in self.remote_jobs):
+            self.status_label.config(text="⏹ Processing cancelled")
+            self.update_progress(0)
+        self.log_message(f"🛑 Cancelled {len(jobs)} job(s)")
         
     def update_progress(self, value):
         """Thread-safe progress update method."""
@@ -453,7 +991,6 @@ class PDFPayslipOrganizerApp:
                 
             if hasattr(self, 'progress_bar') and self.progress_bar.winfo_exists():
                 self.progress_bar['value'] = value
-                self.root.update_idletasks()
         except TclError:
             # Window likely destroyed
             pass
@@ -491,10 +1028,51 @@ class PDFPayslipOrganizerApp:
             # Window likely destroyed
             pass
 
+    def update_responsiveness(self):
+        """Show the UI stall count and worst event loop latency next to the memory figure."""
+        try:
+            if not self.root.winfo_exists():
+                return
+            stats = self.watchdog.summary()
+            if stats["stalls"]:
+                self.stall_label.config(text=f"UI stalls: {stats['stalls']} (worst {stats['worst_ms']:.0f} ms)",
+                                        bootstyle=WARNING)
+            else:
+                self.stall_label.config(text=f"UI: OK ({stats['p95_ms']:.0f} ms)")
+            self.root.after(1000, self.update_responsiveness)
+        except TclError:
+            pass
+
+    def _export_stall_report(self):
+        path = filedialog.asksaveasfilename(title="Export UI Responsiveness Report", defaultextension=".txt",
+                                            initialfile="ui_stalls.txt", filetypes=[("Text files", "*.txt")])
+        if not path:
+            return
+        try:
+            self.watchdog.export(path)
+            self.log_message(f"UI responsiveness report saved to {path}", "Success")
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to save report: {e}")
+
     def _setup_users_tab(self, tab):
         from login.user_manager import UserManager
-        user_manager = UserManager(tab, user_data=self.user_data)
-        user_manager.pack(fill="both", expand=True, padx=10, pady=10)
+        self.user_manager = UserManager(tab, user_data=self.user_data)
+        self.user_manager.pack(fill="both", expand=True, padx=10, pady=10)
+
+    def on_session_refreshed(self, user_data):
+        """Adopt a session refreshed in the background so logout uses the current token."""
+        self.user_data = user_data
+        if hasattr(self, 'user_manager'):
+            self.user_manager.session = user_data.get("session", {})
+
+    def _refresh_tesseract_status(self):
+        def check():
+            status, _ = self._check_tesseract_status()
+            try:
+                self.root.after(0, lambda: self.tesseract_label.config(text=status))
+            except (TclError, RuntimeError):
+                pass
+        threading.Thread(target=check, name="tesseract-check", daemon=True).start()
 
     def _check_tesseract_status(self):
         """Check if Tesseract is installed and return version or prompt for OCR.exe."""
@@ -521,29 +1099,29 @@ class PDFPayslipOrganizerApp:
     def _on_drop(self, event):
         """Handle drag and drop of files and folders."""
         try:
-            # Get the dropped data
-            data = event.data
-            
-            # Handle Windows paths
-            if os.name == 'nt':
-                data = data.replace('{', '').replace('}', '')
-                paths = [p.strip() for p in data.split('} {')]
-            else:
-                paths = data.split()
+            # Tk hands over a Tcl list; braces protect paths containing spaces
+            paths = self.root.tk.splitlist(event.data)
             
-            # Use the first valid path
+            inputs = []
             for path in paths:
                 if os.path.exists(path):
                     if os.path.isfile(path) and path.lower().endswith('.pdf'):
                         # If it's a PDF file, use its directory
                         path = os.path.dirname(path)
-                    if os.path.isdir(path):
-                        self.input_entry.delete(0, END)
-                        self.input_entry.insert(0, path)
-                        self.log_message(f"Added folder: {path}", "Info")
-                        return
+                    if (os.path.isdir(path) or is_archive(path)) and path not in inputs:
+                        inputs.append(path)
             
-            self.log_message("Please drop a PDF file or folder", "Warning")
+            if not inputs:
+                self.log_message("Please drop a PDF file, archive or folder", "Warning")
+            elif len(inputs) == 1:
+                self.input_entry.delete(0, END)
+                self.input_entry.insert(0, inputs[0])
+                self.log_message(f"Added folder: {inputs[0]}", "Info")
+                self._start_prescan(inputs[0])
+            else:
+                # Several folders dropped at once: queue each as its own job
+                for path in inputs:
+                    self._queue_job(path)
             
         except Exception as e:
             self.log_message(f"Error handling dropped files: {str(e)}", "Error")
@@ -551,13 +1129,17 @@ class PDFPayslipOrganizerApp:
     def safe_destroy(self):
         """Safely destroy the window by stopping threads and cleaning up bindings"""
         # First, stop any ongoing processing
-        if self.is_processing and self.processing_thread:
-            self.is_processing = False
-            try:
-                if self.processing_thread.is_alive():
-                    self.processing_thread.join(0.1)  # Give thread a little time to exit
-            except:
-                pass
+        self.is_processing = False
+        try:
+            self.scheduler.shutdown()
+        except Exception:
+            pass
+        try:
+            self.prescanner.cancel()
+            self.thumbnail_renderer.close()
+            self.watchdog.stop()
+        except Exception:
+            pass
                 
         # Unbind theme change event which is causing issues
         try:
@@ -589,7 +1171,137 @@ class PDFPayslipOrganizerApp:
             # Window might already be in the process of being destroyed
             pass
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Payslip Manager")
+    parser.add_argument("--server", action="store_true", help="run the local HTTP job server instead of the GUI")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="job server bind address (0.0.0.0 for the LAN)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="job server port")
+    parser.add_argument("--data-dir", default=os.path.join(os.path.dirname(__file__), "server_data"),
+                        help="where the job server keeps its queue, uploads and results")
+    parser.add_argument("--max-jobs", type=int, default=DEFAULT_MAX_CONCURRENT_JOBS, help="jobs the server runs at once")
+    parser.add_argument("--token", default=os.environ.get("PAYSLIP_SERVER_TOKEN"),
+                        help="shared token clients must send (default: $PAYSLIP_SERVER_TOKEN)")
+    distributed = parser.add_argument_group("distributed processing")
+    distributed.add_argument("--coordinator", metavar="INPUT",
+                             help="split INPUT into shards in --workdir, wait for workers and merge")
+    distributed.add_argument("--worker", action="store_true", help="claim and process shards from --workdir")
+    distributed.add_argument("--workdir", help="shared work directory reachable by every node")
+    distributed.add_argument("--output", help="merged output file for --coordinator")
+    distributed.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE, help="pages per shard")
+    distributed.add_argument("--lease-timeout", type=int, default=DEFAULT_LEASE_TIMEOUT,
+                             help="seconds without a heartbeat before a shard is re-leased")
+    distributed.add_argument("--no-participate", action="store_true",
+                             help="coordinator only merges and does not process shards itself")
+    distributed.add_argument("--exit-when-idle", action="store_true", help="worker exits when no shard is left")
+    distributed.add_argument("--idle-timeout", type=int, default=DEFAULT_IDLE_TIMEOUT,
+                             help="seconds an --exit-when-idle worker waits for a first job")
+    distributed.add_argument("--partition", choices=PARTITION_MODES, default=PARTITION_NONE,
+                             help="coordinator writes one file per employee, month, tax year or page block")
+    distributed.add_argument("--partition-size", type=int, default=DEFAULT_PARTITION_SIZE,
+                             help="pages per file with --partition pages")
+    distributed.add_argument("--optimize", action="store_true",
+                             help="deduplicate shared fonts/images and compress streams in the output")
+    distributed.add_argument("--image-dpi", type=int, nargs="?", const=DEFAULT_IMAGE_DPI,
+                             help=f"with --optimize, downsample scans to this DPI (default {DEFAULT_IMAGE_DPI})")
+    parser.add_argument("--profile", action="store_true",
+                        help="profile processing runs (CPU and allocations) and write a report next to the output")
+    index = parser.add_argument_group("payslip index queries")
+    index.add_argument("--find", action="store_true", help="list indexed payslips matching the filters below")
+    index.add_argument("--employee", help="employee name (every word must match)")
+    index.add_argument("--employee-id", help="exact employee ID")
+    index.add_argument("--employer", help="exact employer name")
+    index.add_argument("--from", dest="date_from", help="earliest payment date")
+    index.add_argument("--to", dest="date_to", help="latest payment date")
+    index.add_argument("--min-amount", type=float, help="minimum amount (see --amount-field)")
+    index.add_argument("--max-amount", type=float, help="maximum amount (see --amount-field)")
+    index.add_argument("--amount-field", choices=("net", "gross", "tax"), default="net",
+                       help="amount the --min/--max-amount filters apply to")
+    index.add_argument("--search", metavar="QUERY", help="full-text search of processed payslips")
+    index.add_argument("--limit", type=int, default=50, help="maximum number of --search results")
+    return parser.parse_args(argv)
+
+def run_distributed(args):
+    """Headless coordinator or worker node for sharded processing."""
+    def log(message, level="Info"):
+        print(f"[{level}] {message}", flush=True)
+
+    if not args.workdir:
+        sys.exit("--workdir is required for --coordinator and --worker")
+    processor = PayslipProcessor(PDFCacheManager(CACHE_DIR), log)
+    processor.partition_mode = args.partition
+    processor.partition_size = args.partition_size
+    processor.optimize_output = args.optimize
+    processor.image_dpi = args.image_dpi
+    try:
+        if args.coordinator:
+            output_file = args.output or default_output_file(args.coordinator)
+            os.makedirs(os.path.dirname(output_file), exist_ok=True)
+            coordinator = ShardCoordinator(processor, args.workdir, args.shard_size,
+                                           args.lease_timeout, participate=not args.no_participate)
+            if args.profile:
+                ok = processor.run_profiled(coordinator.run, args.coordinator, output_file, report_file=output_file)
+            else:
+                ok = coordinator.run(args.coordinator, output_file)
+            return 0 if ok else 1
+        worker = ShardWorker(processor, args.workdir, args.lease_timeout)
+        if args.profile:
+            report_file = os.path.join(args.workdir, f"worker_{socket.gethostname()}_{os.getpid()}")
+            processor.run_profiled(worker.run, exit_when_idle=args.exit_when_idle, idle_timeout=args.idle_timeout,
+                                   report_file=report_file)
+        else:
+            worker.run(exit_when_idle=args.exit_when_idle, idle_timeout=args.idle_timeout)
+        return 0
+    except KeyboardInterrupt:
+        processor.is_processing = False
+        return 1
+
+def run_index_query(args):
+    """Print indexed payslips matching the --find filters."""
+    from dateutil import parser as date_parser
+    date_from = date_parser.parse(args.date_from, dayfirst=True).date() if args.date_from else None
+    date_to = date_parser.parse(args.date_to, dayfirst=True).date() if args.date_to else None
+    index = PDFCacheManager(CACHE_DIR).metadata_index
+    try:
+        results = index.find(employee=args.employee, employee_id=args.employee_id, employer=args.employer,
+                             date_from=date_from, date_to=date_to, min_amount=args.min_amount,
+                             max_amount=args.max_amount, amount_field=args.amount_field)
+    finally:
+        index.close()
+    for row in results:
+        payment_date = row["payment_date"].strftime("%Y-%m-%d") if row["payment_date"] else "----------"
+        net = f"{row['net']:.2f}" if row["net"] is not None else "-"
+        print(f"{payment_date}  {row['employee_name'] or '?':<30}  {net:>12}  {row['source']} (page {row['page']})")
+    print(f"{len(results)} payslips")
+    return 0
+
+def run_text_search(args):
+    """Print the pages best matching --search, most relevant first."""
+    index = PDFCacheManager(CACHE_DIR).text_index
+    try:
+        results = index.search(args.search, limit=args.limit)
+    finally:
+        index.close()
+    for result in results:
+        print(f"{result['score']:7.2f}  {result['source']} (page {result['page']})")
+        print(f"         {result['snippet']}")
+    print(f"{len(results)} matches")
+    return 0
+
 if __name__ == "__main__":
+    # Partitions are merged in worker processes, which a frozen build must support
+    multiprocessing.freeze_support()
+    args = parse_args()
+    if args.find:
+        sys.exit(run_index_query(args))
+    if args.search:
+        sys.exit(run_text_search(args))
+    if args.server:
+        from server import run_server
+        run_server(args.data_dir, args.host, args.port, args.max_jobs, args.token)
+        sys.exit(0)
+    if args.coordinator or args.worker:
+        sys.exit(run_distributed(args))
+
     # Define the app version - this should match the version in your remote repository
     CURRENT_VERSION = "1.0.0"
     
@@ -617,68 +1329,20 @@ if __name__ == "__main__":
     # Only create the main application window after successful login
     root = ttk.Window("Payslip Organizer", "cosmo", resizable=(True, True))
     app = PDFPayslipOrganizerApp(root, user_data=user_data)  # Pass user data to constructor
+    if args.profile:
+        app.profile_var.set(True)
+        app._on_profile_change()
     
     # Store current version in app
     app.version = CURRENT_VERSION
+
+    # Refresh the cached login session in the background before it expires
+    auth_manager.start_session_refresh(
+        on_refresh=lambda data: root.after(0, app.on_session_refreshed, data))
     
-    # Check internet connection first
-    internet_connected = app.check_internet_connection()
-      # Force update check after successful login if internet is available
-    if UPDATE_AVAILABLE and internet_connected:
-        try:
-            app.log_message("Checking for updates...", "Info")
-            update_available = check_for_update(CURRENT_VERSION, force_check=True)
-            if update_available:
-                messagebox.showinfo("Update Required", 
-                                   "A new version is available and required to continue.\n\n"
-                                   "The application will now close. Please install the update before running again.")
-                app.safe_destroy()
-                sys.exit(0)
-            else:
-                app.log_message("No updates available. Running latest version.", "Success")
-        except Exception as e:
-            app.log_message(f"Update check failed: {str(e)}", "Warning")
-            response = messagebox.askquestion("Update Check Failed", 
-                                            "Unable to verify if you have the latest version.\n\n"
-                                            "Do you want to continue anyway?")
-            if response != 'yes':
-                app.safe_destroy()
-                sys.exit(0)
-    elif UPDATE_AVAILABLE and not internet_connected:
-        # Force internet connection - application cannot run offline
-        app.log_message("No internet connection detected. Internet is required to run this application.", "Error")
-        
-        # Loop until internet is available or user quits
-        while not app.check_internet_connection():
-            response = messagebox.askretrycancel("Internet Connection Required", 
-                                              "This application requires an internet connection to check for updates.\n\n"
-                                              "• Please connect to the internet and click 'Retry'\n"
-                                              "• Click 'Cancel' to exit the application",
-                                              icon="warning")
-            if not response:  # User clicked Cancel
-                app.safe_destroy()
-                sys.exit(0)
-                
-        # User has connected to internet, now check for updates
-        try:
-            app.log_message("Internet connection detected. Checking for updates...", "Info")
-            update_available = check_for_update(CURRENT_VERSION, force_check=True)
-            if update_available:
-                messagebox.showinfo("Update Required", 
-                                   "A new version is available and required to continue.\n\n"
-                                   "The application will now close. Please install the update before running again.")
-                app.safe_destroy()
-                sys.exit(0)
-            else:
-                app.log_message("No updates available. Running latest version.", "Success")
-        except Exception as e:
-            app.log_message(f"Update check failed: {str(e)}", "Warning")
-            response = messagebox.askquestion("Update Check Failed", 
-                                            "Unable to verify if you have the latest version.\n\n"
-                                            "Do you want to continue anyway?")
-            if response != 'yes':
-                app.safe_destroy()
-                sys.exit(0)
+    # Connectivity and update checks run in the background so the window is usable right away
+    if UPDATE_AVAILABLE:
+        root.after(0, app.start_update_check)
     
     # Start the main application
     root.mainloop()
@@ -0,0 +1,129 @@
+import io
+import os
+import tarfile
+import threading
+import zipfile
+
+ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz')
+
+
+def is_archive(path):
+    """Return True if the path looks like a supported archive file."""
+    return path.lower().endswith(ARCHIVE_EXTENSIONS) and os.path.isfile(path)
+
+
+def archive_stem(path):
+    """File name of an archive without its (possibly double) extension: acme.v2.tar.gz -> acme.v2."""
+    name = os.path.basename(path)
+    for extension in sorted(ARCHIVE_EXTENSIONS, key=len, reverse=True):
+        if name.lower().endswith(extension):
+            return name[:-len(extension)]
+    return os.path.splitext(name)[0]
+
+
+class ArchiveMember:
+    """A PDF stored inside an archive, read on demand without extracting to disk."""
+    def __init__(self, reader, archive_path, name, size, crc=None, mtime=None):
+        self.reader = reader
+        self.archive_path = archive_path
+        self.name = name
+        self.size = size
+        self.crc = crc
+        self.mtime = mtime
+
+    @property
+    def display_name(self):
+        return f"{os.path.basename(self.archive_path)}/{self.name}"
+
+    @property
+    def stem(self):
+        # The member's folders are part of the stem: jan/payslips.pdf and feb/payslips.pdf must not collide
+        member_stem = os.path.splitext(self.name)[0].strip("/").replace("/", "_").replace("\\", "_")
+        return f"{archive_stem(self.archive_path)}_{member_stem}"
+
+    def cache_key(self):
+        # Zip entries carry a CRC; tar entries only have size and mtime
+        fingerprint = self.crc if self.crc is not None else self.mtime
+        return f"{self.archive_path}!{self.name}_{self.size}_{fingerprint}"
+
+    def read(self):
+        return self.reader.read(self)
+
+    def open(self):
+        return io.BytesIO(self.read())
+
+    def __eq__(self, other):
+        return (isinstance(other, ArchiveMember)
+                and (self.archive_path, self.name) == (other.archive_path, other.name))
+
+    def __hash__(self):
+        return hash((self.archive_path, self.name))
+
+    def __str__(self):
+        return f"{self.archive_path}::{self.name}"
+
+    def __repr__(self):
+        return f"ArchiveMember({str(self)!r})"
+
+
+class ArchiveReader:
+    """Keeps archive handles open for a run so members can be streamed out of them."""
+    def __init__(self):
+        self._handles = {}
+        self._locks = {}
+        self._members = {}
+        self._lock = threading.Lock()
+
+    def members(self, archive_path):
+        """List the PDF members of a ZIP or TAR archive."""
+        handle, lock = self._get_handle(archive_path)
+        members = []
+        with lock:
+            if isinstance(handle, zipfile.ZipFile):
+                for info in handle.infolist():
+                    if not info.is_dir() and info.filename.lower().endswith('.pdf'):
+                        members.append(ArchiveMember(self, archive_path, info.filename,
+                                                     info.file_size, crc=info.CRC))
+            else:
+                for info in handle.getmembers():
+                    if info.isfile() and info.name.lower().endswith('.pdf'):
+                        members.append(ArchiveMember(self, archive_path, info.name,
+                                                     info.size, mtime=info.mtime))
+        return members
+
+    def member(self, archive_path, name):
+        """Look up a single PDF member by name, or None if the archive has no such PDF."""
+        if archive_path not in self._members:
+            self._members[archive_path] = {m.name: m for m in self.members(archive_path)}
+        return self._members[archive_path].get(name)
+
+    def read(self, member):
+        """Return the bytes of a single archive member."""
+        handle, lock = self._get_handle(member.archive_path)
+        with lock:
+            if isinstance(handle, zipfile.ZipFile):
+                return handle.read(member.name)
+            extracted = handle.extractfile(member.name)
+            return extracted.read() if extracted else b""
+
+    def close(self):
+        with self._lock:
+            for handle in self._handles.values():
+                try:
+                    handle.close()
+                except Exception:
+                    pass
+            self._handles.clear()
+            self._locks.clear()
+            self._members.clear()
+
+    def _get_handle(self, archive_path):
+        with self._lock:
+            if archive_path not in self._handles:
+                if zipfile.is_zipfile(archive_path):
+                    self._handles[archive_path] = zipfile.ZipFile(archive_path)
+                else:
+                    self._handles[archive_path] = tarfile.open(archive_path)
+                # Neither ZipFile nor TarFile is safe for concurrent reads of one handle
+                self._locks[archive_path] = threading.Lock()
+            return self._handles[archive_path], self._locks[archive_path]
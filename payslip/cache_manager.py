@@ -1,12 +1,34 @@
 import os
 import hashlib
 import pickle
+import threading
+from .payslip_index import PayslipIndex, INDEX_FILE_NAME
+from .text_index import TextIndex, TEXT_INDEX_FILE_NAME
 
 class PDFCacheManager:
     def __init__(self, cache_dir):
         self.cache_dir = cache_dir
         self.cache_file = os.path.join(self.cache_dir, "date_cache.pkl")
         self.date_cache = self.load_cache()
+        self._metadata_index = None
+        self._text_index = None
+        self._index_lock = threading.Lock()
+
+    @property
+    def metadata_index(self):
+        """Payslip metadata index kept next to the date cache, opened on first use."""
+        with self._index_lock:
+            if self._metadata_index is None:
+                self._metadata_index = PayslipIndex(os.path.join(self.cache_dir, INDEX_FILE_NAME))
+            return self._metadata_index
+
+    @property
+    def text_index(self):
+        """Full-text index of page text kept next to the date cache, opened on first use."""
+        with self._index_lock:
+            if self._text_index is None:
+                self._text_index = TextIndex(os.path.join(self.cache_dir, TEXT_INDEX_FILE_NAME))
+            return self._text_index
 
     def get_file_hash(self, file_path):
         try:
@@ -16,6 +38,12 @@ class PDFCacheManager:
         except Exception:
             return hashlib.md5(file_path.encode()).hexdigest()
 
+    def get_source_hash(self, source):
+        """Hash a PDF source, which is either a file path or an archive member."""
+        if hasattr(source, 'cache_key'):
+            return hashlib.md5(source.cache_key().encode()).hexdigest()
+        return self.get_file_hash(source)
+
     def load_cache(self):
         try:
             if os.path.exists(self.cache_file):
@@ -27,7 +55,18 @@ class PDFCacheManager:
 
     def save_cache(self):
         try:
-            with open(self.cache_file, 'wb') as f:
-                pickle.dump(self.date_cache, f)
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Write to a temp file and swap it in so concurrent jobs never leave a torn cache
+            tmp_file = f"{self.cache_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_file, 'wb') as f:
+                # Copy first: worker threads may add entries while we pickle
+                pickle.dump(dict(self.date_cache), f)
+            os.replace(tmp_file, self.cache_file)
         except Exception:
             pass
+        for index in (self._metadata_index, self._text_index):
+            if index is not None:
+                try:
+                    index.flush()
+                except Exception:
+                    pass
@@ -0,0 +1,338 @@
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from .job_journal import JobJournal, remove_split_pages_dir, split_pages_dir
+
+DEFAULT_SHARD_SIZE = 50
+DEFAULT_LEASE_TIMEOUT = 120
+# How long an exit-when-idle worker waits for a first job to appear
+DEFAULT_IDLE_TIMEOUT = 600
+POLL_INTERVAL = 2.0
+
+# Work directory layout, one subdirectory per job:
+#   <workdir>/<job_id>/job.json          job description written by the coordinator
+#   <workdir>/<job_id>/shards/<n>.json   page references to date
+#   <workdir>/<job_id>/claims/<n>.lock   held by the worker processing shard n; its mtime is the heartbeat
+#   <workdir>/<job_id>/results/<n>.json  payment dates found for shard n
+#   <workdir>/<job_id>/done              written once the coordinator has merged
+
+
+def _write_json_atomic(path, payload):
+    tmp_file = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(payload, f)
+    os.replace(tmp_file, path)
+
+
+def _read_json(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _page_ref(page, cache_key, origin=None):
+    """Describe a page so any node can open it: a path, or an archive path plus member name."""
+    if hasattr(page, 'archive_path'):
+        return {"path": page.archive_path, "member": page.name, "key": cache_key, "origin": origin}
+    return {"path": page, "member": None, "key": cache_key, "origin": origin}
+
+
+def _page_from_ref(processor, ref):
+    if ref["member"]:
+        return processor.archive_reader.member(ref["path"], ref["member"])
+    processor.page_cache_keys[ref["path"]] = ref["key"]
+    if ref.get("origin"):
+        processor.page_origins[ref["path"]] = tuple(ref["origin"])
+    return ref["path"]
+
+
+def worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class ShardWorker:
+    """Claims shards from a shared work directory and writes the payment date of each page.
+
+    Claims are lock files created with O_EXCL; the holder touches its lock
+    every few seconds. A lock not touched within lease_timeout (measured on
+    the file server's clock) belongs to a dead worker and is re-leased. In the rare case two workers end up on the
+    same shard, both write identical results, so double work is harmless.
+    """
+    def __init__(self, processor, workdir, lease_timeout=DEFAULT_LEASE_TIMEOUT, name=None):
+        self.processor = processor
+        self.workdir = workdir
+        self.lease_timeout = lease_timeout
+        self.name = name or worker_id()
+        self.shards_done = 0
+
+    def _log(self, message, level="Info"):
+        if self.processor.log_callback:
+            self.processor.log_callback(message, level)
+
+    def run(self, exit_when_idle=False, job_dir=None, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        """Process shards until stopped; with exit_when_idle, return once no shard is left to claim.
+
+        Workers are often started before the coordinator has written its job,
+        so an idle worker only exits once it has seen a job, or after
+        idle_timeout seconds without one.
+        """
+        self.processor.is_processing = True
+        self._log(f"Worker {self.name} watching {self.workdir}")
+        seen_job = False
+        waiting_since = time.time()
+        while self.processor.is_processing:
+            job_dirs = [job_dir] if job_dir else self._active_job_dirs()
+            seen_job = seen_job or any(os.path.exists(os.path.join(d, "job.json")) for d in job_dirs)
+            worked = False
+            for current_dir in job_dirs:
+                while self.processor.is_processing and self.process_one(current_dir):
+                    worked = True
+            if exit_when_idle and not worked:
+                finished = (job_dir is None or os.path.exists(os.path.join(job_dir, "done"))
+                            or self._all_done(job_dir))
+                if finished and (seen_job or time.time() - waiting_since >= idle_timeout):
+                    break
+            if not worked:
+                time.sleep(POLL_INTERVAL)
+        self.processor.cache_manager.save_cache()
+        return self.shards_done
+
+    def _active_job_dirs(self):
+        try:
+            names = sorted(os.listdir(self.workdir))
+        except OSError:
+            return []
+        job_dirs = []
+        for name in names:
+            job_dir = os.path.join(self.workdir, name)
+            if os.path.exists(os.path.join(job_dir, "job.json")) and not os.path.exists(os.path.join(job_dir, "done")):
+                job_dirs.append(job_dir)
+        return job_dirs
+
+    def _all_done(self, job_dir):
+        for shard in self._shard_names(job_dir):
+            if not os.path.exists(os.path.join(job_dir, "results", f"{shard}.json")):
+                return False
+        return True
+
+    def _shard_names(self, job_dir):
+        try:
+            return sorted(name[:-len(".json")] for name in os.listdir(os.path.join(job_dir, "shards"))
+                          if name.endswith(".json"))
+        except OSError:
+            return []
+
+    def process_one(self, job_dir):
+        """Claim and process one shard of the job; returns False if none was available."""
+        for shard in self._shard_names(job_dir):
+            if os.path.exists(os.path.join(job_dir, "results", f"{shard}.json")):
+                continue
+            claim_path = os.path.join(job_dir, "claims", f"{shard}.lock")
+            if not self._claim(claim_path):
+                continue
+            heartbeat_stop = threading.Event()
+            heartbeat = threading.Thread(target=self._heartbeat, args=(claim_path, heartbeat_stop), daemon=True)
+            heartbeat.start()
+            try:
+                self._process_shard(job_dir, shard)
+            finally:
+                heartbeat_stop.set()
+                heartbeat.join()
+                try:
+                    os.remove(claim_path)
+                except OSError:
+                    pass
+            return True
+        return False
+
+    def _claim(self, claim_path):
+        try:
+            modified = os.path.getmtime(claim_path)
+            if self._shared_now(os.path.dirname(claim_path)) - modified < self.lease_timeout:
+                return False
+            # The holder stopped heartbeating; move its lock aside (only one worker can win the rename)
+            stale_path = f"{claim_path}.stale.{uuid.uuid4().hex}"
+            os.rename(claim_path, stale_path)
+            os.remove(stale_path)
+            self._log(f"Re-leasing stale shard {os.path.basename(claim_path)}", "Warning")
+        except FileNotFoundError:
+            pass
+        except OSError:
+            return False
+        try:
+            fd = os.open(claim_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except OSError:
+            return False
+        with os.fdopen(fd, 'w') as f:
+            json.dump({"worker": self.name, "claimed_at": time.time()}, f)
+        return True
+
+    def _shared_now(self, directory):
+        """The current time on the file server holding directory.
+
+        Lock mtimes are stamped by that server, so comparing them with the
+        local clock would let clock skew between machines expire live leases
+        or keep dead ones; a freshly touched probe file is stamped the same way.
+        """
+        probe_path = os.path.join(directory, f".clock.{self.name}.{uuid.uuid4().hex}")
+        try:
+            with open(probe_path, 'w'):
+                pass
+            os.utime(probe_path)
+            return os.path.getmtime(probe_path)
+        except OSError:
+            return time.time()
+        finally:
+            try:
+                os.remove(probe_path)
+            except OSError:
+                pass
+
+    def _heartbeat(self, claim_path, stop):
+        interval = max(1.0, self.lease_timeout / 4)
+        while not stop.wait(interval):
+            try:
+                os.utime(claim_path)
+            except OSError:
+                pass
+
+    def _process_shard(self, job_dir, shard):
+        shard_data = _read_json(os.path.join(job_dir, "shards", f"{shard}.json"))
+        if shard_data is None:
+            return
+        self._log(f"Worker {self.name} processing shard {shard} ({len(shard_data['pages'])} pages)")
+        dates = []
+        for ref in shard_data["pages"]:
+            if not self.processor.is_processing:
+                return  # Leave no result; the claim is released and another worker picks it up
+            page = _page_from_ref(self.processor, ref)
+            payment_date = self.processor.extract_payment_date_cached(page) if page is not None else None
+            dates.append(payment_date.isoformat() if payment_date else None)
+        _write_json_atomic(os.path.join(job_dir, "results", f"{shard}.json"),
+                           {"shard": shard, "worker": self.name, "dates": dates})
+        self.processor.cache_manager.save_cache()
+        self.shards_done += 1
+
+
+class ShardCoordinator:
+    """Splits a job into page shards in a shared work directory, waits for workers, then merges.
+
+    The coordinator does the split itself (split pages land in the input
+    folder's temp directory, which workers must be able to reach at the same
+    path), and by default also works on shards while it waits.
+    """
+    def __init__(self, processor, workdir, shard_size=DEFAULT_SHARD_SIZE,
+                 lease_timeout=DEFAULT_LEASE_TIMEOUT, participate=True):
+        self.processor = processor
+        self.workdir = workdir
+        self.shard_size = max(1, int(shard_size))
+        self.lease_timeout = lease_timeout
+        self.participate = participate
+
+    def _log(self, message, level="Info"):
+        if self.processor.log_callback:
+            self.processor.log_callback(message, level)
+
+    def run(self, input_dir, output_file):
+        processor = self.processor
+        processor.is_processing = True
+        try:
+            pdf_files = processor.discover_pdf_sources(input_dir)
+            if not pdf_files:
+                self._log("No PDF files found in the input directory.", "Warning")
+                return False
+            source_hashes = [processor.cache_manager.get_source_hash(f) for f in pdf_files]
+            job_id = JobJournal.make_job_id(input_dir, output_file, source_hashes)
+            job_dir = os.path.join(self.workdir, job_id)
+            for sub_dir in ("shards", "claims", "results"):
+                os.makedirs(os.path.join(job_dir, sub_dir), exist_ok=True)
+
+            temp_dir = split_pages_dir(input_dir, job_id)
+            os.makedirs(temp_dir, exist_ok=True)
+            pages = processor.split_sources(pdf_files, temp_dir)
+            if not processor.is_processing:
+                return False
+
+            # Only pages never read before need to go out to workers
+            dated = []
+            refs = []
+            for page in pages:
+                if processor.is_date_cached(page):
+                    payment_date = processor.get_cached_payment_date(page)
+                    if payment_date:
+                        dated.append((payment_date, page))
+                else:
+                    refs.append((page, _page_ref(page, processor._date_cache_key(page), processor.page_origins.get(page))))
+            if not os.path.exists(os.path.join(job_dir, "job.json")):
+                for start in range(0, len(refs), self.shard_size):
+                    shard = f"{start // self.shard_size:05d}"
+                    _write_json_atomic(os.path.join(job_dir, "shards", f"{shard}.json"),
+                                       {"shard": shard, "pages": [ref for _, ref in refs[start:start + self.shard_size]]})
+                _write_json_atomic(os.path.join(job_dir, "job.json"),
+                                   {"job_id": job_id, "input_dir": input_dir, "output_file": output_file,
+                                    "pages": len(refs), "shard_size": self.shard_size,
+                                    "coordinator": worker_id(), "created_at": time.time()})
+            else:
+                self._log(f"Rejoining distributed job {job_id}", "Info")
+
+            # The shard files are the source of truth, also when rejoining a job
+            shard_pages = {}
+            for name in sorted(os.listdir(os.path.join(job_dir, "shards"))):
+                shard_data = _read_json(os.path.join(job_dir, "shards", name)) if name.endswith(".json") else None
+                if shard_data is not None:
+                    shard_pages[shard_data["shard"]] = [_page_from_ref(processor, ref) for ref in shard_data["pages"]]
+            sharded = {str(page) for shard in shard_pages.values() for page in shard}
+            dated = [(payment_date, page) for payment_date, page in dated if str(page) not in sharded]
+            self._log(f"Distributed job {job_id}: {len(sharded)} pages in {len(shard_pages)} shards "
+                      f"({len(dated)} pages already cached)", "Info")
+
+            results = self._wait_for_results(job_dir, shard_pages)
+            if results is None:
+                self._log(f"Distributed job {job_id} stopped; shards stay in {job_dir}", "Warning")
+                return False
+            for shard, shard_dates in results.items():
+                for page, raw_date in zip(shard_pages[shard], shard_dates):
+                    if raw_date and page is not None:
+                        payment_date = datetime.fromisoformat(raw_date)
+                        processor.cache_manager.date_cache[processor._date_cache_key(page)] = payment_date
+                        dated.append((payment_date, page))
+            processor.cache_manager.save_cache()
+
+            # Cached pages and shard results are each in source order, so they merge as sorted runs
+            if dated:
+                dates = {page: payment_date for payment_date, page in dated}
+                processor.write_output(processor.merge_sorted_runs([page for _, page in dated], dates), output_file)
+                self._log(f"Successfully processed {len(dated)} payslips", "Success")
+            else:
+                self._log("No valid payslips found to process", "Warning")
+            remove_split_pages_dir(temp_dir)
+            with open(os.path.join(job_dir, "done"), 'w') as f:
+                f.write(output_file)
+            return True
+        finally:
+            processor.archive_reader.close()
+            processor.is_processing = False
+
+    def _wait_for_results(self, job_dir, shard_pages):
+        worker = ShardWorker(self.processor, self.workdir, self.lease_timeout) if self.participate else None
+        total = len(shard_pages)
+        while self.processor.is_processing:
+            results = {}
+            for shard in shard_pages:
+                result = _read_json(os.path.join(job_dir, "results", f"{shard}.json"))
+                if result is not None:
+                    results[shard] = result["dates"]
+            if self.processor.progress_callback and total:
+                self.processor.progress_callback(len(results) / total * 100)
+            if len(results) == total:
+                return results
+            if worker is None or not worker.process_one(job_dir):
+                time.sleep(POLL_INTERVAL)
+        return None
@@ -0,0 +1,125 @@
+import collections
+import io
+import os
+import threading
+
+import pdfplumber
+import PyPDF2
+
+DEFAULT_MAX_DOCUMENTS = 8
+# Bytes of source data kept open; parsed objects take a few times as much
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class ParsedDocument:
+    """One source PDF, read once and parsed at most once per parser.
+
+    reader (PyPDF2) and plumber (pdfplumber) are created on first use. Neither
+    parser is thread-safe, so hold `lock` while using them or their pages.
+    """
+    def __init__(self, source, open_source, data=None):
+        self.source = source
+        self.lock = threading.RLock()
+        self._open_source = open_source
+        self._data = data
+        self._reader = None
+        self._plumber = None
+
+    @property
+    def data(self):
+        if self._data is None:
+            with self._open_source(self.source) as stream:
+                self._data = stream.read()
+        return self._data
+
+    @property
+    def reader(self):
+        if self._reader is None:
+            self._reader = PyPDF2.PdfReader(io.BytesIO(self.data))
+        return self._reader
+
+    @property
+    def plumber(self):
+        if self._plumber is None:
+            self._plumber = pdfplumber.open(io.BytesIO(self.data))
+        return self._plumber
+
+    def close(self):
+        with self.lock:
+            if self._plumber is not None:
+                self._plumber.close()
+            self._plumber = None
+            self._reader = None
+            self._data = None
+
+
+class DocumentCache:
+    """LRU of parsed source documents shared by the split, extract and merge stages.
+
+    Pages are served from the parsed source, so its cross-reference table,
+    fonts and object streams are parsed once per run instead of once per
+    page file. Bounded by document count and by source bytes held; evicted
+    documents are dropped and parsed again if they are needed later.
+    """
+    def __init__(self, open_source, max_documents=DEFAULT_MAX_DOCUMENTS, max_bytes=DEFAULT_MAX_BYTES):
+        self.open_source = open_source
+        self.max_documents = max(1, int(max_documents))
+        self.max_bytes = max(0, int(max_bytes))
+        self._documents = collections.OrderedDict()
+        self._sizes = {}
+        self._sources = {}
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.hits = 0
+
+    def register(self, source):
+        """Remember a source so its pages can be served by name later (e.g. after a resumed split)."""
+        with self._lock:
+            self._sources.setdefault(str(source), source)
+
+    def source(self, name):
+        """The registered source object for str(source), or None."""
+        with self._lock:
+            return self._sources.get(name)
+
+    def get(self, source, data=None):
+        """Return the ParsedDocument for source, opening it (from data, if already read) when not cached."""
+        key = str(source)
+        with self._lock:
+            self._sources.setdefault(key, source)
+            document = self._documents.get(key)
+            if document is not None:
+                self._documents.move_to_end(key)
+                self.hits += 1
+                return document
+            document = ParsedDocument(source, self.open_source, data)
+            self._documents[key] = document
+            self._sizes[key] = len(data) if data is not None else self._size_of(source)
+            self.opened += 1
+            # Evicted documents are only dropped, not closed: another thread may still be reading one
+            self._evict()
+        return document
+
+    def _evict(self):
+        while len(self._documents) > 1 and (len(self._documents) > self.max_documents
+                                            or sum(self._sizes.values()) > self.max_bytes):
+            key, _ = self._documents.popitem(last=False)
+            self._sizes.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            documents = list(self._documents.values())
+            self._documents.clear()
+            self._sizes.clear()
+            self._sources.clear()
+        for document in documents:
+            document.close()
+
+    def _size_of(self, source):
+        size = getattr(source, 'size', None)
+        if size is not None:
+            return size
+        try:
+            return os.path.getsize(source)
+        except OSError:
+            return 0
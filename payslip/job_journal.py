@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+
+TEMP_DIR_NAME = "_temp_split_pages"
+
+
+def split_pages_dir(input_dir, job_id):
+    """Folder a job's split pages go to: <input folder>/_temp_split_pages/<job_id>."""
+    base_dir = input_dir if os.path.isdir(input_dir) else os.path.dirname(input_dir)
+    return os.path.join(base_dir, TEMP_DIR_NAME, job_id)
+
+
+def remove_split_pages_dir(temp_dir):
+    """Delete a job's split pages, and the shared temp folder once no other job is using it."""
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    try:
+        os.rmdir(os.path.dirname(temp_dir))
+    except OSError:
+        pass
+
+
+class JobJournal:
+    """Append-only JSON-lines journal of a processing run, used to resume it after a crash or cancel.
+
+    Each line is one event: the job header, the pages a source was split into,
+    the payment date found for a page, and merge progress. Replaying the file
+    rebuilds the state of the run; a torn last line from a crash is ignored.
+    """
+    def __init__(self, journal_dir, job_id):
+        self.journal_dir = journal_dir
+        self.job_id = job_id
+        self.path = os.path.join(journal_dir, f"{job_id}.jsonl")
+        self._file = None
+
+    @staticmethod
+    def make_job_id(input_dir, output_file, source_hashes):
+        """Identify a job by its input location, output file and the exact input set."""
+        digest = hashlib.sha1()
+        digest.update(os.path.abspath(input_dir).encode())
+        digest.update(os.path.abspath(output_file).encode())
+        for source_hash in sorted(source_hashes):
+            digest.update(source_hash.encode())
+        return digest.hexdigest()[:16]
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def load(self):
+        """Replay the journal into a state dict."""
+        state = {"header": None, "splits": {}, "dates": {}, "merged": False, "complete": False}
+        if not self.exists():
+            return state
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Partially written line from an interrupted run
+                event = record.get("event")
+                if event == "start" and state["header"] is None:
+                    state["header"] = record
+                elif event == "split":
+                    state["splits"][record["source"]] = record["pages"]
+                elif event == "date":
+                    raw_date = record.get("date")
+                    state["dates"][record["page"]] = datetime.fromisoformat(raw_date) if raw_date else None
+                elif event == "merged":
+                    state["merged"] = True
+                elif event == "complete":
+                    state["complete"] = True
+        return state
+
+    def start(self, input_dir, output_file, num_sources):
+        if not self.exists():
+            self.record("start", job_id=self.job_id, input_dir=input_dir,
+                        output_file=output_file, sources=num_sources)
+        else:
+            self.record("resume")
+
+    def record(self, event, sync=False, **fields):
+        if self._file is None:
+            os.makedirs(self.journal_dir, exist_ok=True)
+            self._file = open(self.path, 'a+', encoding='utf-8')
+            # Terminate a torn last line so the next record starts cleanly
+            if self._file.tell() > 0:
+                self._file.seek(self._file.tell() - 1)
+                if self._file.read(1) != "\n":
+                    self._file.write("\n")
+        fields.update(event=event, time=time.time())
+        self._file.write(json.dumps(fields) + "\n")
+        self._file.flush()
+        if sync:
+            os.fsync(self._file.fileno())
+
+    def record_split(self, source, pages):
+        """Record the pages a source produced as [page, date cache key] pairs."""
+        self.record("split", source=str(source), pages=[[str(page), key] for page, key in pages], sync=True)
+
+    def record_date(self, page, payment_date):
+        self.record("date", page=str(page), date=payment_date.isoformat() if payment_date else None)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def finish(self):
+        """Close and delete the journal once the job has completed."""
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def discard(self, header):
+        """Delete the journal of a job that will not be resumed, with the split pages it left behind."""
+        if header and header.get("input_dir"):
+            remove_split_pages_dir(split_pages_dir(header["input_dir"], self.job_id))
+        self.finish()
+
+
+def remove_superseded_journals(journal_dir, input_dir, output_file, keep_job_id):
+    """Delete the journals of earlier runs from input_dir to output_file other than keep_job_id.
+
+    A job's id covers its exact input set, so once the folder has changed
+    an older journal can never be resumed; it would only be offered again
+    at every start.
+    """
+    if not os.path.isdir(journal_dir):
+        return
+    key = (os.path.abspath(input_dir), os.path.abspath(output_file))
+    for name in os.listdir(journal_dir):
+        if not name.endswith(".jsonl") or name[:-len(".jsonl")] == keep_job_id:
+            continue
+        journal = JobJournal(journal_dir, name[:-len(".jsonl")])
+        try:
+            header = journal.load()["header"]
+        except Exception:
+            continue
+        if header and (os.path.abspath(header.get("input_dir", "")),
+                       os.path.abspath(header.get("output_file", ""))) == key:
+            journal.discard(header)
+
+
+def find_incomplete_jobs(journal_dir):
+    """Return the headers of unfinished jobs, most recently active first.
+
+    Jobs that failed after their output was merged and written have nothing
+    left to resume; their journals are deleted instead.
+    """
+    jobs = []
+    if not os.path.isdir(journal_dir):
+        return jobs
+    for name in os.listdir(journal_dir):
+        if not name.endswith(".jsonl"):
+            continue
+        journal = JobJournal(journal_dir, name[:-len(".jsonl")])
+        try:
+            state = journal.load()
+            modified = os.path.getmtime(journal.path)
+        except Exception:
+            continue
+        if state["merged"] and state["header"] and os.path.exists(state["header"].get("output_file", "")):
+            journal.discard(state["header"])
+            continue
+        if state["header"] and not state["complete"]:
+            header = dict(state["header"])
+            header["pages_done"] = len(state["dates"])
+            header["last_activity"] = modified
+            jobs.append(header)
+    jobs.sort(key=lambda job: job["last_activity"], reverse=True)
+    return jobs
@@ -0,0 +1,191 @@
+import collections
+import hashlib
+import heapq
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .archive_reader import archive_stem, is_archive
+
+DEFAULT_MAX_CONCURRENT_JOBS = 2
+
+QUEUED = "Queued"
+RUNNING = "Running"
+DONE = "Done"
+FAILED = "Failed"
+CANCELLED = "Cancelled"
+
+
+def default_output_file(input_path):
+    """Output path for a job: <folder>/output/arranged_payslips.pdf, or per-archive next to it."""
+    if os.path.isdir(input_path):
+        return os.path.join(input_path, "output", "arranged_payslips.pdf")
+    archive_dir = os.path.dirname(input_path)
+    name = os.path.basename(input_path)
+    stem = archive_stem(input_path)
+    try:
+        siblings = [other for other in os.listdir(archive_dir or ".") if other != name
+                    and is_archive(os.path.join(archive_dir, other)) and archive_stem(other) == stem]
+    except OSError:
+        siblings = []
+    if siblings:
+        # acme.zip and acme.tar.gz side by side would otherwise write the same file
+        stem = f"{stem}_{hashlib.sha1(name.encode('utf-8')).hexdigest()[:6]}"
+    return os.path.join(archive_dir, "output", f"{stem}_arranged_payslips.pdf")
+
+
+class Job:
+    """One queued run of the processor over a folder or archive."""
+    def __init__(self, job_id, input_path, output_file, priority=0):
+        self.id = job_id
+        self.input_path = input_path
+        self.output_file = output_file
+        self.priority = priority
+        self.status = QUEUED
+        self.progress = 0.0
+        self.error = None
+        self.processor = None
+        # Recent log lines, for anything that wants to show or stream a job's log
+        self.log_lines = collections.deque(maxlen=500)
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def name(self):
+        return os.path.basename(os.path.normpath(self.input_path)) or self.input_path
+
+    @property
+    def pages_processed(self):
+        return self.processor.pages_processed if self.processor else 0
+
+    @property
+    def throughput(self):
+        """Pages per second since the job started."""
+        if not self.started_at:
+            return 0.0
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        return self.pages_processed / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def is_active(self):
+        return self.status in (QUEUED, RUNNING)
+
+
+class JobScheduler:
+    """Runs queued jobs by priority, a few at a time, sharing one worker pool between them.
+
+    processor_factory(job) must return a fresh PayslipProcessor for the job; the
+    scheduler hands it the shared pool for its page-level work.
+    """
+    def __init__(self, processor_factory, max_concurrent_jobs=DEFAULT_MAX_CONCURRENT_JOBS,
+                 max_workers=None, on_job_finished=None):
+        self.processor_factory = processor_factory
+        self.max_concurrent_jobs = max(1, int(max_concurrent_jobs))
+        self.on_job_finished = on_job_finished
+        self.pool = ThreadPoolExecutor(max_workers=max_workers or min(8, (os.cpu_count() or 1) + 2),
+                                       thread_name_prefix="payslip-worker")
+        self.jobs = []
+        self._queue = []
+        self._counter = itertools.count(1)
+        self._running = 0
+        self._lock = threading.Lock()
+        self._shutdown = False
+
+    def submit(self, input_path, output_file=None, priority=0):
+        """Queue a job; returns None if the same input is already queued or running."""
+        input_path = os.path.normpath(input_path)
+        if not (os.path.isdir(input_path) or is_archive(input_path)):
+            raise ValueError(f"Not a folder or archive: {input_path}")
+        with self._lock:
+            if any(job.is_active and job.input_path == input_path for job in self.jobs):
+                return None
+            job = Job(next(self._counter), input_path, output_file or default_output_file(input_path), priority)
+            self.jobs.append(job)
+            heapq.heappush(self._queue, (-job.priority, job.id, job))
+        self._dispatch()
+        return job
+
+    def set_priority(self, job, priority):
+        with self._lock:
+            if job.status != QUEUED:
+                return
+            job.priority = priority
+            self._queue = [(-j.priority, j.id, j) for _, _, j in self._queue]
+            heapq.heapify(self._queue)
+
+    def set_max_concurrent_jobs(self, value):
+        with self._lock:
+            self.max_concurrent_jobs = max(1, int(value))
+        self._dispatch()
+
+    def cancel(self, job):
+        with self._lock:
+            if job.status == QUEUED:
+                job.status = CANCELLED
+                job.finished_at = time.time()
+            elif job.status == RUNNING and job.processor:
+                job.processor.is_processing = False
+
+    def cancel_all(self):
+        for job in list(self.jobs):
+            self.cancel(job)
+
+    def active_jobs(self):
+        return [job for job in self.jobs if job.is_active]
+
+    def clear_finished(self):
+        with self._lock:
+            self.jobs = [job for job in self.jobs if job.is_active]
+
+    def shutdown(self):
+        self._shutdown = True
+        self.cancel_all()
+        self.pool.shutdown(wait=False)
+
+    def _dispatch(self):
+        with self._lock:
+            while not self._shutdown and self._running < self.max_concurrent_jobs and self._queue:
+                _, _, job = heapq.heappop(self._queue)
+                if job.status != QUEUED:
+                    continue  # Cancelled while waiting
+                job.status = RUNNING
+                job.started_at = time.time()
+                job.processor = self.processor_factory(job)
+                job.processor.log_callback = self._capture_log(job, job.processor.log_callback)
+                job.processor.executor = self.pool
+                job.processor.is_processing = True
+                self._running += 1
+                threading.Thread(target=self._run_job, args=(job,), name=f"job-{job.id}", daemon=True).start()
+
+    def _capture_log(self, job, log_callback):
+        def log(message, level="Info"):
+            job.log_lines.append((time.time(), level, message))
+            if log_callback:
+                log_callback(message, level)
+        return log
+
+    def _run_job(self, job):
+        try:
+            os.makedirs(os.path.dirname(job.output_file), exist_ok=True)
+            job.processor.process_payslips(job.input_path, job.output_file)
+            if job.processor.last_error:
+                job.status = FAILED
+                job.error = job.processor.last_error
+            elif job.processor.was_cancelled:
+                job.status = CANCELLED
+            else:
+                job.status = DONE
+                job.progress = 100.0
+        except Exception as e:
+            job.status = FAILED
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._running -= 1
+            if self.on_job_finished:
+                self.on_job_finished(job)
+            self._dispatch()
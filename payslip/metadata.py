@@ -0,0 +1,69 @@
+import re
+
+# Patterns are tried in order; the first match wins, like the payment date patterns
+EMPLOYEE_NAME_PATTERNS = [
+    r'Employee Name[:\s]*([A-Za-z][A-Za-z\'\-\., ]+?)(?:\s{2,}|\n|\s+Employee|\s+Emp|$)',
+    r'Name of Employee[:\s]*([A-Za-z][A-Za-z\'\-\., ]+?)(?:\s{2,}|\n|$)',
+    r'Employee[:\s]+([A-Z][A-Za-z\'\-\.]+(?: [A-Z][A-Za-z\'\-\.]+)+)',
+    r'^Name[:\s]*([A-Za-z][A-Za-z\'\-\., ]+?)(?:\s{2,}|\n|$)',
+]
+EMPLOYEE_ID_PATTERNS = [
+    r'(?:Employee|Emp\.?|Staff|Payroll)\s*(?:ID|No\.?|Number|Code|#)[:\s]*([A-Za-z0-9][A-Za-z0-9\-/]*)',
+    r'Works? Number[:\s]*([A-Za-z0-9][A-Za-z0-9\-/]*)',
+]
+EMPLOYER_PATTERNS = [
+    r'(?:Employer|Company)(?: Name)?[:\s]*([A-Za-z0-9][^\n]*?)(?:\s{2,}|\n|$)',
+]
+PAY_PERIOD_PATTERNS = [
+    r'Pay Period[:\s]*([^\n]*?\d[^\n]*?)(?:\s{2,}|\n|$)',
+    r'Period(?: Ending| End)?[:\s]*([^\n]*?\d[^\n]*?)(?:\s{2,}|\n|$)',
+    r'Tax Period[:\s]*([^\n]*?\d[^\n]*?)(?:\s{2,}|\n|$)',
+]
+AMOUNT = r'[:\s]*[£$€R]?\s*(-?[\d,]+\.\d{2})'
+GROSS_PATTERNS = [
+    r'(?:Total Gross Pay|Gross Pay|Gross Earnings|Total Gross|Gross Salary|Total Earnings|Gross)' + AMOUNT,
+]
+NET_PATTERNS = [
+    r'(?:Net Pay|Net Salary|Net Amount|Take Home Pay|Amount Paid|Net)' + AMOUNT,
+]
+TAX_PATTERNS = [
+    r'(?:Income Tax|PAYE Tax|PAYE|Tax Deducted|Withholding Tax|Tax)' + AMOUNT,
+]
+
+FIELDS = ("employee_name", "employee_id", "employer", "pay_period", "gross", "net", "tax")
+
+
+def _first_match(patterns, text):
+    for pattern in patterns:
+        match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
+        if match:
+            value = match.group(1).strip(" .:,")
+            if value:
+                return value
+    return None
+
+
+def _amount(patterns, text):
+    raw = _first_match(patterns, text)
+    if raw is None:
+        return None
+    try:
+        return float(raw.replace(",", ""))
+    except ValueError:
+        return None
+
+
+def extract_metadata(text):
+    """Pull the structured fields of a payslip out of its extracted text; missing fields are None."""
+    if not text:
+        return dict.fromkeys(FIELDS)
+    name = _first_match(EMPLOYEE_NAME_PATTERNS, text)
+    return {
+        "employee_name": " ".join(name.split()) if name else None,
+        "employee_id": _first_match(EMPLOYEE_ID_PATTERNS, text),
+        "employer": _first_match(EMPLOYER_PATTERNS, text),
+        "pay_period": _first_match(PAY_PERIOD_PATTERNS, text),
+        "gross": _amount(GROSS_PATTERNS, text),
+        "net": _amount(NET_PATTERNS, text),
+        "tax": _amount(TAX_PATTERNS, text),
+    }
@@ -0,0 +1,50 @@
+import re
+
+PARTITION_NONE = "none"
+PARTITION_EMPLOYEE = "employee"
+PARTITION_MONTH = "month"
+PARTITION_TAX_YEAR = "tax_year"
+PARTITION_PAGES = "pages"
+PARTITION_MODES = (PARTITION_NONE, PARTITION_EMPLOYEE, PARTITION_MONTH, PARTITION_TAX_YEAR, PARTITION_PAGES)
+DEFAULT_PARTITION_SIZE = 500
+# First day (month, day) of the tax year
+TAX_YEAR_START = (4, 6)
+MANIFEST_FILE_NAME = "manifest.json"
+
+
+def tax_year_label(payment_date, start=TAX_YEAR_START):
+    year = payment_date.year if (payment_date.month, payment_date.day) >= start else payment_date.year - 1
+    return f"{year}-{(year + 1) % 100:02d}"
+
+
+def safe_label(label):
+    """Make a partition label usable as a file name."""
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', str(label)).strip('_.') or "unknown"
+
+
+def partition_pages(sorted_pages, mode, size=DEFAULT_PARTITION_SIZE, employee_of=None):
+    """Group date-sorted (payment_date, page) pairs into [(label, pages)].
+
+    Pages keep their date order inside each partition. Month and tax-year
+    partitions come out in date order, employee partitions by name.
+    """
+    if mode == PARTITION_NONE:
+        return [("all", list(sorted_pages))]
+    if mode == PARTITION_PAGES:
+        size = max(1, int(size))
+        return [(f"part_{n + 1:03d}", sorted_pages[start:start + size])
+                for n, start in enumerate(range(0, len(sorted_pages), size))]
+    groups = {}
+    for payment_date, page in sorted_pages:
+        if mode == PARTITION_MONTH:
+            label = payment_date.strftime("%Y-%m")
+        elif mode == PARTITION_TAX_YEAR:
+            label = tax_year_label(payment_date)
+        elif mode == PARTITION_EMPLOYEE:
+            label = (employee_of(page) if employee_of else None) or "unknown"
+        else:
+            raise ValueError(f"Unknown partition mode: {mode}")
+        groups.setdefault(label, []).append((payment_date, page))
+    if mode == PARTITION_EMPLOYEE:
+        return sorted(groups.items(), key=lambda item: item[0].lower())
+    return list(groups.items())
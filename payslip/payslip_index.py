@@ -0,0 +1,185 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from .metadata import FIELDS
+
+INDEX_FILE_NAME = "payslip_index.sqlite"
+# Rows written before a commit; flush() commits the rest at the end of a run
+COMMIT_EVERY = 100
+AMOUNT_FIELDS = ("gross", "net", "tax")
+
+COLUMNS = ("source", "page", "content_hash", "payment_date", "employee_name", "employee_key", "employee_id",
+           "employer", "pay_period", "gross", "net", "tax", "indexed_at")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS payslips (
+    source TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    payment_date TEXT,
+    employee_name TEXT,
+    employee_key TEXT,
+    employee_id TEXT,
+    employer TEXT,
+    pay_period TEXT,
+    gross REAL,
+    net REAL,
+    tax REAL,
+    indexed_at REAL NOT NULL,
+    PRIMARY KEY (source, page)
+);
+CREATE INDEX IF NOT EXISTS idx_payslips_hash ON payslips(content_hash);
+CREATE INDEX IF NOT EXISTS idx_payslips_employee ON payslips(employee_key, payment_date);
+CREATE INDEX IF NOT EXISTS idx_payslips_employee_id ON payslips(employee_id, payment_date);
+CREATE INDEX IF NOT EXISTS idx_payslips_date ON payslips(payment_date);
+CREATE INDEX IF NOT EXISTS idx_payslips_net ON payslips(net);
+"""
+# Indexes of the first schema, keyed by content_hash, dropped when it is migrated
+_OLD_INDEXES = ("idx_payslips_employee", "idx_payslips_employee_id", "idx_payslips_date", "idx_payslips_net",
+                "idx_payslips_source")
+
+
+def content_hash(text):
+    """Hash a page by its text, ignoring whitespace differences between extractions."""
+    return hashlib.sha1(" ".join(text.split()).encode('utf-8')).hexdigest()
+
+
+def _date_bound(value, upper=False):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, date):
+        # A plain date as the upper bound includes that whole day
+        return datetime.combine(value + timedelta(days=1) if upper else value, datetime.min.time()).isoformat()
+    return str(value)
+
+
+class PayslipIndex:
+    """Persistent SQLite index of payslip metadata, one row per source page.
+
+    Rows are written by the processor as pages are read, so queries by
+    employee, date range or amount never need to reopen a PDF. One index is
+    shared by all jobs; writes are serialized with a lock.
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._migrate()
+        self._pending = 0
+
+    def _migrate(self):
+        """Create the schema, moving rows of an index keyed by content hash over to (source, page) keys."""
+        columns = self._conn.execute("PRAGMA table_info(payslips)").fetchall()
+        if not any(column["name"] == "content_hash" and column["pk"] for column in columns):
+            self._conn.executescript(SCHEMA)
+            return
+        with self._conn:
+            self._conn.execute("ALTER TABLE payslips RENAME TO payslips_old")
+            for index_name in _OLD_INDEXES:
+                self._conn.execute(f"DROP INDEX IF EXISTS {index_name}")
+        self._conn.executescript(SCHEMA)
+        column_list = ", ".join(COLUMNS)
+        with self._conn:
+            self._conn.execute(f"INSERT OR REPLACE INTO payslips ({column_list}) "
+                               f"SELECT {column_list} FROM payslips_old ORDER BY indexed_at")
+            self._conn.execute("DROP TABLE payslips_old")
+
+    def add(self, page_hash, source, page, payment_date, fields):
+        row = {field: fields.get(field) for field in FIELDS}
+        name = row["employee_name"]
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO payslips ({', '.join(COLUMNS)}) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (str(source), page, page_hash, payment_date.isoformat() if payment_date else None,
+                 name, name.lower() if name else None, row["employee_id"], row["employer"],
+                 row["pay_period"], row["gross"], row["net"], row["tax"], time.time()))
+            self._pending += 1
+            if self._pending >= COMMIT_EVERY:
+                self._conn.commit()
+                self._pending = 0
+
+    def contains(self, page_hash):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM payslips WHERE content_hash = ?",
+                                      (page_hash,)).fetchone() is not None
+
+    def lookup(self, source, page):
+        """Return the indexed row for a source page as a dict, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM payslips WHERE source = ? AND page = ?",
+                                     (str(source), page)).fetchone()
+        return dict(row) if row else None
+
+    def find(self, employee=None, employee_id=None, employer=None, date_from=None, date_to=None,
+             min_amount=None, max_amount=None, amount_field="net", limit=None):
+        """Return matching payslips (as dicts) ordered by payment date.
+
+        employee matches every word of the given name case-insensitively, so
+        "jane" finds "Jane Smith". Date bounds are inclusive.
+        """
+        if amount_field not in AMOUNT_FIELDS:
+            raise ValueError(f"amount_field must be one of {', '.join(AMOUNT_FIELDS)}")
+        clauses = []
+        params = []
+        for word in (employee or "").lower().split():
+            clauses.append("employee_key LIKE ?")
+            params.append(f"%{word}%")
+        for column, value in (("employee_id", employee_id), ("employer", employer)):
+            if value:
+                clauses.append(f"{column} = ? COLLATE NOCASE")
+                params.append(value)
+        lower = _date_bound(date_from)
+        if lower:
+            clauses.append("payment_date >= ?")
+            params.append(lower)
+        upper = _date_bound(date_to, upper=True)
+        if upper:
+            clauses.append("payment_date < ?" if isinstance(date_to, date) and not isinstance(date_to, datetime)
+                           else "payment_date <= ?")
+            params.append(upper)
+        if min_amount is not None:
+            clauses.append(f"{amount_field} >= ?")
+            params.append(min_amount)
+        if max_amount is not None:
+            clauses.append(f"{amount_field} <= ?")
+            params.append(max_amount)
+        sql = "SELECT * FROM payslips"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY payment_date, source, page"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        results = []
+        for row in rows:
+            result = dict(row)
+            result.pop("employee_key")
+            if result["payment_date"]:
+                result["payment_date"] = datetime.fromisoformat(result["payment_date"])
+            results.append(result)
+        return results
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM payslips").fetchone()[0]
+
+    def flush(self):
+        with self._lock:
+            self._conn.commit()
+            self._pending = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
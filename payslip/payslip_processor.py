@@ -1,10 +1,99 @@
+import collections
+import hashlib
+import heapq
+import json
+import mmap
 import os
 import re
 import queue
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from datetime import datetime
 from dateutil import parser
 import pdfplumber
 import PyPDF2
 import pytesseract
+from .archive_reader import ArchiveReader, is_archive
+from .document_cache import DocumentCache
+from .job_journal import (JobJournal, remove_superseded_journals, remove_split_pages_dir, split_pages_dir,
+                          TEMP_DIR_NAME)
+from .prefetcher import Prefetcher, DEFAULT_PREFETCH_DEPTH, DEFAULT_PREFETCH_BYTES
+from .metadata import extract_metadata
+from .payslip_index import content_hash
+from .pdf_optimizer import optimize_writer
+from .run_profiler import RunProfiler
+from .output_partition import (partition_pages, safe_label, PARTITION_NONE, DEFAULT_PARTITION_SIZE,
+                               MANIFEST_FILE_NAME)
+
+JOURNAL_DIR_NAME = "jobs"
+# Sources with at least this many pages are split and read in page ranges on several processes
+LARGE_DOCUMENT_PAGES = 200
+MIN_RANGE_PAGES = 25
+# Ranges per worker, so a slow (OCR-heavy) range does not leave the other workers idle
+RANGES_PER_WORKER = 4
+OCR_RESOLUTION = 300
+OCR_CONFIG = '--oem 3 --psm 6'
+
+
+def _output_order(item):
+    """Sort key of a (payment_date, page) pair: by date, ties by page name."""
+    return item[0], str(item[1])
+
+
+def _merge_partition(page_refs, output_file, optimize_output=False, image_dpi=None):
+    """Worker-process entry point: merge one partition given as (path, archive member or None) pairs."""
+    processor = PayslipProcessor(None)
+    processor.optimize_output = optimize_output
+    processor.image_dpi = image_dpi
+    try:
+        pages = [processor.archive_reader.member(path, member) if member else path for path, member in page_refs]
+        processor.merge_pdfs(pages, output_file)
+    finally:
+        processor.archive_reader.close()
+    return output_file
+
+
+def _page_file(split_dir, pdf_name, page_num):
+    return os.path.join(split_dir, f"{pdf_name}_page_{page_num}.pdf")
+
+
+def _split_range(pdf_path, split_dir, pdf_name, start, end, read_pages):
+    """Worker-process entry point: write pages start+1..end of pdf_path as single-page files.
+
+    The source is memory-mapped read-only, so every worker shares the
+    operating system's cached copy of the file instead of reading its own.
+    Returns [(page number, page file, text or None)], with text for the page
+    numbers in read_pages that could be read.
+    """
+    results = []
+    with open(pdf_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        reader = PyPDF2.PdfReader(mapped)
+        plumber = pdfplumber.open(mapped) if read_pages else None
+        try:
+            for page_num in range(start + 1, end + 1):
+                output_path = _page_file(split_dir, pdf_name, page_num)
+                pdf_writer = PyPDF2.PdfWriter()
+                pdf_writer.add_page(reader.pages[page_num - 1])
+                with open(output_path, 'wb') as output_file:
+                    pdf_writer.write(output_file)
+                text = None
+                if page_num in read_pages:
+                    page = plumber.pages[page_num - 1]
+                    try:
+                        text = page.extract_text(x_tolerance=2, y_tolerance=2)
+                        if not text:
+                            img = page.to_image(resolution=OCR_RESOLUTION).original.convert('L')
+                            text = pytesseract.image_to_string(img, config=OCR_CONFIG)
+                        text += "\n"
+                    except Exception:
+                        text = None  # Read again (and the error logged) by date extraction
+                    page.close()
+                results.append((page_num, output_path, text))
+        finally:
+            # Drop every parser reference before the map is closed
+            if plumber is not None:
+                plumber.close()
+            plumber = reader = None
+    return results
 
 class PayslipProcessor:
     def __init__(self, cache_manager, log_callback=None, progress_callback=None):
@@ -13,134 +102,593 @@ class PayslipProcessor:
         self.progress_callback = progress_callback
         self.is_processing = False
         self.task_queue = queue.Queue()
+        self.archive_reader = ArchiveReader()
+        # Parsed sources shared by the split, extract and merge stages of a run
+        self.documents = DocumentCache(self._open_source)
+        # Maps each page file handed to date extraction to its date cache key
+        self.page_cache_keys = {}
+        # Maps split page files back to (source, page number) for the metadata index
+        self.page_origins = {}
+        self.index_pages = True
+        # The last run's pages in output order, as {"date", "source", "page", "key"}, for previews
+        self.sorted_pages = []
+        # Split the output into one file per employee/month/tax year/page block
+        self.partition_mode = PARTITION_NONE
+        self.partition_size = DEFAULT_PARTITION_SIZE
+        self.partition_workers = None
+        # Processes used for the page ranges of large sources (None: one per CPU)
+        self.range_workers = None
+        # Pages already dated in this job (None: read, no date found): journaled by an earlier
+        # attempt, or read while a large source was split
+        self.page_dates = {}
+        # Deduplicate and compress objects in the merged PDF; optionally downsample scans
+        self.optimize_output = False
+        self.image_dpi = None
+        # Profile runs (CPU and allocations) and write a report bundle next to the output
+        self.profile_runs = False
+        self.last_profile_report = None
+        # Read-ahead settings for slow (network) input folders
+        self.prefetch_depth = DEFAULT_PREFETCH_DEPTH
+        self.prefetch_bytes = DEFAULT_PREFETCH_BYTES
+        self.io_stats = {}
+        # Optional pool shared with other jobs for page-level work
+        self.executor = None
+        self.pages_processed = 0
+        self.last_error = None
+        self.was_cancelled = False
+
+    def _open_source(self, source):
+        """Open a PDF source (file path or archive member) as a binary stream."""
+        if hasattr(source, 'open'):
+            return source.open()
+        return open(source, 'rb')
+
+    def _make_prefetcher(self, sources):
+        return Prefetcher(sources, self._open_source, depth=self.prefetch_depth,
+                          max_bytes=self.prefetch_bytes).start()
+
+    def _record_io_stats(self, stage, prefetcher):
+        self.io_stats[stage] = prefetcher.stats()
+        prefetcher.close()
+
+    def _source_name(self, source):
+        return getattr(source, 'display_name', None) or os.path.basename(source)
+
+    def discover_pdf_sources(self, input_path):
+        """Collect PDF files, treating ZIP/TAR archives as folders of PDFs."""
+        if is_archive(input_path):
+            return self.archive_reader.members(input_path)
+        sources = []
+        for root, dirs, files in os.walk(input_path):
+            dirs[:] = [d for d in dirs if d != TEMP_DIR_NAME]
+            for file in sorted(files):
+                file_path = os.path.join(root, file)
+                if file.lower().endswith('.pdf'):
+                    sources.append(file_path)
+                elif is_archive(file_path):
+                    try:
+                        sources.extend(self.archive_reader.members(file_path))
+                    except Exception as e:
+                        if self.log_callback:
+                            self.log_callback(f"Error reading archive {file}: {str(e)}", "Error")
+        return sources
+
+    def _date_cache_key(self, pdf_path):
+        cache_key = self.page_cache_keys.get(pdf_path)
+        if cache_key is None:
+            cache_key = self.cache_manager.get_source_hash(pdf_path)
+        return cache_key
+
+    def _preview_entry(self, payment_date, page):
+        source, page_num = self.page_origins.get(page, (str(page), 1))
+        return {"date": payment_date, "source": source, "page": page_num, "key": self._date_cache_key(page)}
+
+    def get_cached_payment_date(self, pdf_path):
+        return self.cache_manager.date_cache.get(self._date_cache_key(pdf_path))
+
+    def is_date_cached(self, pdf_path):
+        """True if the page was read before, including pages where no date was found (cached as None)."""
+        return self._date_cache_key(pdf_path) in self.cache_manager.date_cache
+
+    def extract_payment_date_cached(self, pdf_path, data=None):
+        """Extract the payment date, reusing a cached result when the page is unchanged."""
+        cache_key = self._date_cache_key(pdf_path)
+        if cache_key in self.cache_manager.date_cache:
+            payment_date = self.cache_manager.date_cache[cache_key]
+            if self.needs_indexing(pdf_path):
+                # Dated before it was indexed (or the index was deleted): read it once to backfill
+                full_text = self.extract_text(pdf_path, data)
+                if full_text:
+                    self._index_page(pdf_path, full_text, payment_date)
+            return payment_date
+        full_text = self.extract_text(pdf_path, data)
+        payment_date = self.parse_payment_date(full_text)
+        # Undated pages are cached too, so they are not OCR'd again; read errors are not
+        if full_text is not None:
+            self.cache_manager.date_cache[cache_key] = payment_date
+        if full_text and self.index_pages:
+            self._index_page(pdf_path, full_text, payment_date)
+        return payment_date
+
+    def needs_indexing(self, pdf_path):
+        """True if indexing is on and the page has no row in the metadata index yet."""
+        return self._unindexed(*self.page_origins.get(pdf_path, (str(pdf_path), 1)))
+
+    def _unindexed(self, source, page):
+        if not self.index_pages:
+            return False
+        try:
+            return self.cache_manager.metadata_index.lookup(source, page) is None
+        except Exception:
+            return False
+
+    def _index_page(self, pdf_path, full_text, payment_date):
+        """Record the page's metadata and text so it can be found later without reopening it."""
+        source, page = self.page_origins.get(pdf_path, (str(pdf_path), 1))
+        try:
+            self.cache_manager.metadata_index.add(content_hash(full_text), source, page, payment_date,
+                                                  extract_metadata(full_text))
+            self.cache_manager.text_index.add(source, page, full_text)
+        except Exception as e:
+            if self.log_callback:
+                self.log_callback(f"Could not index {self._source_name(pdf_path)}: {str(e)}", "Warning")
+
+    def extract_payment_date(self, pdf_path, data=None):
+        return self.parse_payment_date(self.extract_text(pdf_path, data))
 
-    def extract_payment_date(self, pdf_path):
+    def _page_source(self, page):
+        """Return (source, page number) to read a split page from its parsed source,
+        or (page, None) to read every page of the file itself."""
+        origin = self.page_origins.get(page)
+        if origin is not None:
+            source = self.documents.source(origin[0])
+            if source is not None:
+                return source, origin[1]
+        return page, None
+
+    def extract_text(self, pdf_path, data=None):
+        """Return the text of a PDF, using OCR for pages without a text layer; None on error."""
+        source, page_num = self._page_source(pdf_path)
         try:
-            with pdfplumber.open(pdf_path) as pdf:
-                full_text = ""
-                for page in pdf.pages:
+            document = self.documents.get(source, data if source is pdf_path else None)
+            with document.lock:
+                pages = document.plumber.pages if page_num is None else [document.plumber.pages[page_num - 1]]
+            full_text = ""
+            for page in pages:
+                img = None
+                with document.lock:
                     text = page.extract_text(x_tolerance=2, y_tolerance=2)
-                    if text:
-                        full_text += text + "\n"
-                    else:
-                        img = page.to_image(resolution=300).original.convert('L')
-                        text = pytesseract.image_to_string(img, config='--oem 3 --psm 6')
-                        full_text += text + "\n"
-                date_patterns = [
-                    r'Payment Date[:\s]*(\d{1,2}[\/\-\.]\d{1,2}[\/\-\.]\d{2,4})',
-                    r'Date of Payment[:\s]*(\d{1,2}[\/\-\.]\d{1,2}[\/\-\.]\d{2,4})',
-                    r'Pay Date[:\s]*(\d{1,2}[\/\-\.]\d{1,2}[\/\-\.]\d{2,4})',
-                    r'Pmt Date[:\s]*(\d{1,2}[\/\-\.]\d{1,2}[\/\-\.]\d{2,4})',
-                    r'Date Paid[:\s]*(\d{1,2}[\/\-\.]\d{1,2}[\/\-\.]\d{2,4})',
-                    r'Paid On[:\s]*(\d{1,2}[\/\-\.]\d{1,2}[\/\-\.]\d{2,4})',
-                    r'Issue Date[:\s]*(\d{1,2}[\/\-\.]\d{1,2}[\/\-\.]\d{2,4})',
-                    r'Salary Date[:\s]*(\d{1,2}[\/\-\.]\d{1,2}[\/\-\.]\d{2,4})',
-                    r'Payslip Date[:\s]*(\d{1,2}[\/\-\.]\d{1,2}[\/\-\.]\d{2,4})',
-                    r'Date[:\s]*(\d{1,2}[\/\-\.]\d{1,2}[\/\-\.]\d{2,4})',
-                ]
-                for pattern in date_patterns:
-                    date_match = re.search(pattern, full_text, re.IGNORECASE)
-                    if date_match:
-                        raw_date = date_match.group(1)
-                        try:
-                            return parser.parse(raw_date, dayfirst=True, fuzzy=True)
-                        except Exception:
-                            continue
-                return None
+                    if not text:
+                        img = page.to_image(resolution=OCR_RESOLUTION).original.convert('L')
+                    page.close()
+                if img is not None:
+                    # OCR runs outside the lock so other pages of this source can be parsed meanwhile
+                    text = pytesseract.image_to_string(img, config=OCR_CONFIG)
+                full_text += text + "\n"
+            return full_text
         except Exception as e:
             if self.log_callback:
                 self.log_callback(f"Error processing {pdf_path}: {str(e)}")
             return None
 
+    def parse_payment_date(self, full_text):
+        if not full_text:
+            return None
+        date_patterns = [
+            r'Payment Date[:\s]*(\d{1,2}[\/\-\.]\d{1,2}[\/\-\.]\d{2,4})',
+            r'Date of Payment[:\s]*(\d{1,2}[\/\-\.]\d{1,2}[\/\-\.]\d{2,4})',
+            r'Pay Date[:\s]*(\d{1,2}[\/\-\.]\d{1,2}[\/\-\.]\d{2,4})',
+            r'Pmt Date[:\s]*(\d{1,2}[\/\-\.]\d{1,2}[\/\-\.]\d{2,4})',
+            r'Date Paid[:\s]*(\d{1,2}[\/\-\.]\d{1,2}[\/\-\.]\d{2,4})',
+            r'Paid On[:\s]*(\d{1,2}[\/\-\.]\d{1,2}[\/\-\.]\d{2,4})',
+            r'Issue Date[:\s]*(\d{1,2}[\/\-\.]\d{1,2}[\/\-\.]\d{2,4})',
+            r'Salary Date[:\s]*(\d{1,2}[\/\-\.]\d{1,2}[\/\-\.]\d{2,4})',
+            r'Payslip Date[:\s]*(\d{1,2}[\/\-\.]\d{1,2}[\/\-\.]\d{2,4})',
+            r'Date[:\s]*(\d{1,2}[\/\-\.]\d{1,2}[\/\-\.]\d{2,4})',
+        ]
+        for pattern in date_patterns:
+            date_match = re.search(pattern, full_text, re.IGNORECASE)
+            if date_match:
+                raw_date = date_match.group(1)
+                try:
+                    return parser.parse(raw_date, dayfirst=True, fuzzy=True)
+                except Exception:
+                    continue
+        return None
+
     def process_payslips(self, input_dir, output_file):
-        """Process all payslips in the input directory."""
+        """Process all payslips in the input directory (or a single archive).
+
+        Progress is journaled so an interrupted or cancelled run with the same
+        inputs resumes where it stopped instead of starting over.
+        """
+        if self.profile_runs:
+            return self.run_profiled(self._process_payslips, input_dir, output_file, report_file=output_file)
+        return self._process_payslips(input_dir, output_file)
+
+    def run_profiled(self, fn, *args, report_file, **kwargs):
+        """Run fn under RunProfiler and write its report bundle next to report_file."""
+        profiler = RunProfiler(self)
         try:
-            pdf_files = []
-            # First, collect all PDF files
-            for root, _, files in os.walk(input_dir):
-                for file in files:
-                    if file.lower().endswith('.pdf'):
-                        pdf_files.append(os.path.join(root, file))
+            return profiler.run(fn, *args, **kwargs)
+        finally:
+            try:
+                self.last_profile_report = profiler.write_report(report_file)
+                if self.log_callback:
+                    self.log_callback(f"Profile report written to {self.last_profile_report}", "Info")
+            except Exception as e:
+                if self.log_callback:
+                    self.log_callback(f"Could not write profile report: {str(e)}", "Warning")
+
+    def _process_payslips(self, input_dir, output_file):
+        self.io_stats = {}
+        self.sorted_pages = []
+        self.pages_processed = 0
+        self.last_error = None
+        self.was_cancelled = False
+        journal = None
+        try:
+            # First, collect all PDF files, including those inside archives
+            pdf_files = self.discover_pdf_sources(input_dir)
             
             if not pdf_files:
                 if self.log_callback:
                     self.log_callback("No PDF files found in the input directory.", "Warning")
                 return
 
-            # Create temporary directory for split pages
-            temp_dir = os.path.join(input_dir, "_temp_split_pages")
-            os.makedirs(temp_dir, exist_ok=True)
-
-            # Process each PDF and split if needed
-            processed_files = []
-            total_pdfs = len(pdf_files)
-            for i, pdf_path in enumerate(pdf_files):
-                if not self.is_processing:
-                    break
+            # Open (or resume) the journal for this exact input set
+            source_hashes = [self.cache_manager.get_source_hash(f) for f in pdf_files]
+            job_id = JobJournal.make_job_id(input_dir, output_file, source_hashes)
+            journal_dir = os.path.join(self.cache_manager.cache_dir, JOURNAL_DIR_NAME)
+            remove_superseded_journals(journal_dir, input_dir, output_file, job_id)
+            journal = JobJournal(journal_dir, job_id)
+            state = journal.load()
+            if state["header"] and self.log_callback:
+                self.log_callback(f"Resuming job {job_id}: {len(state['splits'])} files split, "
+                                  f"{len(state['dates'])} pages dated", "Info")
+            journal.start(input_dir, output_file, len(pdf_files))
 
-                if self.log_callback:
-                    self.log_callback(f"Processing {os.path.basename(pdf_path)}", "Info")
+            # Create this job's temporary directory for split pages; other jobs may share the parent
+            temp_dir = split_pages_dir(input_dir, job_id)
+            os.makedirs(temp_dir, exist_ok=True)
 
-                # Split PDF if it has multiple pages
-                split_pages = self.split_pdf_pages(pdf_path, temp_dir)
-                processed_files.extend(split_pages)
+            self.page_dates.update(state["dates"])
+            processed_files = self.split_sources(pdf_files, temp_dir, journal, state["splits"])
 
-                if self.progress_callback:
-                    progress = ((i + 1) / total_pdfs) * 100
-                    self.progress_callback(progress)
+            if not self.is_processing:
+                self._log_cancelled(job_id)
+                return
 
-            # Sort files by payment date
-            sorted_files = []
+            # Date every page; only pages not journaled or cached, or missing from the index, are read
+            dates = {}
+            pending_files = []
             for file in processed_files:
-                payment_date = self.extract_payment_date(file)
-                if payment_date:
-                    sorted_files.append((payment_date, file))
+                if self.needs_indexing(file):
+                    pending_files.append(file)
+                    continue
+                if str(file) in state["dates"]:
+                    payment_date = state["dates"][str(file)]
+                elif file in self.page_dates:
+                    payment_date = self.page_dates[file]  # Journaled when its range was read
+                else:
+                    if not self.is_date_cached(file):
+                        pending_files.append(file)
+                        continue
+                    payment_date = self.get_cached_payment_date(file)
+                    journal.record_date(file, payment_date)
+                self.pages_processed += 1
+                dates[file] = payment_date
+            # Split pages are read from their parsed source, so only whole files need reading ahead
+            prefetcher = self._make_prefetcher([f if self._page_source(f)[0] is f else None for f in pending_files])
+            try:
+                for file, payment_date in self._extract_dates(pending_files, prefetcher):
+                    journal.record_date(file, payment_date)
+                    self.pages_processed += 1
+                    dates[file] = payment_date
+            finally:
+                self._record_io_stats("extract", prefetcher)
+                self.cache_manager.save_cache()
+            self._log_io_stats()
 
-            sorted_files.sort()  # Sort by payment date
+            if not self.is_processing:
+                self._log_cancelled(job_id)
+                return
 
-            # Merge sorted files
-            if sorted_files:
-                self.merge_pdfs([f[1] for f in sorted_files], output_file)
+            # Merge the pages in date order, streaming them straight from the sorted runs into the output
+            dated_count = sum(1 for payment_date in dates.values() if payment_date)
+            if dated_count:
+                journal.record("merge_started", pages=dated_count, sync=True)
+                self.write_output(self._record_preview(self.merge_sorted_runs(processed_files, dates)), output_file)
+                journal.record("merged", pages=dated_count, sync=True)
                 if self.log_callback:
-                    self.log_callback(f"Successfully processed {len(sorted_files)} payslips", "Success")
+                    self.log_callback(f"Successfully processed {dated_count} payslips", "Success")
             else:
                 if self.log_callback:
                     self.log_callback("No valid payslips found to process", "Warning")
 
-            # Cleanup temporary files
-            if os.path.exists(temp_dir):
-                import shutil
-                shutil.rmtree(temp_dir)
+            # Cleanup temporary files; the journal is only needed until the job completes
+            remove_split_pages_dir(temp_dir)
+            journal.record("complete", sync=True)
+            journal.finish()
 
         except Exception as e:
+            self.last_error = str(e)
             if self.log_callback:
                 self.log_callback(f"Error processing payslips: {str(e)}", "Error")
+        finally:
+            if journal is not None:
+                journal.close()
+            self.archive_reader.close()
+            self.page_cache_keys.clear()
+            self.page_origins.clear()
+            self.page_dates.clear()
+            self.documents.clear()
         self.is_processing = False
 
-    def split_pdf_pages(self, pdf_path, output_dir):
-        """Split a multi-page PDF into individual page PDFs."""
+    def split_sources(self, pdf_files, temp_dir, journal=None, journaled_splits=None):
+        """Split every source into single pages, reusing journaled splits whose page files survived."""
+        # Reuse split results from a previous attempt where the page files survived
+        processed_files = []
+        done_sources = {}
+        for pdf_path in pdf_files:
+            pages = self._restore_split(pdf_path, (journaled_splits or {}).get(str(pdf_path)))
+            if pages is not None:
+                done_sources[str(pdf_path)] = pages
+        pending_sources = [f for f in pdf_files if str(f) not in done_sources]
+        # Large sources are split by range workers that map the file, so they are not read ahead here
+        range_pages = {}
+        for pdf_path in pending_sources:
+            num_pages = self._range_page_count(pdf_path)
+            if num_pages is not None:
+                range_pages[str(pdf_path)] = num_pages
+
+        # Process each PDF and split if needed, reading ahead of the splitter
+        total_pdfs = len(pdf_files)
+        prefetcher = self._make_prefetcher([f for f in pending_sources if str(f) not in range_pages])
         try:
-            with open(pdf_path, 'rb') as file:
-                pdf = PyPDF2.PdfReader(file)
+            next_pending = 0
+            for i, pdf_path in enumerate(pdf_files):
+                if not self.is_processing:
+                    break
+
+                if str(pdf_path) in done_sources:
+                    processed_files.extend(done_sources[str(pdf_path)])
+                else:
+                    if self.log_callback:
+                        self.log_callback(f"Processing {self._source_name(pdf_path)}", "Info")
+
+                    # Split PDF if it has multiple pages
+                    if str(pdf_path) in range_pages:
+                        split_pages = self.split_pdf_pages(pdf_path, temp_dir, journal=journal,
+                                                           range_pages=range_pages[str(pdf_path)])
+                    else:
+                        split_pages = self.split_pdf_pages(pdf_path, temp_dir, prefetcher.get(next_pending), journal)
+                        next_pending += 1
+                    if split_pages is None:
+                        break  # Cancelled part-way through a large source; it is split again on resume
+                    if journal is not None:
+                        journal.record_split(pdf_path, [(page, self._date_cache_key(page)) for page in split_pages])
+                    processed_files.extend(split_pages)
+
+                if self.progress_callback:
+                    progress = ((i + 1) / total_pdfs) * 100
+                    self.progress_callback(progress)
+        finally:
+            self._record_io_stats("split", prefetcher)
+        return processed_files
+
+    def _restore_split(self, pdf_path, journaled_pages):
+        """Rebuild a source's page list from the journal, or None if it must be split again."""
+        if not journaled_pages:
+            return None
+        self.documents.register(pdf_path)
+        pages = []
+        for page, cache_key in journaled_pages:
+            if page == str(pdf_path):
+                pages.append(pdf_path)
+            elif os.path.exists(page):
+                self.page_cache_keys[page] = cache_key
+                self.page_origins[page] = (str(pdf_path), int(cache_key.rsplit(":", 1)[1]))
+                pages.append(page)
+            else:
+                return None
+        return pages
+
+    def _extract_dates(self, files, prefetcher):
+        """Yield (file, payment_date) in order, extracting on the shared pool when one is set."""
+        if self.executor is None:
+            for i, file in enumerate(files):
+                if not self.is_processing:
+                    return
+                yield file, self.extract_payment_date_cached(file, prefetcher.get(i))
+            return
+        # Keep a bounded window of pages in flight so prefetched bytes do not pile up
+        window = max(2, getattr(self.executor, '_max_workers', 4) * 2)
+        in_flight = collections.deque()
+        for i, file in enumerate(files):
+            if not self.is_processing:
+                break
+            in_flight.append((file, self.executor.submit(self.extract_payment_date_cached, file, prefetcher.get(i))))
+            if len(in_flight) >= window:
+                done_file, future = in_flight.popleft()
+                yield done_file, future.result()
+        while in_flight:
+            done_file, future = in_flight.popleft()
+            if not self.is_processing:
+                future.cancel()
+                continue
+            yield done_file, future.result()
+
+    def merge_sorted_runs(self, pages, dates):
+        """Return an iterator of date-sorted (payment_date, page) pairs for the dated pages.
+
+        pages are in source order, and bulk exports are usually in date order
+        within each file, so they split into a few already-sorted runs. The runs
+        are k-way merged with a heap, yielding each page as soon as it is next.
+        """
+        runs = []
+        previous = None
+        for page in pages:
+            payment_date = dates.get(page)
+            if not payment_date:
+                continue
+            item = (payment_date, page)
+            if previous is None or _output_order(item) < _output_order(previous):
+                runs.append([])
+            runs[-1].append(item)
+            previous = item
+        if self.log_callback and runs:
+            self.log_callback(f"Merging {len(runs)} sorted runs", "Info")
+        return heapq.merge(*runs, key=_output_order)
+
+    def _record_preview(self, ordered):
+        for payment_date, page in ordered:
+            self.sorted_pages.append(self._preview_entry(payment_date, page))
+            yield payment_date, page
+
+    def _log_cancelled(self, job_id):
+        self.was_cancelled = True
+        if self.log_callback:
+            self.log_callback(f"Processing stopped; progress saved for job {job_id}. "
+                              "Start the same folder again to resume.", "Warning")
+
+    def _log_io_stats(self):
+        if not self.log_callback:
+            return
+        for stage, stats in self.io_stats.items():
+            self.log_callback(
+                f"I/O ({stage}): read {stats['files_read']} files, "
+                f"{stats['bytes_read'] / (1024 * 1024):.1f} MB in {stats['read_seconds']:.1f}s, "
+                f"blocked {stats['blocked_seconds']:.1f}s waiting on reads", "Info")
+
+    def _employee_of(self, page):
+        """Employee name (or id) of a page: from the metadata index, or read from the page if it has no row."""
+        source, page_num = self.page_origins.get(page, (str(page), 1))
+        row = self.cache_manager.metadata_index.lookup(source, page_num)
+        if row is None:
+            # E.g. dated by a remote shard worker, or with indexing switched off
+            full_text = self.extract_text(page)
+            if self.index_pages and full_text:
+                self._index_page(page, full_text, self.get_cached_payment_date(page))
+            row = extract_metadata(full_text)
+        return row["employee_name"] or row["employee_id"]
+
+    def write_output(self, sorted_files, output_file):
+        """Merge date-sorted (date, page) pairs into output_file, or partition them.
+
+        sorted_files may be an iterator; a single output file consumes it as
+        pages arrive. Partitions go to a folder named after output_file, one
+        PDF each plus a manifest, and are merged concurrently in worker processes.
+        """
+        if self.partition_mode == PARTITION_NONE:
+            self.merge_pdfs((f[1] for f in sorted_files), output_file)
+            return [output_file]
+        sorted_files = list(sorted_files)
+        partitions = partition_pages(sorted_files, self.partition_mode, self.partition_size, self._employee_of)
+        output_dir = os.path.splitext(output_file)[0]
+        os.makedirs(output_dir, exist_ok=True)
+        entries = []
+        used_names = set()
+        for label, pages in partitions:
+            name = safe_label(label)
+            while name.lower() in used_names:
+                name += "_"
+            used_names.add(name.lower())
+            entries.append({"label": label, "file": f"{name}.pdf", "pages": len(pages),
+                            "first_date": pages[0][0].isoformat(), "last_date": pages[-1][0].isoformat(),
+                            "refs": [(page.archive_path, page.name) if hasattr(page, 'archive_path') else (page, None)
+                                     for _, page in pages]})
+
+        workers = min(len(entries), self.partition_workers or os.cpu_count() or 1)
+        if self.log_callback:
+            self.log_callback(f"Writing {len(entries)} {self.partition_mode} partitions with {workers} workers", "Info")
+        if workers <= 1:
+            for entry in entries:
+                _merge_partition(entry["refs"], os.path.join(output_dir, entry["file"]),
+                                 self.optimize_output, self.image_dpi)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {pool.submit(_merge_partition, entry["refs"], os.path.join(output_dir, entry["file"]),
+                                       self.optimize_output, self.image_dpi): entry
+                           for entry in entries}
+                for done, future in enumerate(as_completed(futures), 1):
+                    future.result()
+                    if self.log_callback:
+                        self.log_callback(f"Wrote partition {futures[future]['file']} ({done}/{len(entries)})", "Info")
+
+        manifest = {"created_at": datetime.now().isoformat(timespec="seconds"), "mode": self.partition_mode,
+                    "total_pages": len(sorted_files),
+                    "partitions": [{key: value for key, value in entry.items() if key != "refs"} for entry in entries]}
+        with open(os.path.join(output_dir, MANIFEST_FILE_NAME), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        return [os.path.join(output_dir, entry["file"]) for entry in entries]
+
+    def merge_pdfs(self, pdf_files, output_file):
+        """Merge the given single-page PDFs, in order, into one output file.
+
+        Pages come in date order, jumping between sources, and the writer keeps
+        every source's reader alive anyway; so each source is taken from the
+        document cache once and held for the whole merge rather than being
+        evicted and parsed again.
+        """
+        pdf_writer = PyPDF2.PdfWriter()
+        documents = {}
+        for pdf_path in pdf_files:
+            source, page_num = self._page_source(pdf_path)
+            document = documents.get(str(source))
+            if document is None:
+                document = documents[str(source)] = self.documents.get(source)
+            with document.lock:
+                pages = document.reader.pages if page_num is None else [document.reader.pages[page_num - 1]]
+                for page in pages:
+                    pdf_writer.add_page(page)
+        if self.optimize_output:
+            stats = optimize_writer(pdf_writer, image_dpi=self.image_dpi)
+            if self.log_callback:
+                self.log_callback(f"Optimized output: {stats['objects_deduplicated']} duplicate objects merged, "
+                                  f"{stats['streams_compressed']} streams compressed, "
+                                  f"{stats['images_downsampled']} images downsampled", "Info")
+        with open(output_file, 'wb') as out:
+            pdf_writer.write(out)
+
+    def split_pdf_pages(self, pdf_path, output_dir, data=None, journal=None, range_pages=None):
+        """Split a multi-page PDF into individual page PDFs.
+
+        range_pages is the page count of a large source routed to range
+        splitting (see _range_page_count); only the range workers read it.
+        Returns None if the run was cancelled while a large source was split in page ranges.
+        """
+        try:
+            if range_pages is not None:
+                self.documents.register(pdf_path)
+                split_dir, pdf_name, source_key = self._split_dir(pdf_path, output_dir)
+                try:
+                    return self._split_ranges(pdf_path, split_dir, pdf_name, source_key, range_pages, journal)
+                except Exception as e:
+                    if self.log_callback:
+                        self.log_callback(f"Parallel split failed, splitting page by page: {str(e)}", "Warning")
+
+            document = self.documents.get(pdf_path, data)
+            with document.lock:
+                pdf = document.reader
                 num_pages = len(pdf.pages)
                 
                 # If single page, return original path
                 if num_pages == 1:
                     return [pdf_path]
                 
-                # Create output directory for split pages
-                pdf_name = os.path.splitext(os.path.basename(pdf_path))[0]
-                split_dir = os.path.join(output_dir, f"{pdf_name}_pages")
-                os.makedirs(split_dir, exist_ok=True)
-                
+                split_dir, pdf_name, source_key = self._split_dir(pdf_path, output_dir)
                 split_paths = []
                 for page_num in range(num_pages):
-                    output_path = os.path.join(split_dir, f"{pdf_name}_page_{page_num + 1}.pdf")
+                    output_path = _page_file(split_dir, pdf_name, page_num + 1)
                     pdf_writer = PyPDF2.PdfWriter()
                     pdf_writer.add_page(pdf.pages[page_num])
                     
                     with open(output_path, 'wb') as output_file:
                         pdf_writer.write(output_file)
+                    # Key split pages by their source so the date cache survives re-splitting
+                    self.page_cache_keys[output_path] = f"{source_key}:{page_num + 1}"
+                    self.page_origins[output_path] = (str(pdf_path), page_num + 1)
                     split_paths.append(output_path)
                     
                 if self.log_callback:
@@ -151,3 +699,94 @@ class PayslipProcessor:
             if self.log_callback:
                 self.log_callback(f"Error splitting PDF: {str(e)}", "Error")
             return [pdf_path]  # Return original on error
+
+    def _range_workers(self):
+        return max(1, self.range_workers or os.cpu_count() or 1)
+
+    def _range_page_count(self, pdf_path):
+        """Page count of a source to split in page ranges, or None to split it in this process.
+
+        Only the cross-reference table and page tree are read, so a large
+        source is not read in full before the range workers map it.
+        """
+        # Archive members have no file to map; small sources are not worth starting processes for
+        if not isinstance(pdf_path, str) or self._range_workers() <= 1:
+            return None
+        try:
+            with open(pdf_path, 'rb') as f:
+                num_pages = len(PyPDF2.PdfReader(f).pages)
+        except Exception:
+            return None  # Left to the normal split, which reports the error
+        return num_pages if num_pages >= LARGE_DOCUMENT_PAGES else None
+
+    def _split_dir(self, pdf_path, output_dir):
+        """Create the directory for a source's page files; returns (split_dir, pdf_name, source_key)."""
+        source_key = self.cache_manager.get_source_hash(pdf_path)
+        pdf_name = getattr(pdf_path, 'stem', None) or os.path.splitext(os.path.basename(pdf_path))[0]
+        # Same-named files from different folders or archives each get their own directory
+        source_digest = hashlib.sha1(str(pdf_path).encode('utf-8')).hexdigest()[:8]
+        split_dir = os.path.join(output_dir, f"{pdf_name}_{source_digest}_pages")
+        os.makedirs(split_dir, exist_ok=True)
+        return split_dir, pdf_name, source_key
+
+    def _split_ranges(self, pdf_path, split_dir, pdf_name, source_key, num_pages, journal=None):
+        """Split a large source in page ranges on a process pool, reading the pages not dated or indexed yet.
+
+        Each range's pages are dated, indexed and journaled as soon as the
+        range completes, so a cancel or crash keeps the work done so far.
+        Cancelling stops the ranges not started yet and returns None;
+        otherwise the pages are returned in page order. The workers are
+        separate processes, so RunProfiler does not see their time.
+        """
+        date_cache = self.cache_manager.date_cache
+        read_pages = {n for n in range(1, num_pages + 1)
+                      if _page_file(split_dir, pdf_name, n) not in self.page_dates
+                      and (f"{source_key}:{n}" not in date_cache or self._unindexed(str(pdf_path), n))}
+        workers = self._range_workers()
+        range_size = max(MIN_RANGE_PAGES, -(-num_pages // (workers * RANGES_PER_WORKER)))
+        ranges = [(start, min(start + range_size, num_pages)) for start in range(0, num_pages, range_size)]
+        workers = min(workers, len(ranges))
+        if self.log_callback:
+            self.log_callback(f"Splitting {num_pages} pages in {len(ranges)} ranges with {workers} workers", "Info")
+        results = [None] * len(ranges)
+        pending_ranges = collections.deque(enumerate(ranges))
+        in_flight = {}
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            while pending_ranges or in_flight:
+                # Ranges are handed out one per free worker, so cancelling leaves the rest unstarted
+                while pending_ranges and len(in_flight) < workers and self.is_processing:
+                    i, (start, end) = pending_ranges.popleft()
+                    in_flight[pool.submit(_split_range, pdf_path, split_dir, pdf_name, start, end,
+                                          {n for n in read_pages if start < n <= end})] = i
+                if not in_flight:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i = in_flight.pop(future)
+                    results[i] = future.result()
+                    self._record_range(pdf_path, source_key, results[i], journal)
+        if not self.is_processing:
+            self.cache_manager.save_cache()
+            return None
+
+        split_paths = [output_path for result in results for _, output_path, _ in result]
+        if self.log_callback:
+            self.log_callback(f"Split PDF into {num_pages} pages", "Info")
+        return split_paths
+
+    def _record_range(self, pdf_path, source_key, pages, journal):
+        """Register a completed range's page files and date, index and journal the pages it read."""
+        date_cache = self.cache_manager.date_cache
+        for page_num, output_path, text in pages:
+            cache_key = f"{source_key}:{page_num}"
+            self.page_cache_keys[output_path] = cache_key
+            self.page_origins[output_path] = (str(pdf_path), page_num)
+            if text is None:
+                continue
+            payment_date = date_cache[cache_key] if cache_key in date_cache else self.parse_payment_date(text)
+            date_cache[cache_key] = payment_date
+            if self.index_pages:
+                self._index_page(output_path, text, payment_date)
+            self.page_dates[output_path] = payment_date
+            if journal is not None:
+                journal.record_date(output_path, payment_date)
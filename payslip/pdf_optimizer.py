@@ -0,0 +1,178 @@
+import hashlib
+import io
+import zlib
+
+from PyPDF2.generic import (ArrayObject, DictionaryObject, EncodedStreamObject, IndirectObject, NameObject,
+                            NullObject, NumberObject, StreamObject)
+
+DEFAULT_IMAGE_DPI = 150
+JPEG_QUALITY = 75
+# Only downsample images at least this much denser than the target
+DOWNSAMPLE_THRESHOLD = 1.2
+# Objects that must stay distinct even when identical
+_KEEP_TYPES = ("/Page", "/Pages", "/Catalog")
+
+
+def optimize_writer(writer, dedupe=True, compress=True, image_dpi=None):
+    """Shrink a PdfWriter's objects in place before it is written.
+
+    - image_dpi: re-encode page-sized scanned images denser than this as JPEG
+    - compress: Flate-compress streams that have no filter
+    - dedupe: point every reference to identical fonts, images and other
+      objects at one copy; the copies become null objects so object numbers
+      (and the xref table PyPDF2 writes) stay valid
+
+    Returns counts of what was changed.
+    """
+    stats = {"images_downsampled": 0, "streams_compressed": 0, "objects_deduplicated": 0}
+    if image_dpi:
+        stats["images_downsampled"] = _downsample_images(writer, image_dpi)
+    if compress:
+        stats["streams_compressed"] = _compress_streams(writer)
+    if dedupe:
+        stats["objects_deduplicated"] = _dedupe_objects(writer)
+    return stats
+
+
+def _replace_object(writer, idnum, new_obj):
+    new_obj.indirect_reference = IndirectObject(idnum, 0, writer)
+    writer._objects[idnum - 1] = new_obj
+
+
+def _encoded_copy(stream, data, filter_name):
+    new_stream = EncodedStreamObject()
+    for key, value in stream.items():
+        if key not in ("/Length", "/Filter", "/DecodeParms"):
+            new_stream[key] = value
+    new_stream[NameObject("/Filter")] = NameObject(filter_name)
+    new_stream._data = data
+    return new_stream
+
+
+def _compress_streams(writer):
+    compressed = 0
+    for i, obj in enumerate(writer._objects):
+        if not isinstance(obj, StreamObject) or "/Filter" in obj or obj.get("/Type") in ("/Metadata", "/XRef"):
+            continue
+        data = obj._data
+        packed = zlib.compress(data, 6)
+        if len(packed) < len(data):
+            _replace_object(writer, i + 1, _encoded_copy(obj, packed, "/FlateDecode"))
+            compressed += 1
+    return compressed
+
+
+def _decode_image(image):
+    """Return the image as a PIL image, or None for encodings we leave alone."""
+    from PIL import Image
+
+    filters = image.get("/Filter")
+    filters = list(filters) if isinstance(filters, ArrayObject) else ([filters] if filters else [])
+    if filters == ["/DCTDecode"]:
+        return Image.open(io.BytesIO(image._data))
+    modes = {"/DeviceGray": "L", "/DeviceRGB": "RGB"}
+    color_space = image.get("/ColorSpace")
+    if (set(filters) - {"/FlateDecode", "/ASCII85Decode", "/ASCIIHexDecode", "/LZWDecode", "/RunLengthDecode"}
+            or image.get("/BitsPerComponent") != 8 or color_space not in modes):
+        return None
+    size = (int(image["/Width"]), int(image["/Height"]))
+    return Image.frombytes(modes[color_space], size, image.get_data())
+
+
+def _downsample_images(writer, image_dpi):
+    from PIL import Image
+
+    done = set()
+    downsampled = 0
+    for page in writer.pages:
+        resources = page.get("/Resources")
+        x_objects = resources.get_object().get("/XObject") if resources is not None else None
+        if x_objects is None:
+            continue
+        # Scanned payslips are one image covering the page, so the page width gives the image's DPI
+        page_width_in = float(page.mediabox.width) / 72
+        for ref in x_objects.get_object().values():
+            if not isinstance(ref, IndirectObject) or ref.idnum in done:
+                continue
+            done.add(ref.idnum)
+            image = ref.get_object()
+            if (image.get("/Subtype") != "/Image" or "/SMask" in image or "/Mask" in image
+                    or image.get("/ImageMask") or page_width_in <= 0):
+                continue
+            dpi = int(image.get("/Width", 0)) / page_width_in
+            if dpi < image_dpi * DOWNSAMPLE_THRESHOLD:
+                continue
+            try:
+                img = _decode_image(image)
+                if img is None or img.mode in ("1", "CMYK"):
+                    continue  # Bilevel scans compress better as they are; CMYK would change colors
+                img = img.convert("L" if img.mode in ("L", "LA") else "RGB")
+                scale = image_dpi / dpi
+                img = img.resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))),
+                                 Image.LANCZOS)
+                out = io.BytesIO()
+                img.save(out, "JPEG", quality=JPEG_QUALITY, optimize=True)
+            except Exception:
+                continue
+            if out.tell() >= len(image._data):
+                continue
+            new_image = _encoded_copy(image, out.getvalue(), "/DCTDecode")
+            new_image.pop("/Decode", None)
+            new_image[NameObject("/Width")] = NumberObject(img.width)
+            new_image[NameObject("/Height")] = NumberObject(img.height)
+            new_image[NameObject("/ColorSpace")] = NameObject("/DeviceGray" if img.mode == "L" else "/DeviceRGB")
+            new_image[NameObject("/BitsPerComponent")] = NumberObject(8)
+            _replace_object(writer, ref.idnum, new_image)
+            downsampled += 1
+    return downsampled
+
+
+def _object_key(obj):
+    if isinstance(obj, StreamObject):
+        header = {key: value for key, value in obj.items() if key != "/Length"}
+        return hashlib.sha256(repr(sorted(header.items())).encode() + b"\0" + obj._data).digest()
+    if isinstance(obj, (DictionaryObject, ArrayObject)):
+        if isinstance(obj, DictionaryObject) and obj.get("/Type") in _KEEP_TYPES:
+            return None
+        return hashlib.sha256(type(obj).__name__.encode() + repr(obj).encode()).digest()
+    return None
+
+
+def _remap(obj, remap, writer):
+    if isinstance(obj, DictionaryObject):
+        items = obj.items()
+    elif isinstance(obj, ArrayObject):
+        items = enumerate(obj)
+    else:
+        return
+    for key, value in list(items):
+        if isinstance(value, IndirectObject):
+            if value.pdf is writer and value.idnum in remap:
+                obj[key] = IndirectObject(remap[value.idnum], 0, writer)
+        else:
+            _remap(value, remap, writer)
+
+
+def _dedupe_objects(writer):
+    """Merge identical objects; repeated until no new duplicates appear, since merging
+    children (e.g. font files) makes their parents (font dictionaries) identical."""
+    total = 0
+    while True:
+        canonical = {}
+        remap = {}
+        for i, obj in enumerate(writer._objects):
+            key = _object_key(obj)
+            if key is None:
+                continue
+            if key in canonical:
+                remap[i + 1] = canonical[key]
+            else:
+                canonical[key] = i + 1
+        if not remap:
+            return total
+        for idnum in remap:
+            writer._objects[idnum - 1] = NullObject()
+        for obj in writer._objects:
+            _remap(obj, remap, writer)
+        _remap(writer._root_object, remap, writer)
+        total += len(remap)
@@ -0,0 +1,144 @@
+import os
+import threading
+import time
+
+DEFAULT_PREFETCH_DEPTH = 4
+DEFAULT_PREFETCH_BYTES = 64 * 1024 * 1024
+
+
+class Prefetcher:
+    """Reads the next few PDF sources in background threads so workers rarely wait on I/O.
+
+    Sources are fetched in order, at most `depth` ahead of the consumer and
+    within a `max_bytes` budget of buffered data. Call get(i) for each index
+    in turn; it returns the raw bytes of sources[i].
+    """
+    def __init__(self, sources, open_source, depth=DEFAULT_PREFETCH_DEPTH,
+                 max_bytes=DEFAULT_PREFETCH_BYTES, num_threads=2):
+        self.sources = list(sources)
+        self.open_source = open_source
+        self.depth = max(0, int(depth))
+        self.max_bytes = max(0, int(max_bytes))
+        self.num_threads = max(1, int(num_threads))
+        self._cond = threading.Condition()
+        self._buffers = {}
+        self._reserved_bytes = 0
+        self._next = 0
+        self._consumed = 0
+        self._closed = False
+        self._threads = []
+        # Counters
+        self.blocked_seconds = 0.0
+        self.read_seconds = 0.0
+        self.bytes_read = 0
+        self.files_read = 0
+        self.hits = 0
+
+    def start(self):
+        if self.depth == 0:
+            return self
+        for i in range(min(self.num_threads, self.depth)):
+            thread = threading.Thread(target=self._worker, name=f"prefetch-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def get(self, index):
+        """Return the bytes of sources[index], waiting for the read if it is still in flight.
+
+        Returns None if the read failed.
+        """
+        if self.depth == 0:
+            started = time.perf_counter()
+            try:
+                data = self._read(self.sources[index])
+            except Exception:
+                data = None
+            self.blocked_seconds += time.perf_counter() - started
+            return data
+        with self._cond:
+            self._consumed = index
+            self._cond.notify_all()
+            if index in self._buffers:
+                self.hits += 1
+            started = time.perf_counter()
+            while index not in self._buffers and not self._closed:
+                self._cond.wait()
+            self.blocked_seconds += time.perf_counter() - started
+            data, size = self._buffers.pop(index, (None, 0))
+            self._reserved_bytes -= size
+            self._consumed = index + 1
+            self._cond.notify_all()
+        if isinstance(data, Exception):
+            # Let the caller open the source itself and report the error as usual
+            return None
+        return data
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._buffers.clear()
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=1)
+
+    def stats(self):
+        return {
+            "files_read": self.files_read,
+            "bytes_read": self.bytes_read,
+            "read_seconds": round(self.read_seconds, 3),
+            "blocked_seconds": round(self.blocked_seconds, 3),
+            "prefetch_hits": self.hits,
+        }
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._closed and self._next < len(self.sources):
+                    size = self._size_of(self.sources[self._next])
+                    within_depth = self._next - self._consumed < self.depth
+                    # Always allow one read when nothing is buffered so large files cannot stall
+                    within_budget = (self._reserved_bytes + size <= self.max_bytes
+                                     or self._reserved_bytes == 0)
+                    if within_depth and within_budget:
+                        break
+                    self._cond.wait()
+                if self._closed or self._next >= len(self.sources):
+                    return
+                index = self._next
+                self._next += 1
+                self._reserved_bytes += size
+            try:
+                data = self._read(self.sources[index])
+            except Exception as e:
+                data = e
+            with self._cond:
+                actual = len(data) if isinstance(data, bytes) else 0
+                self._reserved_bytes += actual - size
+                if not self._closed:
+                    self._buffers[index] = (data, actual)
+                self._cond.notify_all()
+
+    def _read(self, source):
+        if source is None:
+            return None  # Placeholder for an entry the consumer reads some other way
+        started = time.perf_counter()
+        with self.open_source(source) as stream:
+            data = stream.read()
+        elapsed = time.perf_counter() - started
+        with self._cond:
+            self.read_seconds += elapsed
+            self.bytes_read += len(data)
+            self.files_read += 1
+        return data
+
+    def _size_of(self, source):
+        if source is None:
+            return 0
+        size = getattr(source, 'size', None)
+        if size is not None:
+            return size
+        try:
+            return os.path.getsize(source)
+        except OSError:
+            return 0
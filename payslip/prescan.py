@@ -0,0 +1,133 @@
+import threading
+import time
+
+from .payslip_processor import PayslipProcessor
+
+# Per-page costs used for the run estimate until the pre-scan has measured its own
+TEXT_PAGE_SECONDS = 0.05
+OCR_PAGE_SECONDS = 2.0
+MERGE_PAGE_SECONDS = 0.005
+# How often progress is reported, in pages
+REPORT_EVERY = 25
+# Wait between checks while a real job has priority
+YIELD_SECONDS = 0.5
+
+
+class PreScanner:
+    """Low-priority background scan of the folder the user has selected but not started yet.
+
+    Discovers the PDFs, counts pages and pages without a text layer, then
+    reads every page's payment date into the shared date cache (and the
+    indexes), so a later run over the same folder only has to merge. Starting
+    a scan of another folder cancels the current one. on_update(status) is
+    called from the scan thread with a dict of counts and the run estimate.
+    """
+    def __init__(self, cache_manager, on_update=None, should_yield=None, workers=1):
+        self.cache_manager = cache_manager
+        self.on_update = on_update
+        self.should_yield = should_yield
+        self.workers = max(1, int(workers))
+        self.input_path = None
+        self._cancel = None
+        self._thread = None
+
+    def start(self, input_path):
+        """Scan input_path, replacing any scan in progress. Rescanning the same path is a no-op."""
+        if input_path == self.input_path and self._thread is not None and self._thread.is_alive():
+            return
+        self.cancel()
+        self.input_path = input_path
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(input_path, self._cancel),
+                                        name="prescan", daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        if self._cancel is not None:
+            self._cancel.set()
+        self.input_path = None
+
+    def _report(self, status, cancel):
+        if self.on_update and not cancel.is_set():
+            self.on_update(dict(status))
+
+    def _wait_for_turn(self, cancel):
+        while self.should_yield and self.should_yield() and not cancel.is_set():
+            cancel.wait(YIELD_SECONDS)
+
+    def _run(self, input_path, cancel):
+        processor = PayslipProcessor(self.cache_manager)
+        status = {"input_path": input_path, "state": "scanning", "files": 0, "pages": 0, "ocr_pages": 0,
+                  "cached_pages": 0, "estimated_seconds": None, "error": None}
+        try:
+            sources = processor.discover_pdf_sources(input_path)
+            status["files"] = len(sources)
+            pages = []
+            for source in sources:
+                if cancel.is_set():
+                    return
+                self._wait_for_turn(cancel)
+                pages.extend(self._source_pages(processor, source, status))
+            pending = [(page, needs_ocr) for page, needs_ocr in pages
+                       if not processor.is_date_cached(page) or processor.needs_indexing(page)]
+            status["cached_pages"] = len(pages) - len(pending)
+            status["state"] = "warming"
+            timings = {False: [], True: []}
+            self._estimate(status, timings)
+            self._report(status, cancel)
+
+            for n, (page, needs_ocr) in enumerate(pending, 1):
+                if cancel.is_set():
+                    return
+                self._wait_for_turn(cancel)
+                started = time.perf_counter()
+                processor.extract_payment_date_cached(page)
+                if processor.is_date_cached(page):
+                    status["cached_pages"] += 1
+                timings[needs_ocr].append(time.perf_counter() - started)
+                if n % REPORT_EVERY == 0:
+                    self._estimate(status, timings)
+                    self._report(status, cancel)
+            status["state"] = "done"
+            self._estimate(status, timings)
+        except Exception as e:
+            status["state"] = "failed"
+            status["error"] = str(e)
+        finally:
+            processor.documents.clear()
+            processor.archive_reader.close()
+            self.cache_manager.save_cache()
+        self._report(status, cancel)
+
+    def _source_pages(self, processor, source, status):
+        """Return [(page, needs_ocr)] for a source, keyed the way the processor will key its split pages."""
+        document = processor.documents.get(source)
+        with document.lock:
+            reader_pages = document.reader.pages
+            ocr_flags = []
+            for page in reader_pages:
+                resources = page.get("/Resources")
+                resources = resources.get_object() if resources is not None else {}
+                # Scans carry only an image; any font means there is a text layer to read
+                ocr_flags.append("/Font" not in resources)
+        status["pages"] += len(ocr_flags)
+        status["ocr_pages"] += sum(ocr_flags)
+        if len(ocr_flags) == 1:
+            return [(source, ocr_flags[0])]
+        source_key = self.cache_manager.get_source_hash(source)
+        pages = []
+        for n, needs_ocr in enumerate(ocr_flags, 1):
+            page = f"{source}#page={n}"
+            processor.page_cache_keys[page] = f"{source_key}:{n}"
+            processor.page_origins[page] = (str(source), n)
+            pages.append((page, needs_ocr))
+        return pages
+
+    def _estimate(self, status, timings):
+        """Estimate a full run: reading the pages not cached yet, at measured rates where known, plus the merge."""
+        text_rate = sum(timings[False]) / len(timings[False]) if timings[False] else TEXT_PAGE_SECONDS
+        ocr_rate = sum(timings[True]) / len(timings[True]) if timings[True] else OCR_PAGE_SECONDS
+        remaining = max(0, status["pages"] - status["cached_pages"])
+        remaining_ocr = remaining * status["ocr_pages"] / status["pages"] if status["pages"] else 0
+        read_seconds = ((remaining - remaining_ocr) * text_rate + remaining_ocr * ocr_rate) / self.workers
+        status["estimated_seconds"] = read_seconds + status["pages"] * MERGE_PAGE_SECONDS
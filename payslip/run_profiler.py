@@ -0,0 +1,288 @@
+import collections
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+PROFILE_DIR_SUFFIX = "_profile"
+HOT_FUNCTIONS = 40
+TOP_ALLOCATIONS = 25
+STACK_SAMPLE_INTERVAL = 0.01
+
+# Functions whose cumulative time makes up each stage, as (file name, function name).
+# Text extraction is reported without the OCR time spent inside it.
+STAGE_FUNCTIONS = {
+    "split": [("payslip_processor.py", "split_pdf_pages")],
+    "text extraction": [("payslip_processor.py", "extract_text")],
+    "ocr": [("page.py", "to_image"), ("pytesseract.py", "image_to_string")],
+    "regex/date parse": [("payslip_processor.py", "parse_payment_date"), ("metadata.py", "extract_metadata")],
+    "merge": [("payslip_processor.py", "write_output")],
+}
+# Top-level phases of a run, timed on the wall clock with their memory peak
+PHASE_METHODS = (("split", "split_sources"), ("merge", "write_output"))
+# Innermost frames of threads that are only waiting for work
+_IDLE_FILES = ("threading.py", "queue.py", "selectors.py")
+_IDLE_FUNCTIONS = (("thread.py", "_worker"),)
+
+# tracemalloc is process-wide, so it stays on while any profiled run is active
+_tracing_lock = threading.Lock()
+_tracing_runs = 0
+
+
+def _start_tracing():
+    global _tracing_runs
+    with _tracing_lock:
+        if _tracing_runs == 0:
+            tracemalloc.start()
+        _tracing_runs += 1
+
+
+def _stop_tracing():
+    global _tracing_runs
+    with _tracing_lock:
+        _tracing_runs -= 1
+        if _tracing_runs == 0:
+            tracemalloc.stop()
+
+
+class _ProfilingExecutor:
+    """Wraps the processor's pool so work it runs on other threads is profiled too."""
+    def __init__(self, executor, profiler):
+        self._executor = executor
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        return getattr(self._executor, name)
+
+    def submit(self, fn, *args, **kwargs):
+        return self._executor.submit(self._profiler._profiled_call, fn, *args, **kwargs)
+
+
+class StackSampler:
+    """Samples every thread's Python stack at a fixed interval into flamegraph folded-stack counts."""
+    def __init__(self, interval=STACK_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                file_name = os.path.basename(frame.f_code.co_filename)
+                if (thread_id == own_id or file_name in _IDLE_FILES
+                        or (file_name, frame.f_code.co_name) in _IDLE_FUNCTIONS):
+                    continue
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                frames.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(frames))] += 1
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class RunProfiler:
+    """CPU and allocation profile of one processing run.
+
+    cProfile runs on the calling thread and on every task the processor
+    submits to its pool; tracemalloc tracks allocations. Python 3.12+ allows
+    only one active cProfile per process, so there pool threads are covered
+    by the stack sampler alone. Stage times come
+    from the cumulative time of the functions in STAGE_FUNCTIONS; the split,
+    extract and merge phases also get wall time and peak traced memory.
+    Nothing is installed on the processor unless profiling is switched on.
+    """
+    def __init__(self, processor, sample_stacks=True):
+        self.processor = processor
+        self.sample_stacks = sample_stacks
+        self.phases = []
+        self.wall_seconds = 0.0
+        self.peak_memory = 0
+        self._profiles = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sampler = None
+        self._sampled_threads = 0
+        self._phase_snapshots = []
+
+    def _thread_profile(self):
+        """This thread's profile, or None when cProfile can't run on it."""
+        if not hasattr(self._local, "profile"):
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+                profile.disable()
+            except ValueError:
+                # Another profile is already active in this process
+                profile = None
+            with self._lock:
+                if profile is not None:
+                    self._profiles.append(profile)
+                else:
+                    self._sampled_threads += 1
+                    if self._sampler is None:
+                        self._sampler = StackSampler().start()
+            self._local.profile = profile
+        return self._local.profile
+
+    def _profiled_call(self, fn, *args, **kwargs):
+        profile = self._thread_profile()
+        if profile is None:
+            return fn(*args, **kwargs)
+        profile.enable()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.disable()
+
+    def _begin_phase(self, name):
+        tracemalloc.reset_peak()
+        self.phases.append({"phase": name, "started": time.perf_counter(),
+                            "start_memory": tracemalloc.get_traced_memory()[0]})
+
+    def _end_phase(self):
+        phase = self.phases[-1]
+        if "seconds" in phase:
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        phase["seconds"] = time.perf_counter() - phase.pop("started")
+        phase["peak_memory"] = peak
+        phase["retained_memory"] = current - phase.pop("start_memory")
+        self.peak_memory = max(self.peak_memory, peak)
+        self._phase_snapshots.append((phase["phase"], tracemalloc.take_snapshot()))
+
+    def _wrap_phase(self, name, method):
+        def wrapped(*args, **kwargs):
+            self._end_phase()
+            self._begin_phase(name)
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self._end_phase()
+                # Whatever runs between the split and the merge is date extraction
+                if name == "split":
+                    self._begin_phase("extract")
+        return wrapped
+
+    def run(self, fn, *args, **kwargs):
+        """Call fn(*args, **kwargs) under the profiler and return its result."""
+        processor = self.processor
+        executor = processor.executor
+        if executor is not None:
+            processor.executor = _ProfilingExecutor(executor, self)
+        for name, method_name in PHASE_METHODS:
+            setattr(processor, method_name, self._wrap_phase(name, getattr(processor, method_name)))
+        _start_tracing()
+        if self.sample_stacks:
+            self._sampler = StackSampler().start()
+        self._begin_phase("setup")
+        started = time.perf_counter()
+        try:
+            return self._profiled_call(fn, *args, **kwargs)
+        finally:
+            self.wall_seconds = time.perf_counter() - started
+            self._end_phase()
+            with self._lock:
+                if self._sampler:
+                    self._sampler.stop()
+            _stop_tracing()
+            processor.executor = executor
+            for _, method_name in PHASE_METHODS:
+                delattr(processor, method_name)
+
+    def stats(self):
+        stats = None
+        for profile in self._profiles:
+            if stats is None:
+                stats = pstats.Stats(profile)
+            else:
+                stats.add(profile)
+        return stats
+
+    def stage_times(self, stats):
+        """Seconds of (summed thread) time spent in each stage."""
+        totals = dict.fromkeys(STAGE_FUNCTIONS, 0.0)
+        for (file_name, _, function), (_, _, _, cumulative, _) in stats.stats.items():
+            base_name = os.path.basename(file_name)
+            for stage, functions in STAGE_FUNCTIONS.items():
+                if (base_name, function) in functions:
+                    totals[stage] += cumulative
+        totals["text extraction"] = max(0.0, totals["text extraction"] - totals["ocr"])
+        return totals
+
+    def write_report(self, output_file):
+        """Write the report bundle to a folder next to output_file and return its path.
+
+        - report.txt: stages, phases, hot functions and top allocation sites
+        - profile.prof: the merged cProfile data (pstats, snakeviz, ...)
+        - stacks.folded: sampled stacks for flamegraph.pl or speedscope
+        """
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        bundle_dir = f"{os.path.splitext(output_file)[0]}{PROFILE_DIR_SUFFIX}_{stamp}"
+        os.makedirs(bundle_dir, exist_ok=True)
+        stats = self.stats()
+        lines = [
+            "Processing run profile",
+            f"Output: {output_file}",
+            f"Wall time: {self.wall_seconds:.2f}s   Peak traced memory: {self.peak_memory / 2**20:.1f} MB   "
+            f"Profiled threads: {len(self._profiles)}",
+            "(page ranges split and partitions merged in worker processes are not included)",
+        ]
+        if self._sampled_threads:
+            lines.append(f"({self._sampled_threads} pool threads are only in stacks.folded: "
+                         "cProfile allows one active profile per process on this Python)")
+        lines += [
+            "",
+            "Stages (thread time, summed over threads)",
+        ]
+        if stats is not None:
+            stats.dump_stats(os.path.join(bundle_dir, "profile.prof"))
+            for stage, seconds in self.stage_times(stats).items():
+                lines.append(f"  {stage:<18} {seconds:9.2f}s")
+        lines += ["", "Phases (wall clock)"]
+        for phase in self.phases:
+            lines.append(f"  {phase['phase']:<18} {phase['seconds']:9.2f}s   peak {phase['peak_memory'] / 2**20:8.1f} MB"
+                         f"   retained {phase['retained_memory'] / 2**20:+8.1f} MB")
+        if stats is not None:
+            for sort_key, title in (("tottime", "own time"), ("cumulative", "cumulative time")):
+                out = io.StringIO()
+                stats.stream = out
+                stats.sort_stats(sort_key).print_stats(HOT_FUNCTIONS)
+                lines += ["", f"Hot functions by {title}", out.getvalue()]
+        lines += ["", "Top allocation sites still held at the end of each phase"]
+        previous = None
+        for phase, snapshot in self._phase_snapshots:
+            lines.append(f"  [{phase}]")
+            top = snapshot.compare_to(previous, "lineno") if previous else snapshot.statistics("lineno")
+            for stat in top[:TOP_ALLOCATIONS]:
+                if getattr(stat, "size_diff", stat.size) > 0:
+                    lines.append(f"    {stat}")
+            previous = snapshot
+        with open(os.path.join(bundle_dir, "report.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        if self._sampler:
+            self._sampler.write(os.path.join(bundle_dir, "stacks.folded"))
+        return bundle_dir
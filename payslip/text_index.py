@@ -0,0 +1,166 @@
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+
+from .payslip_index import content_hash
+
+TEXT_INDEX_FILE_NAME = "text_index.sqlite"
+COMMIT_EVERY = 100
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+SNIPPET_CHARS = 90
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS texts (
+    content_hash TEXT PRIMARY KEY,
+    length INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pages (
+    source TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    PRIMARY KEY (source, page)
+);
+CREATE INDEX IF NOT EXISTS idx_pages_hash ON pages(content_hash);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    tf INTEGER NOT NULL,
+    PRIMARY KEY (term, content_hash)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_postings_hash ON postings(content_hash);
+"""
+
+
+def tokenize(text):
+    """Lower-case alphanumeric terms; "REF-E100/2024" becomes ref, e100, 2024."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class TextIndex:
+    """Persistent inverted index over the extracted (or OCR'd) text of every page.
+
+    Postings are keyed by the hash of a page's text, so a page is only
+    tokenized when it is new or its text changed, and identical pages in
+    several sources share one set of postings. Queries match pages that
+    contain every term and rank them with BM25, boosting exact phrase hits.
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._pending = 0
+
+    def add(self, source, page, text):
+        """Index a page; returns False when it was already indexed with the same text."""
+        source = str(source)
+        page_hash = content_hash(text)
+        with self._lock:
+            row = self._conn.execute("SELECT content_hash FROM pages WHERE source = ? AND page = ?",
+                                     (source, page)).fetchone()
+            if row and row[0] == page_hash:
+                return False
+            self._conn.execute("INSERT OR REPLACE INTO pages (source, page, content_hash) VALUES (?, ?, ?)",
+                               (source, page, page_hash))
+            if row:
+                self._drop_orphan(row[0])
+            if self._conn.execute("SELECT 1 FROM texts WHERE content_hash = ?", (page_hash,)).fetchone() is None:
+                terms = Counter(tokenize(text))
+                self._conn.execute("INSERT INTO texts (content_hash, length, text) VALUES (?, ?, ?)",
+                                   (page_hash, sum(terms.values()), text))
+                self._conn.executemany("INSERT INTO postings (term, content_hash, tf) VALUES (?, ?, ?)",
+                                       [(term, page_hash, tf) for term, tf in terms.items()])
+            self._pending += 1
+            if self._pending >= COMMIT_EVERY:
+                self._conn.commit()
+                self._pending = 0
+        return True
+
+    def _drop_orphan(self, page_hash):
+        if self._conn.execute("SELECT 1 FROM pages WHERE content_hash = ?", (page_hash,)).fetchone() is None:
+            self._conn.execute("DELETE FROM postings WHERE content_hash = ?", (page_hash,))
+            self._conn.execute("DELETE FROM texts WHERE content_hash = ?", (page_hash,))
+
+    def search(self, query, limit=50):
+        """Return [{"source", "page", "score", "snippet"}] for pages matching every query term, best first."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        with self._lock:
+            total_docs, avg_length = self._conn.execute("SELECT COUNT(*), AVG(length) FROM texts").fetchone()
+            if not total_docs:
+                return []
+            postings = []
+            # Rarest term first so the candidate set shrinks as fast as possible
+            for term in terms:
+                rows = self._conn.execute("SELECT content_hash, tf FROM postings WHERE term = ?", (term,)).fetchall()
+                if not rows:
+                    return []
+                postings.append(dict(rows))
+            postings.sort(key=len)
+            candidates = set(postings[0])
+            for term_postings in postings[1:]:
+                candidates &= term_postings.keys()
+                if not candidates:
+                    return []
+            texts = {}
+            for page_hash in candidates:
+                texts[page_hash] = self._conn.execute("SELECT length, text FROM texts WHERE content_hash = ?",
+                                                      (page_hash,)).fetchone()
+            locations = {}
+            for page_hash in candidates:
+                locations[page_hash] = self._conn.execute(
+                    "SELECT source, page FROM pages WHERE content_hash = ? ORDER BY source, page",
+                    (page_hash,)).fetchall()
+
+        phrase = " ".join(query.lower().split())
+        scored = []
+        for page_hash in candidates:
+            length, text = texts[page_hash]
+            score = 0.0
+            for term_postings in postings:
+                df = len(term_postings)
+                tf = term_postings[page_hash]
+                idf = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+                score += idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / (avg_length or 1)))
+            flat_text = " ".join(text.lower().split())
+            if len(terms) > 1 and phrase in flat_text:
+                score *= 2
+            snippet = self._snippet(text, flat_text, phrase if phrase in flat_text else terms[0])
+            for source, page in locations[page_hash]:
+                scored.append({"source": source, "page": page, "score": score, "snippet": snippet})
+        scored.sort(key=lambda r: (-r["score"], r["source"], r["page"]))
+        return scored[:limit] if limit else scored
+
+    def _snippet(self, text, flat_text, needle):
+        position = flat_text.find(needle)
+        if position < 0:
+            position = 0
+        flat = " ".join(text.split())
+        start = max(0, position - SNIPPET_CHARS // 3)
+        snippet = flat[start:start + SNIPPET_CHARS]
+        return ("…" if start else "") + snippet + ("…" if start + SNIPPET_CHARS < len(flat) else "")
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def flush(self):
+        with self._lock:
+            self._conn.commit()
+            self._pending = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
@@ -0,0 +1,236 @@
+import collections
+import hashlib
+import io
+import os
+import threading
+
+from .archive_reader import ArchiveReader, is_archive
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:  # Fall back to pdfplumber's (slower) renderer
+    pdfium = None
+
+THUMBNAIL_DIR_NAME = "thumbnails"
+THUMBNAIL_SIZE = (96, 128)
+# Rendered PNGs are ~5-15 KB, so these bound memory to a few MB and disk to 200 MB
+MEMORY_ITEMS = 400
+DISK_BYTES = 200 * 1024 * 1024
+# Parsed documents kept open by the renderer; neighbouring rows usually share a source
+OPEN_DOCUMENTS = 4
+
+
+def split_source(source):
+    """Undo str(ArchiveMember): return (archive path, member name), or (path, None) for plain files."""
+    if "::" in source:
+        archive_path, name = source.split("::", 1)
+        if is_archive(archive_path):
+            return archive_path, name
+    return source, None
+
+
+def thumbnail_key(entry, size=THUMBNAIL_SIZE):
+    """Cache key of a preview entry's thumbnail: its page content key plus the size."""
+    key = entry.get("key") or f"{entry['source']}:{entry['page']}"
+    return hashlib.sha1(f"{key}:{size[0]}x{size[1]}".encode("utf-8")).hexdigest()
+
+
+class ThumbnailCache:
+    """Two-level LRU of rendered thumbnails (PNG bytes).
+
+    The memory level holds the most recent `memory_items`; the disk level
+    keeps up to `disk_bytes` under cache_dir, evicting the least recently
+    used files (by mtime, touched on every hit).
+    """
+    def __init__(self, cache_dir, memory_items=MEMORY_ITEMS, disk_bytes=DISK_BYTES):
+        self.cache_dir = cache_dir
+        self.memory_items = memory_items
+        self.disk_bytes = disk_bytes
+        self._memory = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_usage = None
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".png")
+
+    def peek(self, key):
+        """Memory-only lookup, cheap enough for the GUI thread."""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+            return data
+
+    def get(self, key):
+        data = self.peek(key)
+        if data is not None:
+            return data
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        self._remember(key, data)
+        return data
+
+    def put(self, key, data):
+        self._remember(key, data)
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = path + ".tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError:
+            return
+        if self._disk_usage is None:
+            self._disk_usage = sum(size for _, size, _ in self._disk_files())
+        else:
+            self._disk_usage += len(data)
+        if self._disk_usage > self.disk_bytes:
+            self._evict_disk()
+
+    def _remember(self, key, data):
+        with self._lock:
+            self._memory[key] = data
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def _disk_files(self):
+        files = []
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def _evict_disk(self):
+        # Evict down to 90% so a full cache isn't rescanned on every put
+        files = sorted(self._disk_files())
+        usage = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if usage <= self.disk_bytes * 0.9:
+                break
+            try:
+                os.remove(path)
+                usage -= size
+            except OSError:
+                pass
+        self._disk_usage = usage
+
+
+class ThumbnailRenderer:
+    """Renders thumbnails in one background thread, only for the rows the view asks for.
+
+    Each request() replaces the pending set, so rows scrolled out of view
+    before their turn are never rendered. on_ready(key, png_bytes) is called
+    from the render thread; png_bytes is None if the page could not be rendered.
+    """
+    def __init__(self, cache, on_ready, size=THUMBNAIL_SIZE):
+        self.cache = cache
+        self.on_ready = on_ready
+        self.size = size
+        self.archive_reader = ArchiveReader()
+        self._wanted = collections.OrderedDict()
+        self._documents = collections.OrderedDict()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = None
+
+    def request(self, entries):
+        """Render (or load from disk) the thumbnails of entries, in order, dropping earlier requests."""
+        with self._cond:
+            self._wanted = collections.OrderedDict((thumbnail_key(entry, self.size), entry) for entry in entries)
+            if self._thread is None and self._wanted:
+                self._thread = threading.Thread(target=self._run, name="thumbnails", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._wanted.clear()
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout=2)
+        self.archive_reader.close()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._wanted and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    break
+                key, entry = self._wanted.popitem(last=False)
+            data = self.cache.get(key)
+            if data is None:
+                try:
+                    data = self._render(entry)
+                    self.cache.put(key, data)
+                except Exception:
+                    data = None
+            self.on_ready(key, data)
+        # pdfium documents are only touched from this thread
+        self._close_documents()
+
+    def _render(self, entry):
+        width, height = self.size
+        if pdfium is not None:
+            document = self._document(entry["source"])
+            page = document[entry["page"] - 1]
+            try:
+                page_width, page_height = page.get_size()
+                scale = min(width / page_width, height / page_height)
+                image = page.render(scale=scale).to_pil()
+            finally:
+                page.close()
+        else:
+            import pdfplumber
+
+            with pdfplumber.open(self._open(entry["source"])) as pdf:
+                page = pdf.pages[entry["page"] - 1]
+                resolution = 72 * min(width / float(page.width), height / float(page.height))
+                image = page.to_image(resolution=resolution).original
+        out = io.BytesIO()
+        image.convert("RGB").save(out, "PNG", optimize=True)
+        return out.getvalue()
+
+    def _open(self, source):
+        path, member_name = split_source(source)
+        if member_name is None:
+            return path
+        member = self.archive_reader.member(path, member_name)
+        if member is None:
+            raise FileNotFoundError(source)
+        return member.open()
+
+    def _document(self, source):
+        document = self._documents.get(source)
+        if document is not None:
+            self._documents.move_to_end(source)
+            return document
+        opened = self._open(source)
+        document = pdfium.PdfDocument(opened.read() if hasattr(opened, "read") else opened)
+        self._documents[source] = document
+        while len(self._documents) > OPEN_DOCUMENTS:
+            _, oldest = self._documents.popitem(last=False)
+            oldest.close()
+        return document
+
+    def _close_documents(self):
+        for document in self._documents.values():
+            try:
+                document.close()
+            except Exception:
+                pass
+        self._documents.clear()
@@ -0,0 +1,6 @@
+"""
+Server package for Payslip Manager: local HTTP job server and its client
+"""
+from .job_server import JobServer, run_server, DEFAULT_HOST, DEFAULT_PORT
+
+__all__ = ['JobServer', 'run_server', 'DEFAULT_HOST', 'DEFAULT_PORT']
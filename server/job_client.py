@@ -0,0 +1,191 @@
+"""
+Job client module: submits payslip jobs to a job server and follows their progress
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+import zipfile
+
+import requests
+
+from payslip.archive_reader import is_archive
+from payslip.payslip_processor import TEMP_DIR_NAME
+from payslip.job_scheduler import default_output_file, QUEUED, RUNNING, DONE, FAILED, CANCELLED
+from .job_server import TOKEN_HEADER
+
+
+class JobServerError(Exception):
+    """Raised when the job server rejects a request or cannot be reached."""
+
+
+class JobClient:
+    """Thin HTTP client for the job server API."""
+    def __init__(self, base_url, token=None, timeout=10):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        if token:
+            self.session.headers[TOKEN_HEADER] = token
+
+    def _check(self, response):
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = {}
+        if response.status_code >= 400 or not payload.get("success", False):
+            raise JobServerError(payload.get("message", f"HTTP {response.status_code}"))
+        return payload.get("data")
+
+    def health(self):
+        try:
+            return self.session.get(f"{self.base_url}/health", timeout=self.timeout).status_code == 200
+        except requests.RequestException:
+            return False
+
+    def submit_path(self, input_path, priority=0):
+        """Queue a folder or archive that the server can reach at the same path."""
+        response = self.session.post(f"{self.base_url}/jobs", json={"input_path": input_path, "priority": priority},
+                                     timeout=self.timeout)
+        return self._check(response)
+
+    def submit_upload(self, input_path, priority=0):
+        """Upload a local archive as it is, or a folder zipped on the fly, and queue it.
+
+        A folder's PDFs and archives are zipped with their relative paths; the
+        server unpacks the nested archives, so the job sees what a local run would.
+        """
+        if is_archive(input_path):
+            return self._post_archive(input_path, priority)
+        if not os.path.isdir(input_path):
+            raise JobServerError(f"{input_path} is not a folder or archive")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            zip_path = os.path.join(tmp_dir, "payslips.zip")
+            added = 0
+            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_STORED) as zf:
+                for root, dirs, files in os.walk(input_path):
+                    dirs[:] = [d for d in dirs if d != TEMP_DIR_NAME]
+                    for file in files:
+                        file_path = os.path.join(root, file)
+                        if file.lower().endswith('.pdf') or is_archive(file_path):
+                            # PDFs and archives are already compressed; storing keeps zipping cheap
+                            zf.write(file_path, os.path.relpath(file_path, input_path))
+                            added += 1
+            if not added:
+                raise JobServerError(f"No PDF files or archives found in {input_path}")
+            return self._post_archive(zip_path, priority)
+
+    def _post_archive(self, archive_path, priority):
+        content_type = "application/zip" if archive_path.lower().endswith('.zip') else "application/octet-stream"
+        with open(archive_path, 'rb') as f:
+            response = self.session.post(f"{self.base_url}/jobs", data=f, headers={"Content-Type": content_type},
+                                         params={"priority": priority, "name": os.path.basename(archive_path)},
+                                         timeout=None)
+        return self._check(response)
+
+    def status(self, job_id):
+        return self._check(self.session.get(f"{self.base_url}/jobs/{job_id}", timeout=self.timeout))
+
+    def list_jobs(self):
+        return self._check(self.session.get(f"{self.base_url}/jobs", timeout=self.timeout))
+
+    def cancel(self, job_id):
+        return self._check(self.session.delete(f"{self.base_url}/jobs/{job_id}", timeout=self.timeout))
+
+    def events(self, job_id):
+        """Yield {"status": ..., "log": [...]} events until the job finishes."""
+        with self.session.get(f"{self.base_url}/jobs/{job_id}/events", stream=True,
+                              timeout=(self.timeout, None)) as response:
+            if response.status_code != 200:
+                self._check(response)
+            for line in response.iter_lines(decode_unicode=True):
+                if line and line.startswith("data: "):
+                    yield json.loads(line[len("data: "):])
+
+    def download_result(self, job_id, output_file):
+        os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+        with self.session.get(f"{self.base_url}/jobs/{job_id}/result", stream=True,
+                              timeout=(self.timeout, None)) as response:
+            if response.status_code != 200:
+                self._check(response)
+            tmp_file = output_file + ".part"
+            with open(tmp_file, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=1024 * 1024):
+                    f.write(chunk)
+            os.replace(tmp_file, output_file)
+        return output_file
+
+
+class RemoteJob:
+    """A job running on a job server, mirrored locally for the GUI.
+
+    Exposes the same fields the jobs table reads from local jobs, and follows
+    the server's event stream in a background thread, downloading the merged
+    PDF to output_file when the job is done.
+    """
+    def __init__(self, client, input_path, priority=0, upload=True, log_callback=None, output_file=None):
+        self.client = client
+        self.input_path = input_path
+        self.output_file = output_file or default_output_file(input_path)
+        self.priority = priority
+        self.upload = upload
+        self.log_callback = log_callback
+        self.remote_id = None
+        self.id = None
+        self.status = QUEUED
+        self.progress = 0.0
+        self.throughput = 0.0
+        self.error = None
+        self.started_at = None
+
+    @property
+    def name(self):
+        return os.path.basename(os.path.normpath(self.input_path)) or self.input_path
+
+    @property
+    def is_active(self):
+        return self.status in (QUEUED, RUNNING)
+
+    def start(self):
+        threading.Thread(target=self._run, name=f"remote-job-{self.name}", daemon=True).start()
+        return self
+
+    def cancel(self):
+        if self.remote_id:
+            try:
+                self.client.cancel(self.remote_id)
+            except (requests.RequestException, JobServerError) as e:
+                self._log(f"Cancel failed: {e}", "Warning")
+
+    def _log(self, message, level="Info"):
+        if self.log_callback:
+            self.log_callback(message, level)
+
+    def _run(self):
+        try:
+            submit = self.client.submit_upload if self.upload else self.client.submit_path
+            status = submit(self.input_path, self.priority)
+            self.remote_id = status["id"]
+            self.started_at = time.time()
+            self._log(f"Submitted to server as job {self.remote_id}")
+            for event in self.client.events(self.remote_id):
+                status = event["status"]
+                self.status = status["status"]
+                self.progress = status.get("progress", self.progress)
+                self.throughput = status.get("pages_per_second", self.throughput)
+                for entry in event.get("log", []):
+                    self._log(entry["message"], entry["level"])
+            if self.status == DONE:
+                self.client.download_result(self.remote_id, self.output_file)
+                self.progress = 100.0
+                self._log(f"Downloaded result to {self.output_file}", "Success")
+            elif self.status == FAILED:
+                self.error = status.get("error")
+                self._log(f"Server job failed: {self.error}", "Error")
+        except (requests.RequestException, JobServerError, KeyError, ValueError) as e:
+            self.status = FAILED
+            self.error = str(e)
+            self._log(f"Job server error: {e}", "Error")
+        if self.status in (QUEUED, RUNNING):
+            self.status = CANCELLED
@@ -0,0 +1,417 @@
+"""
+Job server module: accepts payslip jobs over a local HTTP API
+"""
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from payslip.archive_reader import ArchiveReader, ARCHIVE_EXTENSIONS, is_archive
+from payslip.job_scheduler import JobScheduler, DEFAULT_MAX_CONCURRENT_JOBS, QUEUED, RUNNING, DONE, FAILED, CANCELLED
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+TOKEN_HEADER = "X-Payslip-Token"
+EVENT_INTERVAL = 1.0
+MAX_UPLOAD_BYTES = 4 * 1024 * 1024 * 1024
+
+_JOB_PATH = re.compile(r"^/jobs/([0-9a-f]{32})(/events|/result)?$")
+
+
+class JobServer:
+    """Runs a JobScheduler behind an HTTP API, persisting the job list in data_dir.
+
+    Jobs can reference a folder or archive path visible to the server, or
+    upload a ZIP of payslips in the request body. Jobs that were queued or
+    running when the server stopped are queued again on start, and resume
+    from their journal.
+    """
+    def __init__(self, data_dir, host=DEFAULT_HOST, port=DEFAULT_PORT,
+                 max_concurrent_jobs=DEFAULT_MAX_CONCURRENT_JOBS, token=None, processor_factory=None):
+        self.data_dir = data_dir
+        self.host = host
+        self.port = port
+        self.token = token
+        self.uploads_dir = os.path.join(data_dir, "uploads")
+        self.results_dir = os.path.join(data_dir, "results")
+        self.jobs_file = os.path.join(data_dir, "jobs.json")
+        for path in (self.uploads_dir, self.results_dir):
+            os.makedirs(path, exist_ok=True)
+        self._processor_factory = processor_factory or self._default_processor_factory()
+        self.scheduler = JobScheduler(self._processor_factory, max_concurrent_jobs=max_concurrent_jobs,
+                                      on_job_finished=self._on_job_finished)
+        self.records = {}
+        self._live = {}
+        self._lock = threading.Lock()
+        self.httpd = None
+        self._load_jobs()
+
+    def _default_processor_factory(self):
+        # Imported here so the server module loads without the PDF libraries
+        from payslip.cache_manager import PDFCacheManager
+        from payslip.payslip_processor import PayslipProcessor
+        cache_manager = PDFCacheManager(os.path.join(self.data_dir, "cache"))
+        return lambda job: PayslipProcessor(cache_manager)
+
+    # Job bookkeeping
+
+    def submit(self, input_path, priority=0, upload=False, output_file=None):
+        job_id = uuid.uuid4().hex
+        if output_file is None:
+            output_file = os.path.join(self.results_dir, f"{job_id}.pdf")
+        record = {
+            "id": job_id,
+            "input_path": input_path,
+            "output_file": output_file,
+            "priority": priority,
+            "upload": upload,
+            "status": QUEUED,
+            "submitted_at": time.time(),
+            "finished_at": None,
+            "pages_processed": 0,
+            "error": None,
+        }
+        with self._lock:
+            self.records[job_id] = record
+        if not self._schedule(record):
+            with self._lock:
+                del self.records[job_id]
+            return None
+        self._save_jobs()
+        return self.job_status(job_id)
+
+    def _schedule(self, record):
+        job = self.scheduler.submit(record["input_path"], record["output_file"], record["priority"])
+        if job is None:
+            return False
+        with self._lock:
+            self._live[record["id"]] = job
+        return True
+
+    def job_status(self, job_id):
+        with self._lock:
+            record = self.records.get(job_id)
+            if record is None:
+                return None
+            status = dict(record)
+            job = self._live.get(job_id)
+        if job is not None:
+            status.update(status=job.status, progress=round(job.progress, 1),
+                          pages_processed=job.pages_processed,
+                          pages_per_second=round(job.throughput, 2), error=job.error)
+        else:
+            status.setdefault("progress", 100.0 if record["status"] == DONE else 0.0)
+        status["has_result"] = status["status"] == DONE and os.path.exists(record["output_file"])
+        del status["output_file"]
+        return status
+
+    def list_jobs(self):
+        with self._lock:
+            job_ids = list(self.records)
+        return [self.job_status(job_id) for job_id in job_ids]
+
+    def job_log(self, job_id, since=0.0):
+        with self._lock:
+            job = self._live.get(job_id)
+        if job is None:
+            return []
+        return [{"time": t, "level": level, "message": message}
+                for t, level, message in list(job.log_lines) if t > since]
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self._live.get(job_id)
+        if job is None:
+            return False
+        self.scheduler.cancel(job)
+        if job.status == CANCELLED:
+            self._on_job_finished(job)
+        return True
+
+    def _on_job_finished(self, job):
+        with self._lock:
+            for job_id, live in self._live.items():
+                if live is job:
+                    record = self.records[job_id]
+                    record.update(status=job.status, finished_at=job.finished_at,
+                                  pages_processed=job.pages_processed, error=job.error)
+                    if record["upload"] and job.status in (DONE, FAILED, CANCELLED):
+                        self._remove_upload(record)
+                    break
+        self._save_jobs()
+
+    def _remove_upload(self, record):
+        input_path = record["input_path"]
+        upload_dir = input_path if os.path.isdir(input_path) else os.path.dirname(input_path)
+        if os.path.abspath(upload_dir) != os.path.abspath(self.uploads_dir):
+            shutil.rmtree(upload_dir, ignore_errors=True)
+            return
+        try:
+            os.remove(record["input_path"])  # Uploaded before uploads had their own folders
+        except OSError:
+            pass
+
+    def _load_jobs(self):
+        try:
+            with open(self.jobs_file, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+        except (OSError, ValueError):
+            return
+        for record in records:
+            self.records[record["id"]] = record
+            if record["status"] in (QUEUED, RUNNING):
+                record["status"] = QUEUED
+                try:
+                    if not self._schedule(record):
+                        record["status"] = FAILED
+                        record["error"] = "Duplicate job"
+                except ValueError as e:
+                    record["status"] = FAILED
+                    record["error"] = str(e)
+        self._save_jobs()
+
+    def _save_jobs(self):
+        with self._lock:
+            for job_id, job in self._live.items():
+                self.records[job_id].update(status=job.status, pages_processed=job.pages_processed,
+                                            finished_at=job.finished_at, error=job.error)
+            records = list(self.records.values())
+            tmp_file = self.jobs_file + ".tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(records, f, indent=2)
+            os.replace(tmp_file, self.jobs_file)
+
+    # HTTP server
+
+    def serve_forever(self):
+        self.httpd = ThreadingHTTPServer((self.host, self.port), _make_handler(self))
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        logger.info(f"Job server listening on http://{self.host}:{self.port}")
+        try:
+            self.httpd.serve_forever()
+        finally:
+            self.httpd.server_close()
+
+    def start(self):
+        """Serve from a background thread; returns once the port is bound."""
+        self.httpd = ThreadingHTTPServer((self.host, self.port), _make_handler(self))
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        threading.Thread(target=self.httpd.serve_forever, name="job-server", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+        self.scheduler.shutdown()
+        self._save_jobs()
+
+
+def _upload_extension(name):
+    """Archive extension of an uploaded file's original name (.zip when unknown)."""
+    for extension in sorted(ARCHIVE_EXTENSIONS, key=len, reverse=True):
+        if name.lower().endswith(extension):
+            return extension
+    return ".zip"
+
+
+def _prepare_upload(upload_path, upload_dir):
+    """Return (job input path, number of PDFs) for an uploaded archive.
+
+    Archives nested in an uploaded ZIP (a zipped folder that held archives)
+    are unpacked next to it, and the job then runs over the upload folder,
+    so they are processed just like archives in a local folder.
+    """
+    reader = ArchiveReader()
+    try:
+        pdf_count = len(reader.members(upload_path))
+        nested = []
+        if zipfile.is_zipfile(upload_path):
+            with zipfile.ZipFile(upload_path) as zf:
+                for info in zf.infolist():
+                    name = os.path.normpath(info.filename.replace("\\", "/"))
+                    if (info.is_dir() or not name.lower().endswith(ARCHIVE_EXTENSIONS)
+                            or os.path.isabs(name) or name.split(os.sep)[0] == ".."):
+                        continue
+                    nested_path = os.path.join(upload_dir, "archives", name)
+                    os.makedirs(os.path.dirname(nested_path), exist_ok=True)
+                    with zf.open(info) as src, open(nested_path, 'wb') as dst:
+                        shutil.copyfileobj(src, dst)
+                    nested.append(nested_path)
+        for nested_path in nested:
+            pdf_count += len(reader.members(nested_path))
+    finally:
+        reader.close()
+    return (upload_dir if nested else upload_path), pdf_count
+
+
+def _make_handler(server):
+    class JobRequestHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            logger.info("%s - %s", self.address_string(), format % args)
+
+        def _authorized(self):
+            if server.token and self.headers.get(TOKEN_HEADER) != server.token:
+                self._send_json({"success": False, "message": "Invalid token"}, 401)
+                return False
+            return True
+
+        def _send_json(self, payload, status=200):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _not_found(self):
+            self._send_json({"success": False, "message": "Not found"}, 404)
+
+        def do_GET(self):
+            if not self._authorized():
+                return
+            url = urlparse(self.path)
+            if url.path == "/health":
+                return self._send_json({"success": True, "jobs": len(server.records)})
+            if url.path == "/jobs":
+                return self._send_json({"success": True, "data": server.list_jobs()})
+            match = _JOB_PATH.match(url.path)
+            if not match or server.job_status(match.group(1)) is None:
+                return self._not_found()
+            job_id, action = match.groups()
+            if action is None:
+                return self._send_json({"success": True, "data": server.job_status(job_id)})
+            if action == "/events":
+                return self._stream_events(job_id)
+            return self._send_result(job_id)
+
+        def do_POST(self):
+            if not self._authorized():
+                return
+            url = urlparse(self.path)
+            if url.path != "/jobs":
+                return self._not_found()
+            query = parse_qs(url.query)
+            try:
+                priority = int(query.get("priority", ["0"])[0])
+                length = int(self.headers.get("Content-Length", "0"))
+            except ValueError:
+                return self._send_json({"success": False, "message": "Invalid request"}, 400)
+            if length > MAX_UPLOAD_BYTES:
+                return self._send_json({"success": False, "message": "Upload too large"}, 413)
+            content_type = self.headers.get("Content-Type", "").split(";")[0].strip()
+            if content_type in ("application/zip", "application/octet-stream"):
+                return self._submit_upload(length, priority, query.get("name", ["upload.zip"])[0])
+            try:
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                return self._send_json({"success": False, "message": "Invalid JSON"}, 400)
+            input_path = payload.get("input_path", "")
+            if not (os.path.isdir(input_path) or is_archive(input_path)):
+                return self._send_json({"success": False, "message": "input_path is not a folder or archive on the server"}, 400)
+            status = server.submit(input_path, int(payload.get("priority", priority)))
+            if status is None:
+                return self._send_json({"success": False, "message": "That input is already queued"}, 409)
+            self._send_json({"success": True, "data": status}, 201)
+
+        def _submit_upload(self, length, priority, name):
+            # Each upload gets its own folder, so concurrent jobs never share split pages or outputs
+            upload_dir = os.path.join(server.uploads_dir, uuid.uuid4().hex)
+            os.makedirs(upload_dir)
+            upload_path = os.path.join(upload_dir, "upload" + _upload_extension(name))
+            remaining = length
+            with open(upload_path, 'wb') as f:
+                while remaining > 0:
+                    chunk = self.rfile.read(min(1024 * 1024, remaining))
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    remaining -= len(chunk)
+            if remaining or not is_archive(upload_path):
+                server._remove_upload({"input_path": upload_path})
+                return self._send_json({"success": False, "message": "Upload was incomplete or not an archive"}, 400)
+            try:
+                input_path, pdf_count = _prepare_upload(upload_path, upload_dir)
+            except Exception as e:
+                server._remove_upload({"input_path": upload_path})
+                return self._send_json({"success": False, "message": f"Upload is not a readable archive: {e}"}, 400)
+            if not pdf_count:
+                server._remove_upload({"input_path": upload_path})
+                return self._send_json({"success": False, "message": "Upload contains no PDF files"}, 400)
+            status = server.submit(input_path, priority, upload=True)
+            self._send_json({"success": True, "data": status}, 201)
+
+        def do_DELETE(self):
+            if not self._authorized():
+                return
+            match = _JOB_PATH.match(urlparse(self.path).path)
+            if not match or match.group(2) or not server.cancel(match.group(1)):
+                return self._not_found()
+            self._send_json({"success": True, "data": server.job_status(match.group(1))})
+
+        def _stream_events(self, job_id):
+            """Stream status and new log lines as server-sent events until the job finishes."""
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            last_log = 0.0
+            try:
+                while True:
+                    status = server.job_status(job_id)
+                    log = server.job_log(job_id, since=last_log)
+                    if log:
+                        last_log = log[-1]["time"]
+                    event = json.dumps({"status": status, "log": log})
+                    self.wfile.write(f"data: {event}\n\n".encode())
+                    self.wfile.flush()
+                    if status["status"] not in (QUEUED, RUNNING):
+                        break
+                    time.sleep(EVENT_INTERVAL)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def _send_result(self, job_id):
+            with server._lock:
+                record = server.records[job_id]
+            output_file = record["output_file"]
+            if server.job_status(job_id)["status"] != DONE or not os.path.exists(output_file):
+                return self._send_json({"success": False, "message": "Result not available"}, 409)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/pdf")
+            self.send_header("Content-Length", str(os.path.getsize(output_file)))
+            self.send_header("Content-Disposition", f'attachment; filename="{job_id}.pdf"')
+            self.end_headers()
+            with open(output_file, 'rb') as f:
+                shutil.copyfileobj(f, self.wfile)
+
+    return JobRequestHandler
+
+
+def run_server(data_dir, host=DEFAULT_HOST, port=DEFAULT_PORT,
+               max_concurrent_jobs=DEFAULT_MAX_CONCURRENT_JOBS, token=None):
+    """Run the job server until interrupted."""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    server = JobServer(data_dir, host, port, max_concurrent_jobs, token)
+    print(f"Payslip job server on http://{host}:{port} (data in {data_dir}). Press Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
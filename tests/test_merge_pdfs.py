@@ -0,0 +1,52 @@
+import PyPDF2
+
+from payslip import document_cache
+from payslip.cache_manager import PDFCacheManager
+from payslip.document_cache import DEFAULT_MAX_DOCUMENTS
+from payslip.payslip_processor import PayslipProcessor
+
+PAGES_PER_SOURCE = 3
+
+
+def _write_source(path, width):
+    writer = PyPDF2.PdfWriter()
+    for _ in range(PAGES_PER_SOURCE):
+        writer.add_blank_page(width=width, height=842)
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+def test_merge_parses_each_source_once_with_more_sources_than_cache(tmp_path, monkeypatch):
+    source_count = DEFAULT_MAX_DOCUMENTS + 4
+    processor = PayslipProcessor(PDFCacheManager(str(tmp_path / "cache")))
+    sources = []
+    for n in range(source_count):
+        path = str(tmp_path / f"source_{n}.pdf")
+        _write_source(path, width=500 + n)
+        processor.documents.register(path)
+        sources.append(path)
+    # Date order interleaves the sources: page 1 of every source, then page 2, ...
+    pages = []
+    for page_num in range(1, PAGES_PER_SOURCE + 1):
+        for path in sources:
+            page_file = f"{path}#{page_num}"
+            processor.page_origins[page_file] = (path, page_num)
+            pages.append(page_file)
+
+    parsed = []
+    reader_class = PyPDF2.PdfReader
+
+    def counting_reader(stream, *args, **kwargs):
+        parsed.append(stream)
+        return reader_class(stream, *args, **kwargs)
+
+    monkeypatch.setattr(document_cache.PyPDF2, "PdfReader", counting_reader)
+    output_file = str(tmp_path / "merged.pdf")
+    processor.merge_pdfs(pages, output_file)
+    monkeypatch.undo()
+
+    assert len(parsed) == source_count
+    merged = PyPDF2.PdfReader(output_file)
+    assert len(merged.pages) == source_count * PAGES_PER_SOURCE
+    widths = [int(page.mediabox.width) for page in merged.pages]
+    assert widths == [500 + n for _ in range(PAGES_PER_SOURCE) for n in range(source_count)]
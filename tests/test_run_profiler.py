@@ -0,0 +1,85 @@
+import cProfile
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from payslip import run_profiler
+from payslip.run_profiler import RunProfiler
+
+
+class _Processor:
+    """The parts of PayslipProcessor that RunProfiler touches."""
+    def __init__(self, executor):
+        self.executor = executor
+
+    def split_sources(self):
+        return [self.executor.submit(_pool_work, n) for n in range(4)]
+
+    def write_output(self, results):
+        return sum(results)
+
+
+def _pool_work(n):
+    return sum(i * i for i in range(20000 + n))
+
+
+def _job(processor):
+    futures = processor.split_sources()
+    return processor.write_output([future.result() for future in futures])
+
+
+class _OneActiveProfile(cProfile.Profile):
+    """cProfile as on Python 3.12+: enabling a second profile raises ValueError."""
+    _active = None
+    _lock = threading.Lock()
+
+    def enable(self, *args, **kwargs):
+        with self._lock:
+            if _OneActiveProfile._active not in (None, self):
+                raise ValueError("Another profiling tool is already active")
+            _OneActiveProfile._active = self
+        super().enable(*args, **kwargs)
+
+    def disable(self):
+        super().disable()
+        with self._lock:
+            if _OneActiveProfile._active is self:
+                _OneActiveProfile._active = None
+
+
+def _run(tmp_path):
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        processor = _Processor(executor)
+        profiler = RunProfiler(processor)
+        result = profiler.run(_job, processor)
+        assert processor.executor is executor
+    report_dir = profiler.write_report(str(tmp_path / "merged.pdf"))
+    return profiler, result, report_dir
+
+
+def _profiled_functions(profiler):
+    return {function for (_, _, function) in profiler.stats().stats}
+
+
+def test_profiled_job_through_executor(tmp_path):
+    profiler, result, report_dir = _run(tmp_path)
+
+    assert result == sum(_pool_work(n) for n in range(4))
+    if len(profiler._profiles) > 1:
+        assert "_pool_work" in _profiled_functions(profiler)
+    assert [phase["phase"] for phase in profiler.phases] == ["setup", "split", "extract", "merge"]
+    assert os.path.exists(os.path.join(report_dir, "report.txt"))
+
+
+def test_pool_threads_fall_back_to_sampler_when_one_profile_allowed(tmp_path, monkeypatch):
+    monkeypatch.setattr(run_profiler.cProfile, "Profile", _OneActiveProfile)
+
+    profiler, result, report_dir = _run(tmp_path)
+
+    assert result == sum(_pool_work(n) for n in range(4))
+    assert len(profiler._profiles) == 1
+    assert profiler._sampled_threads >= 1
+    assert "_job" in _profiled_functions(profiler)
+    with open(os.path.join(report_dir, "report.txt"), encoding="utf-8") as f:
+        assert "only in stacks.folded" in f.read()
+    assert os.path.exists(os.path.join(report_dir, "stacks.folded"))
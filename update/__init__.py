@@ -1,6 +1,11 @@
 """
 Update package for Payslip Manager
 """
-from .update_manager import check_for_update, AUTO_UPDATE_CHECK_ON_START
+from .update_manager import (check_for_update, check_for_update_async, check_internet_connection,
+                             download_update, is_newer_version, parse_version, AUTO_UPDATE_CHECK_ON_START)
+from .downloader import UpdateError, download_file
+from .delta import make_delta, apply_delta
 
-__all__ = ['check_for_update', 'AUTO_UPDATE_CHECK_ON_START']
+__all__ = ['check_for_update', 'check_for_update_async', 'check_internet_connection',
+           'download_update', 'is_newer_version', 'parse_version', 'UpdateError', 'download_file',
+           'make_delta', 'apply_delta', 'AUTO_UPDATE_CHECK_ON_START']
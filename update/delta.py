@@ -0,0 +1,154 @@
+"""
+Binary delta patches between two release bundles
+
+A patch is a header followed by a list of operations that rebuild the new
+bundle from the old one:
+
+    header   b"PSDELTA1" | target size (u64) | target SHA-256 (32 bytes)
+    copy     b"C" | source offset (u64) | length (u32)
+    insert   b"I" | length (u32) | data
+    end      b"E"
+
+Patches are built rsync-style: the old bundle is indexed by a rolling
+checksum of each aligned block, the new bundle is scanned one byte at a
+time, and matching blocks become copies while everything else is inserted.
+"""
+import hashlib
+import os
+import struct
+from itertools import accumulate
+
+from .downloader import UpdateError
+
+MAGIC = b"PSDELTA1"
+HEADER = struct.Struct(">8sQ32s")
+COPY = struct.Struct(">QI")
+INSERT = struct.Struct(">I")
+DEFAULT_BLOCK_SIZE = 4096
+COPY_CHUNK_SIZE = 1024 * 1024
+# Copies longer than this are split so a length always fits in a u32
+MAX_OP_LENGTH = 0xFFFFFFFF
+
+
+def _checksum(block):
+    return ((sum(accumulate(block)) & 0xFFFF) << 16) | (sum(block) & 0xFFFF)
+
+
+def make_delta(source, target, block_size=DEFAULT_BLOCK_SIZE):
+    """Return a patch (bytes) that turns source into target."""
+    blocks = {}
+    for offset in range(0, len(source) - block_size + 1, block_size):
+        blocks.setdefault(_checksum(source[offset:offset + block_size]), offset)
+
+    ops = []
+    literal_start = 0
+    i = 0
+    a = b = None
+    n = len(target)
+    while i + block_size <= n:
+        if a is None:
+            window = target[i:i + block_size]
+            a = sum(window) & 0xFFFF
+            b = sum(accumulate(window)) & 0xFFFF
+        offset = blocks.get((b << 16) | a)
+        if offset is not None and source[offset:offset + block_size] == target[i:i + block_size]:
+            length = block_size
+            # Runs of unchanged data usually continue block after block
+            while (i + length + block_size <= n and offset + length + block_size <= len(source)
+                   and length + block_size <= MAX_OP_LENGTH
+                   and source[offset + length:offset + length + block_size]
+                   == target[i + length:i + length + block_size]):
+                length += block_size
+            if literal_start < i:
+                ops.append(target[literal_start:i])
+            ops.append((offset, length))
+            i += length
+            literal_start = i
+            a = None
+            continue
+        if i + block_size < n:
+            out_byte, in_byte = target[i], target[i + block_size]
+            a = (a - out_byte + in_byte) & 0xFFFF
+            b = (b - block_size * out_byte + a) & 0xFFFF
+        i += 1
+    if literal_start < n:
+        ops.append(target[literal_start:])
+
+    parts = [HEADER.pack(MAGIC, n, hashlib.sha256(target).digest())]
+    for op in ops:
+        if isinstance(op, tuple):
+            parts.append(b"C" + COPY.pack(*op))
+        else:
+            for start in range(0, len(op), MAX_OP_LENGTH):
+                chunk = op[start:start + MAX_OP_LENGTH]
+                parts.append(b"I" + INSERT.pack(len(chunk)) + chunk)
+    parts.append(b"E")
+    return b"".join(parts)
+
+
+def make_delta_file(source_path, target_path, delta_path, block_size=DEFAULT_BLOCK_SIZE):
+    with open(source_path, 'rb') as f:
+        source = f.read()
+    with open(target_path, 'rb') as f:
+        target = f.read()
+    delta = make_delta(source, target, block_size)
+    with open(delta_path, 'wb') as f:
+        f.write(delta)
+    return len(delta)
+
+
+def _read_exact(f, size):
+    data = f.read(size)
+    if len(data) != size:
+        raise UpdateError("Truncated delta patch")
+    return data
+
+
+def _copy(src, out, length, digest):
+    while length:
+        data = _read_exact(src, min(length, COPY_CHUNK_SIZE))
+        out.write(data)
+        digest.update(data)
+        length -= len(data)
+
+
+def apply_delta(source_path, delta_path, output_path):
+    """Rebuild the new bundle at output_path, streaming, and verify its size and digest."""
+    tmp_file = output_path + ".tmp"
+    digest = hashlib.sha256()
+    written = 0
+    try:
+        with open(delta_path, 'rb') as delta, open(source_path, 'rb') as source, open(tmp_file, 'wb') as out:
+            magic, target_size, target_hash = HEADER.unpack(_read_exact(delta, HEADER.size))
+            if magic != MAGIC:
+                raise UpdateError("Not a delta patch")
+            while True:
+                op = _read_exact(delta, 1)
+                if op == b"E":
+                    break
+                if op == b"C":
+                    offset, length = COPY.unpack(_read_exact(delta, COPY.size))
+                    source.seek(offset)
+                    _copy(source, out, length, digest)
+                elif op == b"I":
+                    (length,) = INSERT.unpack(_read_exact(delta, INSERT.size))
+                    _copy(delta, out, length, digest)
+                else:
+                    raise UpdateError(f"Unknown delta operation {op!r}")
+                written += length
+        if written != target_size or digest.digest() != target_hash:
+            raise UpdateError("Patched bundle does not match the release")
+        os.replace(tmp_file, output_path)
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+    return output_path
+
+
+if __name__ == "__main__":
+    # Release tooling: python -m update.delta OLD_BUNDLE NEW_BUNDLE PATCH
+    import sys
+    if len(sys.argv) != 4:
+        sys.exit("usage: python -m update.delta OLD_BUNDLE NEW_BUNDLE PATCH")
+    patch_size = make_delta_file(*sys.argv[1:])
+    print(f"Wrote {sys.argv[3]} ({patch_size} bytes)")
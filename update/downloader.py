@@ -0,0 +1,88 @@
+"""
+Chunked, resumable downloads verified against a SHA-256 digest
+"""
+import hashlib
+import logging
+import os
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Small reads so an interrupted download keeps almost everything it received
+CHUNK_SIZE = 64 * 1024
+DOWNLOAD_RETRIES = 3
+
+
+class UpdateError(Exception):
+    """Raised when an update cannot be downloaded, verified or applied."""
+
+
+def file_sha256(path, chunk_size=CHUNK_SIZE):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def download_file(url, dest, sha256=None, size=None, session=None, chunk_size=CHUNK_SIZE,
+                  retries=DOWNLOAD_RETRIES, timeout=30, progress_callback=None):
+    """Download url to dest, resuming a previous partial download with an HTTP Range request.
+
+    Data is written to dest + ".part" and only moved to dest once the size
+    and digest match, so an interrupted or corrupt download never looks
+    complete. progress_callback(bytes_done, bytes_total) is called per chunk.
+    """
+    session = session or requests.Session()
+    part_file = dest + ".part"
+    os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+    last_error = None
+    for attempt in range(retries + 1):
+        try:
+            _download_part(url, part_file, size, session, chunk_size, timeout, progress_callback)
+            break
+        except requests.RequestException as e:
+            last_error = e
+            logger.warning(f"Download of {url} interrupted (attempt {attempt + 1}): {e}")
+    else:
+        raise UpdateError(f"Download failed: {last_error}")
+
+    if size is not None and os.path.getsize(part_file) != size:
+        os.remove(part_file)
+        raise UpdateError(f"Downloaded size mismatch for {url}")
+    if sha256 and file_sha256(part_file).lower() != sha256.lower():
+        os.remove(part_file)
+        raise UpdateError(f"Checksum mismatch for {url}")
+    os.replace(part_file, dest)
+    return dest
+
+
+def _download_part(url, part_file, size, session, chunk_size, timeout, progress_callback):
+    offset = os.path.getsize(part_file) if os.path.exists(part_file) else 0
+    if size is not None and offset >= size:
+        if offset == size:
+            return
+        offset = 0  # Longer than the release; start over
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+    with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+        if offset and response.status_code == 416:
+            return  # Nothing left to fetch; the digest check decides if the part is good
+        if offset and response.status_code == 206 and \
+                response.headers.get("Content-Range", "").startswith(f"bytes {offset}-"):
+            mode = 'ab'
+        else:
+            # The server ignored the range (or this is a fresh download)
+            response.raise_for_status()
+            offset = 0
+            mode = 'wb'
+        total = size
+        if total is None and response.headers.get("Content-Length"):
+            total = offset + int(response.headers["Content-Length"])
+        done = offset
+        with open(part_file, mode) as f:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                f.write(chunk)
+                done += len(chunk)
+                if progress_callback:
+                    progress_callback(done, total)
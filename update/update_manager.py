@@ -2,12 +2,21 @@
 Update manager module
 """
 import os
+import re
+import sys
+import json
+import time
+import socket
 import logging
 import requests
+from urllib.parse import urljoin, urlparse
 import threading
 import tkinter as tk
 from tkinter import messagebox
 
+from .downloader import UpdateError, download_file, file_sha256
+from .delta import apply_delta
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -19,13 +28,156 @@ logger = logging.getLogger(__name__)
 # Update configuration
 AUTO_UPDATE_CHECK_ON_START = True
 AUTO_UPDATE_ENABLED = True
+UPDATE_CHECK_URL = os.environ.get("PAYSLIP_UPDATE_URL", "https://kritanpayslipmanager.vercel.app/api/version")
+UPDATE_CACHE_FILE = os.path.join(os.path.expanduser("~"), ".payslip_manager", "update_cache.json")
+UPDATE_CACHE_TTL = 6 * 60 * 60  # Seconds a successful check stays fresh
+REQUEST_TIMEOUT = 5
+UPDATE_DOWNLOAD_DIR = os.path.join(os.path.expanduser("~"), ".payslip_manager", "updates")
+
+_session = requests.Session()
+
+# The update endpoint serves a manifest such as:
+#   {"latest_version": "1.2.0",
+#    "releases": {"1.2.0": {"url": "PayslipManager-1.2.0.exe", "sha256": "...", "size": 123,
+#                           "deltas": {"1.1.0": {"url": "1.1.0-1.2.0.delta", "sha256": "...", "size": 45}}}}}
+# Relative URLs are resolved against the manifest URL, so a release folder
+# can be served as-is by any static HTTP server.
+
+
+def parse_version(version):
+    """Turn "v1.10.0-beta.2" into a tuple that sorts by semantic version precedence."""
+    version = str(version).strip().lstrip("vV").split("+", 1)[0]
+    core, _, prerelease = version.partition("-")
+    numbers = tuple(int(part) if part.isdigit() else 0 for part in core.split("."))
+    numbers = numbers + (0,) * (3 - len(numbers))
+    if not prerelease:
+        # A release sorts after all of its pre-releases
+        return numbers + ((1,),)
+    identifiers = tuple((0, int(part), "") if part.isdigit() else (1, 0, part)
+                        for part in re.split(r"[.]", prerelease))
+    return numbers + ((0,) + identifiers,)
+
+
+def is_newer_version(candidate, current):
+    return parse_version(candidate) > parse_version(current)
+
+
+def _update_server_address():
+    url = urlparse(UPDATE_CHECK_URL)
+    return url.hostname, url.port or (443 if url.scheme == "https" else 80)
+
+
+def check_internet_connection(timeout=3):
+    """Check that the update server can be reached.
+
+    Probes the host of UPDATE_CHECK_URL rather than a public server, so a
+    LAN update server works on machines without internet access.
+    """
+    try:
+        socket.create_connection(_update_server_address(), timeout=timeout).close()
+        return True
+    except OSError:
+        return False
+
+
+def _load_cache():
+    try:
+        with open(UPDATE_CACHE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(cache):
+    try:
+        os.makedirs(os.path.dirname(UPDATE_CACHE_FILE), exist_ok=True)
+        tmp_file = UPDATE_CACHE_FILE + ".tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(cache, f)
+        os.replace(tmp_file, UPDATE_CACHE_FILE)
+    except OSError as e:
+        logger.warning(f"Could not save update cache: {e}")
+
+
+def fetch_latest_version(force_check=False):
+    """Return the version manifest from the update endpoint, using the cache while it is fresh.
+
+    Re-validates with If-None-Match / If-Modified-Since so an unchanged
+    manifest costs a 304 instead of a download.
 
-def check_for_update(current_version, force_check=False):
+    Returns:
+        tuple: (manifest dict, True if served from cache without a request)
+    """
+    cache = _load_cache()
+    if (not force_check and cache.get("url") == UPDATE_CHECK_URL
+            and time.time() - cache.get("checked_at", 0) < UPDATE_CACHE_TTL):
+        return cache.get("manifest", {}), True
+
+    headers = {}
+    if cache.get("url") == UPDATE_CHECK_URL:
+        if cache.get("etag"):
+            headers["If-None-Match"] = cache["etag"]
+        if cache.get("last_modified"):
+            headers["If-Modified-Since"] = cache["last_modified"]
+    response = _session.get(UPDATE_CHECK_URL, headers=headers, timeout=REQUEST_TIMEOUT)
+    if response.status_code == 304 and "manifest" not in cache:
+        # Nothing cached to revalidate against; fetch the manifest itself
+        response = _session.get(UPDATE_CHECK_URL, timeout=REQUEST_TIMEOUT)
+    if response.status_code == 304:
+        logger.info("Update manifest not modified")
+        manifest = cache["manifest"]
+    else:
+        response.raise_for_status()
+        manifest = response.json()
+        cache = {"url": UPDATE_CHECK_URL, "manifest": manifest,
+                 "etag": response.headers.get("ETag"),
+                 "last_modified": response.headers.get("Last-Modified")}
+    cache["checked_at"] = time.time()
+    _save_cache(cache)
+    return manifest, False
+
+
+def check_for_update_async(current_version, callback, force_check=False):
+    """Run the connectivity probe and update check in a background thread.
+
+    callback(result) is called from that thread with a dict holding
+    online, update_available, latest_version, from_cache and error; Tk
+    callers must hand it to the main thread (e.g. with root.after).
+    """
+    def worker():
+        result = {"online": True, "update_available": False, "latest_version": None,
+                  "from_cache": False, "error": None}
+        try:
+            cache = _load_cache()
+            cache_fresh = (cache.get("url") == UPDATE_CHECK_URL
+                           and time.time() - cache.get("checked_at", 0) < UPDATE_CACHE_TTL)
+            if (force_check or not cache_fresh) and not check_internet_connection():
+                result["online"] = False
+                result["error"] = "No internet connection"
+            else:
+                manifest, from_cache = fetch_latest_version(force_check)
+                result["from_cache"] = from_cache
+                result["latest_version"] = manifest.get("latest_version") or manifest.get("version")
+                result["update_available"] = check_for_update(
+                    current_version, force_check=True, latest_version=result["latest_version"] or current_version)
+        except Exception as e:
+            logger.error(f"Asynchronous update check failed: {e}")
+            result["error"] = str(e)
+        callback(result)
+
+    thread = threading.Thread(target=worker, name="update-check", daemon=True)
+    thread.start()
+    return thread
+
+
+def check_for_update(current_version, force_check=False, latest_version=None):
     """Check for app updates safely using the main thread for all Tkinter operations
     
     Args:
         current_version (str): The current version of the application
         force_check (bool): If True, force checking for updates regardless of settings
+        latest_version (str): Version already fetched by the caller; fetched (or read
+            from the cache) when omitted
         
     Returns:
         bool: True if an update is available, False otherwise
@@ -33,17 +185,13 @@ def check_for_update(current_version, force_check=False):
     try:
         logger.info(f"Checking for updates... Current version: {current_version}, force_check: {force_check}")
         
-        # For demo purposes, we'll simulate a check with the remote server
         try:
-            # In a real app, this would be a call to your server to check for updates
-            # response = requests.get("https://api.example.com/check-version", params={"version": current_version})
-            # latest_version = response.json().get("latest_version")
-            
-            # For now, we just simulate no update is available (return False)
-            latest_version = current_version  # In real app, this would be fetched from server
+            if latest_version is None:
+                manifest, _ = fetch_latest_version(force_check)
+                latest_version = manifest.get("latest_version") or manifest.get("version") or current_version
             
             # Compare versions to determine if an update is needed
-            if latest_version > current_version:
+            if is_newer_version(latest_version, current_version):
                 logger.info(f"Update available: {latest_version}")
                 return True
             else:
@@ -63,3 +211,57 @@ def check_for_update(current_version, force_check=False):
             # Re-raise to handle in the caller
             raise e
         return False
+
+
+def _installed_bundle():
+    """Path of the running release bundle, when the app is a frozen executable."""
+    return sys.executable if getattr(sys, "frozen", False) else None
+
+
+def download_update(current_version, manifest=None, dest_dir=UPDATE_DOWNLOAD_DIR, installed_bundle=None,
+                    progress_callback=None):
+    """Download the latest release and return the path of the verified bundle.
+
+    A delta patch from current_version is preferred when the manifest has
+    one and the installed bundle is available to patch; if the patch fails
+    for any reason the full bundle is downloaded instead. Partial downloads
+    in dest_dir are resumed on the next call.
+    """
+    if manifest is None:
+        manifest, _ = fetch_latest_version(force_check=True)
+    latest_version = manifest.get("latest_version") or manifest.get("version")
+    release = manifest.get("releases", {}).get(latest_version)
+    if not latest_version or not release:
+        raise UpdateError("The update manifest does not describe the latest release")
+    if not is_newer_version(latest_version, current_version):
+        return None
+
+    bundle_name = os.path.basename(release["url"].split("?", 1)[0]) or f"PayslipManager-{latest_version}"
+    bundle_path = os.path.join(dest_dir, bundle_name)
+    if os.path.exists(bundle_path) and file_sha256(bundle_path) == release["sha256"].lower():
+        return bundle_path
+
+    installed_bundle = installed_bundle or _installed_bundle()
+    delta = release.get("deltas", {}).get(current_version)
+    if delta and installed_bundle and os.path.exists(installed_bundle):
+        delta_path = os.path.join(dest_dir, f"{current_version}-{latest_version}.delta")
+        try:
+            download_file(urljoin(UPDATE_CHECK_URL, delta["url"]), delta_path, delta.get("sha256"),
+                          delta.get("size"), session=_session, progress_callback=progress_callback)
+            apply_delta(installed_bundle, delta_path, bundle_path)
+            if file_sha256(bundle_path) != release["sha256"].lower():
+                raise UpdateError("Patched bundle checksum mismatch")
+            logger.info(f"Updated {current_version} -> {latest_version} with a delta patch")
+            return bundle_path
+        except (UpdateError, OSError) as e:
+            logger.warning(f"Delta update failed, downloading the full release: {e}")
+            if os.path.exists(bundle_path):
+                os.remove(bundle_path)
+        finally:
+            if os.path.exists(delta_path):
+                os.remove(delta_path)
+
+    download_file(urljoin(UPDATE_CHECK_URL, release["url"]), bundle_path, release["sha256"],
+                  release.get("size"), session=_session, progress_callback=progress_callback)
+    logger.info(f"Downloaded release {latest_version} to {bundle_path}")
+    return bundle_path